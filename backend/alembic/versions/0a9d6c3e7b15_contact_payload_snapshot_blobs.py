@@ -0,0 +1,110 @@
+"""contact payload snapshot blobs
+
+Revision ID: 0a9d6c3e7b15
+Revises: f5b0a7c9d1e3
+Create Date: 2026-10-18 15:20:47.305118
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from utils.snapshot import CODEC, decode_section, encode_section
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a9d6c3e7b15'
+down_revision: Union[str, None] = 'f5b0a7c9d1e3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH = 500
+
+blobs = sa.table(
+    'snapshot_blobs',
+    sa.column('hash', sa.String),
+    sa.column('codec', sa.String),
+    sa.column('size', sa.Integer),
+    sa.column('data', sa.LargeBinary),
+)
+
+
+def _batches(bind, column):
+    last_id = None
+    while True:
+        query = f"SELECT id, {column} FROM contacts"
+        if last_id is not None:
+            query += " WHERE id > :last_id"
+        rows = bind.execute(sa.text(query + " ORDER BY id LIMIT :n"), {"last_id": last_id, "n": BATCH}).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    # create_all at app startup may have created the table already (contacts is only altered here)
+    if not sa.inspect(bind).has_table('snapshot_blobs'):
+        op.create_table(
+            'snapshot_blobs',
+            sa.Column('hash', sa.String(length=64), primary_key=True),
+            sa.Column('codec', sa.String(length=16), nullable=False),
+            sa.Column('size', sa.Integer(), nullable=False),
+            sa.Column('data', sa.LargeBinary(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        )
+    # The blobs are compressed already; keep TOAST from trying again
+    op.execute("ALTER TABLE snapshot_blobs ALTER COLUMN data SET STORAGE EXTERNAL")
+    op.add_column('contacts', sa.Column('payload_refs', postgresql.JSONB(), server_default='{}', nullable=False))
+
+    for rows in _batches(bind, "payload"):
+        for contact_id, payload in rows:
+            refs, new_blobs = {}, {}
+            for name, value in (payload or {}).items():
+                if value is None:
+                    refs[name] = None
+                    continue
+                digest, data, size = encode_section(value)
+                refs[name] = digest
+                new_blobs[digest] = {"hash": digest, "codec": CODEC, "size": size, "data": data}
+            if new_blobs:
+                bind.execute(
+                    postgresql.insert(blobs).values(list(new_blobs.values())).on_conflict_do_nothing(index_elements=['hash'])
+                )
+            bind.execute(
+                sa.text("UPDATE contacts SET payload_refs = CAST(:refs AS jsonb) WHERE id = :id"),
+                {"refs": json.dumps(refs), "id": contact_id},
+            )
+
+    op.execute("DROP INDEX IF EXISTS ix_contacts_payload_gin")
+    op.drop_column('contacts', 'payload')
+
+
+def downgrade() -> None:
+    op.add_column('contacts', sa.Column('payload', postgresql.JSONB(), server_default='{}', nullable=False))
+
+    bind = op.get_bind()
+    for rows in _batches(bind, "payload_refs"):
+        for contact_id, refs in rows:
+            hashes = [ref for ref in (refs or {}).values() if ref]
+            found = {}
+            if hashes:
+                found = {
+                    digest: decode_section(codec, data)
+                    for digest, codec, data in bind.execute(
+                        sa.select(blobs.c.hash, blobs.c.codec, blobs.c.data).where(blobs.c.hash.in_(hashes))
+                    )
+                }
+            payload = {name: found.get(ref) if ref else None for name, ref in (refs or {}).items()}
+            bind.execute(
+                sa.text("UPDATE contacts SET payload = CAST(:payload AS jsonb) WHERE id = :id"),
+                {"payload": json.dumps(payload), "id": contact_id},
+            )
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_contacts_payload_gin ON contacts USING gin (payload jsonb_path_ops)")
+    op.drop_column('contacts', 'payload_refs')
+    op.drop_table('snapshot_blobs')
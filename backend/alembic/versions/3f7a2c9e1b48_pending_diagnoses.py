@@ -0,0 +1,40 @@
+"""pending diagnoses
+
+Revision ID: 3f7a2c9e1b48
+Revises: 28a10d997686
+Create Date: 2026-10-18 10:05:31.640127
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f7a2c9e1b48'
+down_revision: Union[str, None] = '28a10d997686'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases that started the app since the table was added have it from create_all already
+    if sa.inspect(op.get_bind()).has_table('pending_diagnoses'):
+        return
+    # json here; 5c2e8f1a9d34 turns result into jsonb along with the other JSON columns
+    op.create_table('pending_diagnoses',
+    sa.Column('record_id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('status', sa.String(length=16), server_default='running', nullable=False),
+    sa.Column('history_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('result', sa.JSON(), server_default='{}', nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['record_id'], ['medical_records.record_id']),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+    sa.PrimaryKeyConstraint('record_id', 'user_id', name='pk_pending_diagnoses')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('pending_diagnoses')
@@ -0,0 +1,65 @@
+"""jsonb columns and json indexes
+
+Revision ID: 5c2e8f1a9d34
+Revises: 3f7a2c9e1b48
+Create Date: 2026-10-18 10:12:40.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8f1a9d34'
+down_revision: Union[str, None] = '3f7a2c9e1b48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column) pairs moved from json to jsonb
+JSON_COLUMNS = [
+    ("users", "user_metadata"),
+    ("medical_records", "data"),
+    ("ai_state", "data"),
+    ("diagnoses", "diagnosis"),
+    ("diagnoses", "further_test"),
+    ("pending_diagnoses", "result"),
+    ("contacts", "payload"),
+]
+
+# name -> (table, index definition); must match the Index() declarations of the models
+INDEXES = {
+    "ix_users_doctor_facility": ("users", "((user_metadata #>> '{address}'), (user_metadata #>> '{facility}'))"),
+    "ix_medical_records_data_gin": ("medical_records", "USING gin (data jsonb_path_ops)"),
+    "ix_medical_records_full_name": ("medical_records", "((data #>> '{patient_info,full_name}'))"),
+    "ix_medical_records_chief_complaint": ("medical_records", "((data #>> '{medical_history,chief_complaint}'))"),
+    "ix_ai_state_data_gin": ("ai_state", "USING gin (data jsonb_path_ops)"),
+    "ix_ai_state_decision": ("ai_state", "((data #>> '{decision}'))"),
+    "ix_contacts_payload_gin": ("contacts", "USING gin (payload jsonb_path_ops)"),
+    "ix_contacts_full_name": ("contacts", "(lower((payload #>> '{medical_record,patient_info,full_name}')) text_pattern_ops)"),
+}
+
+
+def _set_type(type_name: str) -> None:
+    for table, column in JSON_COLUMNS:
+        # The '{}' default cannot be cast along with the column, so it is dropped and set again
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE {type_name} USING {column}::{type_name}")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT '{{}}'::{type_name}")
+
+
+def upgrade() -> None:
+    _set_type("jsonb")
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, (table, definition) in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    _set_type("json")
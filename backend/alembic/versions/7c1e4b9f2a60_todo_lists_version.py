@@ -0,0 +1,49 @@
+"""todo lists version
+
+Revision ID: 7c1e4b9f2a60
+Revises: 0a9d6c3e7b15
+Create Date: 2026-10-18 16:05:12.482930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e4b9f2a60'
+down_revision: Union[str, None] = '0a9d6c3e7b15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # create_all at app startup may have created the table already
+    if not sa.inspect(op.get_bind()).has_table('todo_lists'):
+        op.create_table(
+            'todo_lists',
+            sa.Column('record_id', sa.UUID(), sa.ForeignKey('medical_records.record_id', ondelete='CASCADE'), nullable=False),
+            sa.Column('user_id', sa.UUID(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+            sa.PrimaryKeyConstraint('record_id', 'user_id', name='pk_todo_lists'),
+        )
+    op.execute("""
+        INSERT INTO todo_lists (record_id, user_id)
+        SELECT DISTINCT record_id, user_id FROM todos
+        ON CONFLICT ON CONSTRAINT pk_todo_lists DO NOTHING
+    """)
+    # Todos are now addressed by position, which must equal the index in the listed (non-empty) todos
+    op.execute("""
+        UPDATE todos t SET position = n.position
+        FROM (
+            SELECT id, row_number() OVER (PARTITION BY user_id, record_id ORDER BY position, created_at) - 1 AS position
+            FROM todos
+            WHERE text <> ''
+        ) n
+        WHERE t.id = n.id AND t.position <> n.position
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('todo_lists')
@@ -0,0 +1,45 @@
+"""composite repository indexes
+
+Revision ID: 9e4b7a0c3f12
+Revises: 5c2e8f1a9d34
+Create Date: 2026-10-18 11:03:27.540961
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7a0c3f12'
+down_revision: Union[str, None] = '5c2e8f1a9d34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# name -> (table, index definition); must match the Index() declarations of the models
+INDEXES = {
+    "ix_medical_records_user_created": ("medical_records", "(user_id, created_at) INCLUDE (record_id)"),
+    "ix_chat_history_record_user_created": ("chat_history", "(record_id, user_id, created_at)"),
+    "ix_chat_history_user_created": ("chat_history", "(user_id, created_at)"),
+    "ix_todos_user_record_position": ("todos", "(user_id, record_id, position, created_at) INCLUDE (text, is_check) WHERE text <> ''"),
+    "ix_todos_user_record_created": ("todos", "(user_id, record_id, created_at)"),
+    "ix_diagnoses_user_record_created": ("diagnoses", "(user_id, record_id, created_at)"),
+    "ix_contacts_address_facility_created": ("contacts", "(address, facility, created_at)"),
+    "ix_contacts_patient_created": ("contacts", "(patient_id, created_at)"),
+    "ix_contact_messages_contact_created": ("contact_messages", "(contact_id, created_at)"),
+}
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        for name, (table, definition) in INDEXES.items():
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,41 @@
+"""users latest record
+
+Revision ID: b2d8e5a1c4f7
+Revises: 7c1e4b9f2a60
+Create Date: 2026-10-18 18:47:31.205416
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2d8e5a1c4f7'
+down_revision: Union[str, None] = '7c1e4b9f2a60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('latest_record_id', sa.UUID(), nullable=True))
+    op.add_column('users', sa.Column('record_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute("""
+        UPDATE users u SET
+            record_count = r.record_count,
+            latest_record_id = r.latest_record_id
+        FROM (
+            SELECT user_id,
+                   count(*) AS record_count,
+                   (array_agg(record_id ORDER BY created_at DESC))[1] AS latest_record_id
+            FROM medical_records
+            GROUP BY user_id
+        ) r
+        WHERE u.id = r.user_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'record_count')
+    op.drop_column('users', 'latest_record_id')
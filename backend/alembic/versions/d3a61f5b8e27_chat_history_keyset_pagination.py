@@ -0,0 +1,40 @@
+"""chat history keyset pagination
+
+Revision ID: d3a61f5b8e27
+Revises: 9e4b7a0c3f12
+Create Date: 2026-10-18 12:21:09.734402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a61f5b8e27'
+down_revision: Union[str, None] = '9e4b7a0c3f12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # now() is the transaction start, so both messages of a turn got the same created_at
+    op.execute("ALTER TABLE chat_history ALTER COLUMN created_at SET DEFAULT clock_timestamp()")
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chat_history_record_user_created_id "
+            "ON chat_history (record_id, user_id, created_at, id)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_chat_history_record_user_created")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_chat_history_record_user_created "
+            "ON chat_history (record_id, user_id, created_at)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_chat_history_record_user_created_id")
+    op.execute("ALTER TABLE chat_history ALTER COLUMN created_at SET DEFAULT now()")
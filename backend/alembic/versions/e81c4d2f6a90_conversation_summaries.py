@@ -0,0 +1,51 @@
+"""conversation summaries
+
+Revision ID: e81c4d2f6a90
+Revises: d3a61f5b8e27
+Create Date: 2026-10-18 13:40:52.208117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81c4d2f6a90'
+down_revision: Union[str, None] = 'd3a61f5b8e27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # create_all at app startup may have created the table (and its index) already
+    if not sa.inspect(op.get_bind()).has_table('conversation_summaries'):
+        op.create_table('conversation_summaries',
+        sa.Column('record_id', sa.UUID(), nullable=False),
+        sa.Column('user_id', sa.UUID(), nullable=False),
+        sa.Column('last_message', sa.String(length=100), server_default='', nullable=False),
+        sa.Column('chief_complaint', sa.String(length=1024), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['record_id'], ['medical_records.record_id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('record_id', 'user_id', name='pk_conversation_summaries')
+        )
+        op.create_index('ix_conversation_summaries_user_updated', 'conversation_summaries', ['user_id', 'updated_at', 'record_id'])
+    # Backfill: latest message per conversation with the chief complaint of its record;
+    # rows the app has kept up to date meanwhile are left as they are
+    op.execute("""
+        INSERT INTO conversation_summaries (record_id, user_id, last_message, chief_complaint, updated_at)
+        SELECT DISTINCT ON (h.record_id, h.user_id)
+               h.record_id, h.user_id, left(h.content, 100),
+               (m.data #>> '{medical_history,chief_complaint}'), h.created_at
+        FROM chat_history h
+        JOIN medical_records m ON m.record_id = h.record_id
+        ORDER BY h.record_id, h.user_id, h.created_at DESC, h.id DESC
+        ON CONFLICT ON CONSTRAINT pk_conversation_summaries DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_conversation_summaries_user_updated', table_name='conversation_summaries')
+    op.drop_table('conversation_summaries')
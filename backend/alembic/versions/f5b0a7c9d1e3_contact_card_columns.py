@@ -0,0 +1,71 @@
+"""contact card columns
+
+Revision ID: f5b0a7c9d1e3
+Revises: e81c4d2f6a90
+Create Date: 2026-10-18 14:32:15.610874
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5b0a7c9d1e3'
+down_revision: Union[str, None] = 'e81c4d2f6a90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('contacts', sa.Column('patient_name', sa.String(length=255), server_default='', nullable=False))
+    op.add_column('contacts', sa.Column('birth_year', sa.Integer(), nullable=True))
+    op.add_column('contacts', sa.Column('patient_address', sa.String(length=255), nullable=True))
+    op.add_column('contacts', sa.Column('status', sa.String(length=16), server_default='new', nullable=False))
+    op.add_column('contacts', sa.Column('last_message_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("ALTER TABLE contacts ALTER COLUMN created_at SET DEFAULT clock_timestamp()")
+    # Backfill the card from the payload snapshot and the messages
+    op.execute("""
+        UPDATE contacts c SET
+            patient_name = left(coalesce(c.payload #>> '{medical_record,patient_info,full_name}', ''), 255),
+            birth_year = CASE
+                WHEN c.payload #>> '{medical_record,patient_info,birthday}' ~ '^[0-9]{4}'
+                    THEN left(c.payload #>> '{medical_record,patient_info,birthday}', 4)::int
+                WHEN c.payload #>> '{medical_record,patient_info,year_of_birth}' ~ '^[0-9]{4}$'
+                    THEN (c.payload #>> '{medical_record,patient_info,year_of_birth}')::int
+            END,
+            patient_address = left(nullif(c.payload #>> '{medical_record,patient_info,address}', ''), 255),
+            status = CASE WHEN c.assigned_doctor_id IS NULL THEN 'new' ELSE 'assigned' END,
+            last_message_at = (SELECT max(m.created_at) FROM contact_messages m WHERE m.contact_id = c.id)
+    """)
+    # CONCURRENTLY cannot run inside the migration transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_inbox ON contacts (address, facility, created_at, id) "
+            "INCLUDE (patient_id, patient_name, birth_year, patient_address, status, last_message_at)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_patient_name ON contacts (lower(patient_name) text_pattern_ops)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_contacts_address_facility_created")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_contacts_full_name")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_full_name "
+            "ON contacts (lower((payload #>> '{medical_record,patient_info,full_name}')) text_pattern_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_contacts_address_facility_created ON contacts (address, facility, created_at)"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_contacts_patient_name")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_contacts_inbox")
+    op.execute("ALTER TABLE contacts ALTER COLUMN created_at SET DEFAULT now()")
+    op.drop_column('contacts', 'last_message_at')
+    op.drop_column('contacts', 'status')
+    op.drop_column('contacts', 'patient_address')
+    op.drop_column('contacts', 'birth_year')
+    op.drop_column('contacts', 'patient_name')
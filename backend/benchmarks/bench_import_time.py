@@ -0,0 +1,90 @@
+"""
+Cold-start cost of importing the app and building the LangGraph workflow.
+
+Each statement runs in a fresh interpreter with `python -X importtime`, so nothing is
+cached between measurements. For each it reports:
+
+  - time: wall clock of the statement itself (median of --runs), interpreter start excluded
+  - the top-level imports with the largest cumulative import time
+
+The graph used to be compiled (and its diagram rendered through a web service) when
+graph.graph was imported; it is now built by get_app() on first use, so compare
+"import graph.graph" with the get_app() line to see what moved off the import.
+
+With --budget MS it exits non-zero when a statement takes longer than that; the startup
+budget of "import main" (STARTUP_BUDGET_MS) is checked with
+
+    python -m benchmarks.bench_import_time --budget 2500 "import main"
+
+graph/chains/tests/test_startup.py only checks what "import main" loads, not how long it takes.
+
+Run from backend/:  python -m benchmarks.bench_import_time [--runs N] [--top K] [--budget MS] [statement ...]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import List, Tuple
+
+DEFAULT_STATEMENTS = [
+    "import graph.graph",
+    "from graph.graph import get_app; get_app()",
+    "import main",
+]
+
+# Cold import of the app, interpreter start excluded. langchain / openai / langgraph are
+# not part of it: they load with the chains, during the warm-up after startup.
+STARTUP_BUDGET_MS = 2500
+
+_TIMER = "import time as _t; _s = _t.perf_counter(); {statement}; print(_t.perf_counter() - _s)"
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, nesting depth, cumulative µs) of every import in `-X importtime` output."""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        # Nested imports are indented by two spaces per level below a single leading space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(cumulative_us)))
+    return imports
+
+
+def measure(statement: str) -> Tuple[float, List[Tuple[str, int, int]]]:
+    """(seconds spent in `statement`, parsed `-X importtime` output) from a fresh interpreter."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _TIMER.format(statement=statement)],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed")
+    return float(result.stdout.strip().splitlines()[-1]), parse_importtime(result.stderr)
+
+
+def report(statement: str, runs: int, top: int) -> float:
+    """Print the measurements of `statement`; returns its median time in ms (inf if it failed)."""
+    try:
+        samples = [measure(statement) for _ in range(runs)]
+    except RuntimeError as e:
+        print(f"{statement:<48} failed: {e}")
+        return float("inf")
+    median_ms = statistics.median(seconds for seconds, _ in samples) * 1000
+    print(f"{statement:<48} time {median_ms:8.1f} ms")
+    top_level = [(name, micros) for name, depth, micros in samples[-1][1] if depth == 0]
+    for name, micros in sorted(top_level, key=lambda item: -item[1])[:top]:
+        print(f"    {micros / 1000:8.1f} ms  {name}")
+    return median_ms
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("statements", nargs="*", default=DEFAULT_STATEMENTS)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--budget", type=float, metavar="MS", help=f"fail above this time (the startup budget is {STARTUP_BUDGET_MS})")
+    args = parser.parse_args()
+    over_budget = [s for s in args.statements if report(s, args.runs, args.top) > (args.budget or float("inf"))]
+    if over_budget:
+        sys.exit(f"over the {args.budget:.0f} ms budget: {', '.join(over_budget)}")
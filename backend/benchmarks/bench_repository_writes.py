@@ -0,0 +1,127 @@
+"""
+Microbenchmark of the per-turn repository writes: saving a chat turn and replacing the todos.
+
+The bulk paths of ChatHistoryRepo.add_messages / TodoRepo.replace_todos are compared with
+the previous ORM paths (one object per row, flush, delete-all + re-insert + re-list),
+reproduced below as the baseline. For each it reports, per turn:
+
+  - round trips: statements sent to the database (an executemany counts once)
+  - ORM objects: ChatHistory / Todo instances constructed or loaded
+  - time: wall clock, in-memory SQLite
+
+Run from backend/:  python -m benchmarks.bench_repository_writes [--turns N]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import List, Tuple
+
+from sqlalchemy import MetaData, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.entities.model import ChatHistory, ConversationSummary, MedicalRecord, Todo, TodoList, User
+from repositories import ChatHistoryRepo, ConversationSummaryRepo, TodoRepo, unit_of_work
+
+
+async def orm_add_messages(db: AsyncSession, *, user_id, record_id, messages) -> List[ChatHistory]:
+    async with unit_of_work(db):
+        rows = []
+        for msg in messages:
+            row = ChatHistory(user_id=user_id, record_id=record_id, role=msg["role"], content=msg["content"].strip())
+            db.add(row)
+            rows.append(row)
+        await db.flush()
+        for row in rows:
+            await db.refresh(row)
+        await ConversationSummaryRepo(db).touch(
+            user_id=user_id, record_id=record_id, last_message=rows[-1].content, updated_at=rows[-1].created_at
+        )
+    return rows
+
+
+async def orm_replace_todos(db: AsyncSession, *, user_id, record_id, items: List[Tuple[str, bool]]) -> List[Todo]:
+    await db.exec(delete(Todo).where(Todo.user_id == user_id, Todo.record_id == record_id))
+    for position, (text, is_check) in enumerate(items or [("", False)]):
+        db.add(Todo(user_id=user_id, record_id=record_id, text=text, is_check=bool(is_check), position=position))
+    await db.commit()
+    return await TodoRepo(db).list_todos(user_id=user_id, record_id=record_id)
+
+
+async def bulk_add_messages(db: AsyncSession, *, user_id, record_id, messages) -> List[ChatHistory]:
+    return await ChatHistoryRepo(db).add_messages(user_id=user_id, record_id=record_id, messages=messages, return_rows=True)
+
+
+async def bulk_replace_todos(db: AsyncSession, *, user_id, record_id, items) -> List[Todo]:
+    return await TodoRepo(db).replace_todos(user_id=user_id, record_id=record_id, items=items)
+
+
+def _turn_todos(turn: int) -> List[Tuple[str, bool]]:
+    # A typical turn keeps most todos, checks one, rewords one and adds one
+    items = [(f"todo {i}", i < turn % 5) for i in range(5)]
+    items[turn % 5] = (f"todo {turn % 5} (turn {turn})", False)
+    return items + [(f"new todo {turn}", False)]
+
+
+async def _run(name: str, add_messages, replace_todos, turns: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with engine.begin() as conn:
+            # users.id defaults to gen_random_uuid(), which SQLite does not have
+            users = User.__table__.to_metadata(MetaData())
+            users.c.id.server_default = None
+            await conn.run_sync(users.create)
+            for model in (MedicalRecord, ChatHistory, ConversationSummary, Todo, TodoList):
+                await conn.run_sync(model.__table__.create)
+
+        counts = {"round_trips": 0, "orm_objects": 0}
+
+        def on_execute(*args):
+            counts["round_trips"] += 1
+
+        def on_object(*args):
+            counts["orm_objects"] += 1
+
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user_id, record_id = uuid.uuid4(), uuid.uuid4()
+            db.add(User(id=user_id, username="bench", hashed_password="x", role_type="patient", user_metadata={}))
+            db.add(MedicalRecord(record_id=record_id, user_id=user_id, data={}))
+            await db.commit()
+
+            event.listen(engine.sync_engine, "before_cursor_execute", on_execute)
+            for model in (ChatHistory, Todo):
+                event.listen(model, "init", on_object)
+                event.listen(model, "load", on_object)
+            started = time.perf_counter()
+            try:
+                for turn in range(turns):
+                    messages = [{"role": "human", "content": f"question {turn}"}, {"role": "ai", "content": f"answer {turn}"}]
+                    await add_messages(db, user_id=user_id, record_id=record_id, messages=messages)
+                    await replace_todos(db, user_id=user_id, record_id=record_id, items=_turn_todos(turn))
+            finally:
+                elapsed = time.perf_counter() - started
+                event.remove(engine.sync_engine, "before_cursor_execute", on_execute)
+                for model in (ChatHistory, Todo):
+                    event.remove(model, "init", on_object)
+                    event.remove(model, "load", on_object)
+
+        print(
+            f"{name:<6} round trips/turn {counts['round_trips'] / turns:6.1f}   "
+            f"ORM objects/turn {counts['orm_objects'] / turns:6.1f}   "
+            f"time/turn {elapsed / turns * 1000:7.3f} ms"
+        )
+    finally:
+        await engine.dispose()
+
+
+async def main(turns: int) -> None:
+    await _run("orm", orm_add_messages, orm_replace_todos, turns)
+    await _run("bulk", bulk_add_messages, bulk_replace_todos, turns)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    asyncio.run(main(parser.parse_args().turns))
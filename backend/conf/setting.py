@@ -1,12 +1,25 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field, computed_field
-from sqlmodel import create_engine
-from sqlalchemy import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from functools import cached_property
 from urllib.parse import quote_plus
 from config import Config
 import os
 
+# Sync driver -> async driver for the same database
+_ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+def async_database_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return _ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
 class Settings(BaseSettings):
     PG_HOST: str = Field(alias="PG_HOST", default="postgres")
     PG_PORT: int = Field(alias="PG_PORT", default=5432)
@@ -17,6 +30,13 @@ class Settings(BaseSettings):
     # For debugging only
     PG_ECHO: bool = Field(alias="PG_ECHO", default=False)
 
+    # Connection pool per worker process. Size it so that
+    # workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays below the server's max_connections.
+    DB_POOL_SIZE: int = Field(alias="DB_POOL_SIZE", default=10)
+    DB_MAX_OVERFLOW: int = Field(alias="DB_MAX_OVERFLOW", default=10)
+    DB_POOL_TIMEOUT: int = Field(alias="DB_POOL_TIMEOUT", default=30)  # seconds
+    DB_POOL_RECYCLE: int = Field(alias="DB_POOL_RECYCLE", default=1800)  # seconds
+
     JWT_SECRET: str = os.getenv("JWT_SECRET", "change-me")
     ACCESS_TOKEN_EXPIRE: int = int(os.getenv("ACCESS_TOKEN_EXPIRE", 15))  # minutes
     REFRESH_TOKEN_EXPIRE: int = int(os.getenv("REFRESH_TOKEN_EXPIRE", 60 * 24 * 14))  # minutes (14d)
@@ -27,13 +47,22 @@ class Settings(BaseSettings):
 
     @computed_field
     @cached_property
-    def SQL_ENGINE(self) -> Engine:
+    def SQL_ENGINE(self) -> AsyncEngine:
         # DATABASE_URL = f"postgresql+psycopg2://{self.PG_USER}:{quote_plus(self.PG_PASSWORD)}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}"
-        DATABASE_URL = Config.DATABASE_URL
-        return create_engine(DATABASE_URL, echo=self.PG_ECHO)
+        DATABASE_URL = async_database_url(Config.DATABASE_URL)
+        pool_args = {}
+        if not DATABASE_URL.startswith("sqlite"):
+            pool_args = dict(
+                pool_size=self.DB_POOL_SIZE,
+                max_overflow=self.DB_MAX_OVERFLOW,
+                pool_timeout=self.DB_POOL_TIMEOUT,
+                pool_recycle=self.DB_POOL_RECYCLE,
+                pool_pre_ping=True,
+            )
+        return create_async_engine(DATABASE_URL, echo=self.PG_ECHO, **pool_args)
     
     def SQL_URL(self) -> str:
-        return Config.DATABASE_URL
+        return async_database_url(Config.DATABASE_URL)
         # return f"postgresql+psycopg2://{self.PG_USER}:{quote_plus(self.PG_PASSWORD)}@{self.PG_HOST}:{self.PG_PORT}/{self.PG_DB}"
 
 settings = Settings()
\ No newline at end of file
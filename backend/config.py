@@ -8,4 +8,22 @@ load_dotenv(dotenv_path=env_path, override=True)
 class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     ELEVENLABS_API_KEY = os.getenv("ELEVENLABS_API_KEY")
-    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./smask_db.sqlite3")
\ No newline at end of file
+    DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./smask_db.sqlite3")
+    # ElevenLabs: concurrent requests per process and the on-disk audio cache
+    TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "tts"))
+    TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    # Working-set cache of chat turns (record, AI state, history); a TTL of 0 disables it.
+    # WORKING_SET_URL=redis://host:6379/0 shares it between workers, otherwise it is per process
+    WORKING_SET_URL = os.getenv("WORKING_SET_URL", "")
+    WORKING_SET_TTL = float(os.getenv("WORKING_SET_TTL", "900"))
+    WORKING_SET_MAX_ENTRIES = int(os.getenv("WORKING_SET_MAX_ENTRIES", "4096"))
+    # Access-token validation cache of get_current_user; a TTL of 0 disables it.
+    # AUTH_INVALIDATION_URL=redis://host:6379/0 publishes revocations to the other workers
+    AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    AUTH_INVALIDATION_URL = os.getenv("AUTH_INVALIDATION_URL", WORKING_SET_URL)
+    # bcrypt process pool of login / register; beyond workers + queue, requests get a 503 with Retry-After
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "16"))
+    PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "1"))
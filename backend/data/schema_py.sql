@@ -11,13 +11,18 @@ CREATE TABLE IF NOT EXISTS users (
   username TEXT UNIQUE NOT NULL,
   hashed_password TEXT NOT NULL,
   role_type TEXT NOT NULL DEFAULT 'patient',  -- "patient" | "doctor"
-  user_metadata JSON NOT NULL DEFAULT '{}'::json,  -- use JSONB if you want indexing later
+  user_metadata JSONB NOT NULL DEFAULT '{}'::jsonb,
   is_active BOOLEAN NOT NULL DEFAULT TRUE,
   token_version INTEGER NOT NULL DEFAULT 0,
+  latest_record_id UUID,                      -- kept by the app when it creates a medical record
+  record_count INTEGER NOT NULL DEFAULT 0,
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
   updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
+-- Doctors are matched to contacts by the address / facility in their metadata
+CREATE INDEX IF NOT EXISTS ix_users_doctor_facility ON users ((user_metadata #>> '{address}'), (user_metadata #>> '{facility}'));
+
 -- Seed (example)
 -- INSERT INTO users (id, email)
 -- VALUES ('3f3c8b7e-6b1a-4dc1-9d7a-2e7a9a9d7b11', 'demo@example.com')
@@ -35,13 +40,17 @@ $$ LANGUAGE plpgsql;
 CREATE TABLE IF NOT EXISTS medical_records (
   record_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),       -- app can still provide its own UUID
   user_id   UUID NOT NULL REFERENCES users(id) ON DELETE RESTRICT,
-  data      JSON NOT NULL DEFAULT '{}'::json,                 -- use JSONB if you want indexing later
+  data      JSONB NOT NULL DEFAULT '{}'::jsonb,
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
   updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
 -- Indexes
 CREATE INDEX IF NOT EXISTS idx_medical_records_user_id ON medical_records(user_id);
+CREATE INDEX IF NOT EXISTS ix_medical_records_user_created ON medical_records(user_id, created_at) INCLUDE (record_id);
+CREATE INDEX IF NOT EXISTS ix_medical_records_data_gin ON medical_records USING gin (data jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS ix_medical_records_full_name ON medical_records ((data #>> '{patient_info,full_name}'));
+CREATE INDEX IF NOT EXISTS ix_medical_records_chief_complaint ON medical_records ((data #>> '{medical_history,chief_complaint}'));
 
 -- Auto-bump updated_at on update
 DROP TRIGGER IF EXISTS trg_medical_records_updated_at ON medical_records;
@@ -65,24 +74,41 @@ CREATE TABLE IF NOT EXISTS chat_history (
   user_id    UUID NOT NULL REFERENCES users(id) ON DELETE RESTRICT,
   role       TEXT NOT NULL,                  -- "user" | "AI" | "system" (enforce in app or add CHECK)
   content    TEXT NOT NULL,
-  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+  created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()  -- per row, so one turn's messages keep their order
 );
 
 CREATE INDEX IF NOT EXISTS idx_chat_history_record_id ON chat_history(record_id);
 CREATE INDEX IF NOT EXISTS idx_chat_history_user_id   ON chat_history(user_id);
 CREATE INDEX IF NOT EXISTS idx_chat_history_created   ON chat_history(created_at);
+-- Keyset pagination on (created_at, id) within a conversation
+CREATE INDEX IF NOT EXISTS ix_chat_history_record_user_created_id ON chat_history(record_id, user_id, created_at, id);
+CREATE INDEX IF NOT EXISTS ix_chat_history_user_created ON chat_history(user_id, created_at);
+
+-- === conversation_summaries (from ConversationSummary) ===
+-- One row per conversation for the history list, updated with every chat_history insert
+CREATE TABLE IF NOT EXISTS conversation_summaries (
+  record_id       UUID NOT NULL REFERENCES medical_records(record_id) ON DELETE CASCADE,
+  user_id         UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  last_message    VARCHAR(100) NOT NULL DEFAULT '',   -- first 100 chars of the last message
+  chief_complaint VARCHAR(1024) NULL,
+  updated_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(), -- created_at of the last message
+  CONSTRAINT pk_conversation_summaries PRIMARY KEY (record_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS ix_conversation_summaries_user_updated ON conversation_summaries(user_id, updated_at, record_id);
 
 -- === ai_state (from AIState) ===
--- Composite PK (record_id, user_id), JSON data with default, FK on record_id only (as in model)
+-- Composite PK (record_id, user_id), JSONB data with default, FK on record_id only (as in model)
 CREATE TABLE IF NOT EXISTS ai_state (
   record_id  UUID NOT NULL REFERENCES medical_records(record_id) ON DELETE CASCADE,
   user_id    UUID NOT NULL,
-  data       JSON NOT NULL DEFAULT '{}'::json,
+  data       JSONB NOT NULL DEFAULT '{}'::jsonb,
   PRIMARY KEY (record_id, user_id)
 );
 
 -- Helpful index if you often look up by user_id
 CREATE INDEX IF NOT EXISTS idx_ai_state_user_id ON ai_state(user_id);
+CREATE INDEX IF NOT EXISTS ix_ai_state_data_gin ON ai_state USING gin (data jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS ix_ai_state_decision ON ai_state ((data #>> '{decision}'));
 
 COMMIT;
 
@@ -100,6 +126,18 @@ CREATE TABLE IF NOT EXISTS todos (
 );
 CREATE INDEX IF NOT EXISTS idx_todos_user_id ON todos(user_id);
 CREATE INDEX IF NOT EXISTS idx_todos_record_id ON todos(record_id);
+-- Listing skips the empty placeholder row, so the index does too
+CREATE INDEX IF NOT EXISTS ix_todos_user_record_position ON todos(user_id, record_id, position, created_at) INCLUDE (text, is_check) WHERE text <> '';
+CREATE INDEX IF NOT EXISTS ix_todos_user_record_created ON todos(user_id, record_id, created_at);
+
+-- === todo_lists (from TodoList) ===
+-- Per-record version of the todos, bumped by every change (optimistic concurrency)
+CREATE TABLE IF NOT EXISTS todo_lists (
+  record_id UUID NOT NULL REFERENCES medical_records(record_id) ON DELETE CASCADE,
+  user_id   UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  version   INTEGER NOT NULL DEFAULT 0,
+  CONSTRAINT pk_todo_lists PRIMARY KEY (record_id, user_id)
+);
 COMMIT;
 
 -- === diagnoses (from Diagnosis) ===
@@ -109,13 +147,27 @@ CREATE TABLE IF NOT EXISTS diagnoses (
   user_id UUID NOT NULL REFERENCES users(id) ON DELETE RESTRICT,
   record_id UUID NOT NULL REFERENCES medical_records(record_id) ON DELETE CASCADE,
   reasoning_process TEXT NOT NULL,
-  diagnosis JSON NOT NULL DEFAULT '{}'::json,
-  further_test JSON NOT NULL DEFAULT '{}'::json,
+  diagnosis JSONB NOT NULL DEFAULT '{}'::jsonb,
+  further_test JSONB NOT NULL DEFAULT '{}'::jsonb,
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 CREATE INDEX IF NOT EXISTS idx_diagnoses_user_id ON diagnoses(user_id);
 CREATE INDEX IF NOT EXISTS idx_diagnoses_record_id ON diagnoses(record_id);
 CREATE INDEX IF NOT EXISTS idx_diagnoses_created ON diagnoses(created_at);
+CREATE INDEX IF NOT EXISTS ix_diagnoses_user_record_created ON diagnoses(user_id, record_id, created_at);
+COMMIT;
+
+-- === pending_diagnoses (from PendingDiagnosis) ===
+BEGIN;
+CREATE TABLE IF NOT EXISTS pending_diagnoses (
+  record_id UUID NOT NULL REFERENCES medical_records(record_id) ON DELETE CASCADE,
+  user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  status VARCHAR(16) NOT NULL DEFAULT 'running',
+  history_count INTEGER NOT NULL DEFAULT 0,
+  result JSONB NOT NULL DEFAULT '{}'::jsonb,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  CONSTRAINT pk_pending_diagnoses PRIMARY KEY (record_id, user_id)
+);
 COMMIT;
 -- === contacts (from Contact) ===
 BEGIN;
@@ -127,12 +179,38 @@ CREATE TABLE IF NOT EXISTS contacts (
   address TEXT NOT NULL,
   facility TEXT NOT NULL,
   include_conversation BOOLEAN NOT NULL DEFAULT FALSE,
-  payload JSON NOT NULL DEFAULT '{}'::json,
-  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+  -- Patient card, copied from the payload at creation for the doctor inbox
+  patient_name VARCHAR(255) NOT NULL DEFAULT '',
+  birth_year INTEGER NULL,
+  patient_address VARCHAR(255) NULL,
+  status VARCHAR(16) NOT NULL DEFAULT 'new',  -- "new" | "assigned"
+  last_message_at TIMESTAMPTZ NULL,
+  -- Snapshot sections (medical_record, diagnosis, todos, conversation, ...) -> snapshot_blobs.hash
+  payload_refs JSONB NOT NULL DEFAULT '{}'::jsonb,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()
 );
 CREATE INDEX IF NOT EXISTS idx_contacts_patient ON contacts(patient_id);
 CREATE INDEX IF NOT EXISTS idx_contacts_doctor ON contacts(assigned_doctor_id);
 CREATE INDEX IF NOT EXISTS idx_contacts_record ON contacts(record_id);
+-- Doctor inbox, keyset on (created_at, id); INCLUDE allows index-only scans of the card columns
+CREATE INDEX IF NOT EXISTS ix_contacts_inbox ON contacts(address, facility, created_at, id)
+  INCLUDE (patient_id, patient_name, birth_year, patient_address, status, last_message_at);
+CREATE INDEX IF NOT EXISTS ix_contacts_patient_created ON contacts(patient_id, created_at);
+CREATE INDEX IF NOT EXISTS ix_contacts_patient_name ON contacts (lower(patient_name) text_pattern_ops);
+COMMIT;
+
+-- === snapshot_blobs (from SnapshotBlob) ===
+-- Compressed contact payload sections, content-addressed and shared between contacts
+BEGIN;
+CREATE TABLE IF NOT EXISTS snapshot_blobs (
+  hash VARCHAR(64) PRIMARY KEY,               -- sha256 of the canonical JSON
+  codec VARCHAR(16) NOT NULL,                 -- e.g. 'zlib'
+  size INTEGER NOT NULL,                      -- uncompressed bytes
+  data BYTEA NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+-- Already compressed; store out of line without TOAST compression
+ALTER TABLE snapshot_blobs ALTER COLUMN data SET STORAGE EXTERNAL;
 COMMIT;
 
 -- === contact_messages (from ContactMessage) ===
@@ -147,4 +225,5 @@ CREATE TABLE IF NOT EXISTS contact_messages (
 );
 CREATE INDEX IF NOT EXISTS idx_contact_messages_contact ON contact_messages(contact_id);
 CREATE INDEX IF NOT EXISTS idx_contact_messages_created ON contact_messages(created_at);
+CREATE INDEX IF NOT EXISTS ix_contact_messages_contact_created ON contact_messages(contact_id, created_at);
 COMMIT;
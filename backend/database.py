@@ -1,4 +1,6 @@
-﻿from sqlmodel import Session, SQLModel
+﻿from contextlib import asynccontextmanager
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
 from conf.setting import settings
 from models.entities.model import *
 from models.entities.contact_models import *
@@ -8,11 +10,22 @@ engine = settings.SQL_ENGINE
 
 logger = logging.getLogger(__name__)
 
-def create_db_and_tables():
+async def create_db_and_tables():
     logger.info("Attempting to create tables")
-    SQLModel.metadata.create_all(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
     logger.info("Finishing creating tables")
 
-def get_session():
-    with Session(engine) as session:
+def _new_session() -> AsyncSession:
+    # expire_on_commit=False: attributes stay loaded after commit, an async session cannot lazy-load them
+    return AsyncSession(engine, expire_on_commit=False)
+
+async def get_session():
+    async with _new_session() as session:
+        yield session
+
+@asynccontextmanager
+async def session_scope():
+    """Session for work that outlives the request scope (streaming bodies, background tasks)."""
+    async with _new_session() as session:
         yield session
@@ -1,9 +1,8 @@
 ﻿from typing import List, Optional, Dict
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
-from config import Config
+from graph.chains.registry import get_streaming_llm, get_structured_llm
 
 # Define the structured output model
 class Conversation(BaseModel):
@@ -27,31 +26,8 @@ class Conversation(BaseModel):
     )
 
 
-def _format_allowed_options(allowed_addresses: List[str], facilities_by_address: Dict[str, List[str]]):
-    # Avoid curly braces in prompt (which would be parsed as variables)
-    addr_text = ", ".join(allowed_addresses) if allowed_addresses else "(none)"
-    lines = []
-    for addr in allowed_addresses:
-        facs = facilities_by_address.get(addr) or []
-        if facs:
-            lines.append(f"{addr}: " + ", ".join(facs))
-        else:
-            lines.append(f"{addr}: (no facilities)")
-    fac_text = "\n".join(lines) if lines else "(none)"
-    return addr_text, fac_text
-
-
-def create_conversation_after_chain(
-    conversation_history,
-    message: str = "",
-    *,
-    allowed_addresses: List[str],
-    facilities_by_address: Dict[str, List[str]],
-):
-    addresses_text, facilities_text = _format_allowed_options(allowed_addresses, facilities_by_address)
-
-    system = (
-        f"""
+system = (
+        """
         You are a 30 years old medical assistant (who also assists with therapy for mental health issues) chatbot continuing a conversation with a patient after providing an initial diagnosis. You should tell them that the diagnosis is completed (Dont tell the diagnosis to them, because the diagnosis need further confirmation from doctor. only tell the further test they need to check)
         You must following the below rules:
 
@@ -79,25 +55,24 @@ def create_conversation_after_chain(
         + "\nOutput schema requirements: generation, multiple_choices, decision, action, send_contact. If sending is not ready, use action=NONE and send_contact=null.\n"
     )
 
-    # Initialize the LLM with a system prompt
-    llm = ChatOpenAI(
-        model="gpt-4o",
-        openai_api_key=Config.OPENAI_API_KEY
+def _conversation_after_prompt():
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            MessagesPlaceholder("history"),
+            ("human", "{message}"),
+        ]
     )
 
-    # Return the configured LLM object
-    structured_llm_router = llm.with_structured_output(Conversation)
+def create_conversation_after_chain():
+    structured_llm_router = get_structured_llm(Conversation, "gpt-4o")
 
-    messages = [("system", system)]
-    for msg in conversation_history:
-        messages.append((msg.role, msg.content))
-    messages.append(("human", message))
-    conversation_prompt = (
-        ChatPromptTemplate
-        .from_messages(messages)
-        .partial(allowed_addresses=addresses_text, facilities_by_address=facilities_text)
-    )
+    conversation_after_chain = _conversation_after_prompt() | structured_llm_router
+
+    return conversation_after_chain
 
-    conversation_after_chain = conversation_prompt | structured_llm_router
+def create_conversation_after_stream_chain():
+    # Yields partial dicts; `generation` is the first field so it streams before the action fields
+    conversation_after_chain = _conversation_after_prompt() | get_streaming_llm(Conversation, "gpt-4o")
 
     return conversation_after_chain
@@ -1,9 +1,7 @@
 from typing import List, Optional
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from datetime import date
-from config import Config
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from graph.chains.registry import get_streaming_llm, get_structured_llm
 
 # Define the structured output model
 class Conversation(BaseModel):
@@ -28,23 +26,16 @@ class Conversation(BaseModel):
             default_factory=list, description="Dangerous or serious conditions that might not fully match the case but must be ruled out carefully due to risk."
         )
 
+    # User-facing fields first: they are decoded (and streamed) before the long reasoning/note
+    generation: str = Field(default="", description="Your question or answer to patient's questions. Ask questions for rule out potential diseases, from the following order: 1, need to be ruled out dangerous diseases 2, Most potential disease 3, Other possible diseases. You must ask one clear relevant question for one thing at a time (Dont ask multiple questions at a time since it may overwhelm patient). For example, instead of asking question like do you have headache or sweat, which are two things: headache and sweat, you must ask headache on one question, then asking sweat on another question. Provide multiple-choice answers when appropriate.")
+    multiple_choices: List[str] = Field(default_factory=list, description="List of the 1~4 suggested answer (short) you give to the patient. If the question cant be answer by short answer, let it []. The suggested answer must be in the same language with the conversation")
+    decision: str = Field(default="MAIN_QUESTIONING", description="Your decided stage (MAIN_QUESTIONING or DIAGNOSIS)")
     reasoning: Reasoning = Field(..., description="Your reasoning based on the last patient response. What question you will ask next and why. What differential you're trying to confirm or eliminate if applicable. Potential serious conditions to rule out")
     note: str = Field(default="", description="Your note contain important information you think the diagnosis team would need to have for better diagnosis (ex: possible conditions, ruled out conditions, insight, reasoning, ...) (since the diagnosis team can access this conversation content, you may not write information that is already be access through the conversation or already existing inside the medical record, so just write your insight). You may update this note overtime (delete, update,... based on the information, your insight, and reasoning). Write them as short as possible, but still enough information. you may write them in bullet format if needed")
     disease_to_ask: str = Field(default="", description="The name of the disease you are thinking of, you need to ask patient symptoms related to that disease. Never leave it blank string unless you go to diagnosis stage")
     disease_to_ask_on_the_next_question: str = Field(default="", description="The name of the disease you are about to ask the patient, if you continue asking about the disease that is on the current question, keep it the same as disease_to_ask")
-    generation: str = Field(default="", description="Your question or answer to patient's questions. Ask questions for rule out potential diseases, from the following order: 1, need to be ruled out dangerous diseases 2, Most potential disease 3, Other possible diseases. You must ask one clear relevant question for one thing at a time (Dont ask multiple questions at a time since it may overwhelm patient). For example, instead of asking question like do you have headache or sweat, which are two things: headache and sweat, you must ask headache on one question, then asking sweat on another question. Provide multiple-choice answers when appropriate.")
-    multiple_choices: List[str] = Field(default_factory=list, description="List of the 1~4 suggested answer (short) you give to the patient. If the question cant be answer by short answer, let it []. The suggested answer must be in the same language with the conversation")
-    decision: str = Field(default="MAIN_QUESTIONING", description="Your decided stage (MAIN_QUESTIONING or DIAGNOSIS)")
 
-def create_conversation_chain(reasoning, note, conversation_history, message, diseases_already_asked, disease_to_ask):
-    llm = ChatOpenAI(
-        model="gpt-4o",
-        openai_api_key=Config.OPENAI_API_KEY,
-        temperature=1,
-    )
-
-    today = date.today()
-    system = (f"""
+system = ("""
     Today is {today}
     You are a 30 years old **medical assistant** (also trained in mental health support) whose job is to gather detailed patient information through structured conversation to assist with **disease diagnosis**. Your tone must be **empathetic and professional**, and your questioning style should resemble that of a **professional doctor**, but dont say thank you all the time, just keep your response as clear as possible.
 
@@ -96,21 +87,31 @@ def create_conversation_chain(reasoning, note, conversation_history, message, di
     - Never change the name of the disease in "disease_to_ask", unless the asked_symptoms matches with the symptoms of the current disease_to_ask
     """
     + "\nThe current Patient Medical Record: {medical_record} \n"
-    + f"\nDisease to ask now: {disease_to_ask}"
-    + f"\nYour notes: {note} \n"
-    + "\nOutput schema requirements: reasoning, note, generation, multiple_choices, decision. Decision must be exactly one of MAIN_QUESTIONING or DIAGNOSIS. Absolutely never move to DIAGNOSIS stage unless the list of diseases already asked contains all of the diseases: need to be ruled out disease, potential diseases, most likely disease. This is really important since it related to patient's life!!! Which mean you should never stop asking until it is!\n"
+    + "\nDisease to ask now: {disease_to_ask}"
+    + "\nYour notes: {note} \n"
+    + "\nOutput schema requirements: generation, multiple_choices, decision, disease_to_ask, disease_to_ask_on_the_next_question, reasoning, note. Decision must be exactly one of MAIN_QUESTIONING or DIAGNOSIS. Absolutely never move to DIAGNOSIS stage unless the list of diseases already asked contains all of the diseases: need to be ruled out disease, potential diseases, most likely disease. This is really important since it related to patient's life!!! Which mean you should never stop asking until it is!\n"
     + "Absolutely never move to DIAGNOSIS stage unless the list of diseases already asked contains all of the diseases: need to be ruled out disease, potential diseases, most likely disease. This is really important since it related to patient's life!!! Which mean you should never stop asking until it is!"
     + "Absolutely never move to DIAGNOSIS stage unless the list of diseases already asked contains all of the diseases: need to be ruled out disease, potential diseases, most likely disease. This is really important since it related to patient's life!!! Which mean you should never stop asking until it is!"
     )
 
-    # Return the configured LLM object
-    structured_llm_router = llm.with_structured_output(Conversation)
-    messages = [("system", system)]
-    for msg in conversation_history:
-        messages.append((msg.role, msg.content))
-    messages.append(("human", message))
-    conversation_prompt = ChatPromptTemplate.from_messages(messages)
+def _conversation_prompt():
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            MessagesPlaceholder("history"),
+            ("human", "{message}"),
+        ]
+    )
+
+def create_conversation_chain():
+    structured_llm_router = get_structured_llm(Conversation, "gpt-4o", 1)
+
+    conversation_chain = _conversation_prompt() | structured_llm_router
+
+    return conversation_chain
 
-    conversation_chain = conversation_prompt | structured_llm_router
+def create_conversation_stream_chain():
+    # Yields partial dicts; `generation` is the first field so it streams before the reasoning
+    conversation_chain = _conversation_prompt() | get_streaming_llm(Conversation, "gpt-4o", 1)
 
     return conversation_chain
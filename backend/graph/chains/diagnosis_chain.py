@@ -1,9 +1,13 @@
-from langchain_openai import ChatOpenAI
+import logging
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableLambda, RunnableParallel, RunnablePassthrough
 from typing import Optional, List
-from entities.predicted_diseases_entity import DiagnosisResponse
-from config import Config
+from entities.medical_record_entity import MedicalRecord
+from entities.predicted_diseases_entity import Diagnosis, DiagnosisResponse, FurtherTest
+from graph.chains.registry import get_structured_llm
+
+logger = logging.getLogger(__name__)
 
 # class Diagnosis(BaseModel):
 #     """Generated response and predicted disease (problem)"""
@@ -11,24 +15,43 @@ from config import Config
 #     generation: str = Field(description="Your answer about the initial diagnosis")
 #     predicted_disease: Optional[List[List[str]]] = Field(description="Lists of your predicted diseases (problems) aligning with the following 3 categories: 1. [The most highly possible diagnosis], 2. [The possible diagnosis (up to 6)], 3. [The disease should be ruled out]")
 
-# Initialize the LLM with a system prompt
-def create_diagnosis_chain():
-  llm = ChatOpenAI(
-      model="gpt-4o",
-      openai_api_key=Config.OPENAI_API_KEY,
-      temperature=0.5
-  )
+# The diagnosis turn is split into three sub-calls that are merged into DiagnosisResponse:
+# record completion and the differential run concurrently, tests + todo wait for the differential.
+# Each sub-call gets its own completion budget (tokens) and request timeout (seconds).
+SUBCALL_BUDGETS = {
+  "record": {"max_tokens": 2000, "timeout": 45},
+  "differential": {"max_tokens": 2500, "timeout": 60},
+  "plan": {"max_tokens": 1500, "timeout": 45},
+}
+
+class RecordCompletion(BaseModel):
+  medical_record: Optional[MedicalRecord] = Field(None, description="Your updated completed medical record based on the conversation between patient. The medical record content should be in the same language with the conversation with patient. You may need to translate the the medical record content to the same language with the conversation with patient")
+
+class Differential(BaseModel):
+  reasoning_process: str = Field(..., description="Your reasoning process")
+  diagnosis: Diagnosis = Field(..., description="Categorized potential conditions based on likelihood and differentiating factors.")
+
+class TestPlan(BaseModel):
+  further_test: List[FurtherTest] = Field(..., description="Detailed recommended further tests with purpose and urgency")
+  todo: Optional[List[str]] = Field(description="List of things patient should do, including the further test in detailed. Must be writen in the same language as the conversation between patient.")
 
-  system = (f"""
+role = """
   **Role:**
   You are a professional medical analysis assistant trained in evaluating patient medical records and predicting potential diseases based on symptoms, medical history, lab results, and demographic data. You adhere to best practices in clinical decision-making, relying on established medical guidelines, statistical correlations, and evidence-based medicine.
+"""
 
+record_system = (role + """
+  **Objective:**
+  Complete the medical record based on the conversation between patient. Keep every field that is already filled in unless the conversation contradicts it, and fill the missing ones from what the patient said.
+  """
+  + "\nThe current Patient Medical Record: {medical_record} \n")
+
+differential_system = (role + """
   **Objectives:**
 
-  1. **Comprehensive Patient Evaluation:** Complete the medical record based on the conversation between patient. Then, accurately assess the provided patient medical record, including clinical symptoms, medical history, diagnostic results, and other relevant data.
+  1. **Comprehensive Patient Evaluation:** Accurately assess the provided patient medical record and the conversation, including clinical symptoms, medical history, diagnostic results, and other relevant data.
   2. **Disease Prediction:** Identify potential diseases that correspond with the presented clinical data, using medical reasoning and established diagnostic frameworks.
   3. **Evidence-Based Reasoning:** Provide a well-structured explanation for each predicted disease, citing relevant symptoms, risk factors, and differentials.
-  4. **Differential Diagnosis:** If multiple conditions are plausible, list differential diagnoses with their probability levels and recommend further diagnostic tests or specialist consultations.
 
   **Guidelines for Response:**
 
@@ -43,26 +66,64 @@ def create_diagnosis_chain():
 
   - **Predicted Diseases:** Clearly list and categorize conditions based on their likelihood and importance.
   - **Justification:** Provide a detailed rationale for each condition prediction.
+  """
+  + "\nThe current Patient Medical Record: {medical_record} \n")
+
+plan_system = (role + """
+  **Objective:**
+  Given the differential diagnosis below, recommend further diagnostic tests or specialist consultations and the patient's to-do list.
+
+  **Response Formatting:**
+
   - **Further Tests (Be Detailed):** List specific medical tests or imaging procedures required to confirm, rule out, or better understand the suspected conditions. For each test, include:
     - The name of the test (e.g., CBC, chest X-ray, MRI, echocardiogram)
     - The **reason** why the test is necessary
     - Which **disease or symptom** it helps confirm or rule out
     - Urgency level (e.g., immediate, within 24 hours, routine)
 
-  - **Further question to ask patient:** Further questions to ask patient in order to rule out / reconsider diseases. If no further questions required, don't return anything
   - **To-do List:** List of things patient should do, must include the further test they should take that you wrote in further_test
   """
-  + "\nThe current Patient Medical Record: {medical_record} \n")
+  + "\nThe current Patient Medical Record: {medical_record} \n"
+  + "\nThe differential diagnosis: {differential} \n")
+
+human = "\n\n Note from doctor: {note} ##Conversation with patient: {history}"
+
+def _subcall(system_prompt, schema, budget):
+  prompt = ChatPromptTemplate.from_messages([("system", system_prompt), ("human", human)])
+  return prompt | get_structured_llm(schema, "gpt-4o", 0.5, **SUBCALL_BUDGETS[budget])
 
-  # Return the configured LLM object
-  structured_llm_router = llm.with_structured_output(DiagnosisResponse)
+def _fallback(name, default):
+  def _use_default(_inputs):
+    logger.warning("Diagnosis sub-call %s failed, continuing without it", name)
+    return default
+  return RunnableLambda(_use_default)
 
-  diagnosis_prompt = ChatPromptTemplate.from_messages(
-      [
-          ("system", system),
-          ("human", "\n\n Note from doctor: {note} ##Conversation with patient: {history}")
-      ]
+def _differential_text(inputs):
+  return {**inputs, "differential": inputs["differential"].model_dump_json()}
+
+def _merge(results):
+  assessment = results["assessment"]
+  return DiagnosisResponse(
+    medical_record=results["record"].medical_record,
+    reasoning_process=assessment["differential"].reasoning_process,
+    diagnosis=assessment["differential"].diagnosis,
+    further_test=assessment["plan"].further_test,
+    todo=assessment["plan"].todo,
+  )
+
+def create_diagnosis_chain():
+  # The record rewrite and the test plan are optional for the turn; the differential is not
+  record_chain = _subcall(record_system, RecordCompletion, "record").with_fallbacks(
+    [_fallback("record", RecordCompletion(medical_record=None))]
+  )
+  differential_chain = _subcall(differential_system, Differential, "differential")
+  plan_chain = (RunnableLambda(_differential_text) | _subcall(plan_system, TestPlan, "plan")).with_fallbacks(
+    [_fallback("plan", TestPlan(further_test=[], todo=None))]
   )
-  diagnosis_chain = diagnosis_prompt | structured_llm_router
 
-  return diagnosis_chain
\ No newline at end of file
+  diagnosis_chain = RunnableParallel(
+    record=record_chain,
+    assessment=RunnablePassthrough.assign(differential=differential_chain) | RunnablePassthrough.assign(plan=plan_chain),
+  ) | RunnableLambda(_merge)
+
+  return diagnosis_chain
@@ -1,7 +1,6 @@
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
-from config import Config
+from graph.chains.registry import get_structured_llm
 
 # Define the structured output model
 class Conversation(BaseModel):
@@ -10,12 +9,6 @@ class Conversation(BaseModel):
     generation: str = Field(default="", description="Your question or answer to patient's questions")
     decision: str = Field(default="CONVERSATION", description="Your decided stage (DIAGNOSIS or CONVERSATION")
 
-# Initialize the LLM with a system prompt
-llm = ChatOpenAI(
-    model="gpt-4o",
-    openai_api_key=Config.OPENAI_API_KEY
-)
-
 system = """
     # Task:
     You are a medical assistant (who also assists with therapy for mental health issues) chatbot continuing a conversation with a patient after providing an initial diagnosis, to confirm / gain more information, to conduct the diagnosis again.
@@ -29,15 +22,17 @@ system = """
 
 """
 
-# Return the configured LLM object
-structured_llm_router = llm.with_structured_output(Conversation)
+def create_follow_up_questions_chain():
+    structured_llm_router = get_structured_llm(Conversation, "gpt-4o")
+
+    conversation_after_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            ("system", "###Questions need to ask: {questions}"),
+            ("human", "###Medical record: {medical_record}.\n\n###Chat history: {history}.")
+        ]
+    )
 
-conversation_after_prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", system),
-        ("system", "###Questions need to ask: {questions}"),
-        ("human", "###Medical record: {medical_record}.\n\n###Chat history: {history}.")
-    ]
-)
+    follow_up_questions_chain = conversation_after_prompt | structured_llm_router
 
-follow_up_questions_chain = conversation_after_prompt | structured_llm_router
+    return follow_up_questions_chain
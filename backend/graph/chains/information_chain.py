@@ -1,9 +1,7 @@
 from typing import List, Optional
 from pydantic import BaseModel, Field
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from datetime import date
-from config import Config
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from graph.chains.registry import get_structured_llm
 
 # Define the structured output model
 class Conversation(BaseModel):
@@ -12,18 +10,7 @@ class Conversation(BaseModel):
     multiple_choices: List[str] = Field(default_factory=list, description="List of the 1~4 suggested answer (short) you give to the patient. If the question cant be answer by short answer, let it []. The suggested answer must be in the same language with the conversation")
     decision: str = Field(default="MAIN_QUESTIONING", description="Your decided stage (INFORMATION_COLLECTION or MAIN_QUESTIONING)")
 
-# Initialize the LLM with a system prompt
-
-def create_information_chain(conversation_history, message):
-    llm = ChatOpenAI(
-        model="gpt-5-2025-08-07",
-        openai_api_key=Config.OPENAI_API_KEY,
-        temperature=1,
-        reasoning_effort="minimal"
-    )
-
-    today = date.today()
-    system = (f"""
+system = ("""
     Today is {today}
     You are a 30 years old male **medical assistant** (also trained in mental health support) whose job is to gather detailed patient information through structured conversation to assist with **disease diagnosis**. Your tone must be **empathetic and professional**, and your questioning style should resemble that of a **professional doctor**, but dont say thank you all the time, just keep your response as clear as possible.
 
@@ -92,16 +79,19 @@ def create_information_chain(conversation_history, message):
     - Answer appropriately based on the patient's age and gender. For example, use "cô", "bác", "em", "anh", e.t.c in Vietnamese
     - You must say in the same language as patient's nationality.
     """
-    + "\nThe current Patient Medical Record: {medical_record} \n")
+    + "\nThe current Patient Medical Record: {medical_record} \n"
     + "\nOutput schema requirements: missing_information, generation, multiple_choices, decision. Decision must be exactly one of INFORMATION_COLLECTION or MAIN_QUESTIONING.\n"
+    )
 
-    # Return the configured LLM object
-    structured_llm_router = llm.with_structured_output(Conversation)
-    messages = [("system", system)]
-    for msg in conversation_history:
-        messages.append((msg.role, msg.content))
-    messages.append(("human", message))
-    conversation_prompt = ChatPromptTemplate.from_messages(messages)
+def create_information_chain():
+    structured_llm_router = get_structured_llm(Conversation, "gpt-5-2025-08-07", 1, "minimal")
+    conversation_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            MessagesPlaceholder("history"),
+            ("human", "{message}"),
+        ]
+    )
 
     conversation_chain = conversation_prompt | structured_llm_router
 
@@ -0,0 +1,100 @@
+"""
+Prompt variables of the chains, built from what the callers hold (stored records, chat
+history rows, AI state). Shared by services.chat and the graph nodes; nothing here
+imports langchain, so building inputs does not load the chains.
+"""
+import json
+from datetime import date
+from typing import Dict, List, Mapping, Optional, Sequence
+
+
+def normalize_record(medical_record):
+    try:
+        if hasattr(medical_record, 'data'):
+            return getattr(medical_record, 'data') or {}
+    except Exception:
+        pass
+    return medical_record or {}
+
+
+def history_messages(history, history_summary=""):
+    # ChatHistory rows -> (role, content) tuples for the MessagesPlaceholder
+    messages = [(msg.role, msg.content) for msg in (history or [])]
+    if history_summary:
+        messages.insert(0, ("system", f"Summary of the earlier part of this conversation:\n{history_summary}"))
+    return messages
+
+
+def format_allowed_options(allowed_addresses: Sequence[str], facilities_by_address: Mapping[str, List[str]]):
+    # Avoid curly braces in prompt (which would be parsed as variables)
+    addr_text = ", ".join(allowed_addresses) if allowed_addresses else "(none)"
+    lines = []
+    for addr in allowed_addresses:
+        facs = facilities_by_address.get(addr) or []
+        if facs:
+            lines.append(f"{addr}: " + ", ".join(facs))
+        else:
+            lines.append(f"{addr}: (no facilities)")
+    fac_text = "\n".join(lines) if lines else "(none)"
+    return addr_text, fac_text
+
+
+def conversation_inputs(medical_record, reasoning, note, history, message, diseases_already_asked, disease_to_ask, history_summary=""):
+    # Ensure plain-text for prompt interpolation
+    if isinstance(reasoning, (dict, list)):
+        try:
+            reasoning_text = json.dumps(reasoning, ensure_ascii=False)
+        except Exception:
+            reasoning_text = str(reasoning)
+    elif reasoning is None:
+        reasoning_text = ""
+    else:
+        reasoning_text = str(reasoning)
+
+    note_text = "" if note is None else str(note)
+
+    return {
+        "today": date.today(),
+        "medical_record": normalize_record(medical_record),
+        "reasoning": reasoning_text,
+        "note": note_text,
+        "diseases_already_asked": diseases_already_asked,
+        "disease_to_ask": disease_to_ask or "",
+        "history": history_messages(history, history_summary),
+        "message": message,
+    }
+
+
+def information_inputs(medical_record, history, message):
+    return {
+        "today": date.today(),
+        "medical_record": normalize_record(medical_record),
+        "history": history_messages(history),
+        "message": message,
+    }
+
+
+def conversation_after_inputs(
+    diagnosis,
+    history,
+    message,
+    medical_record,
+    history_summary="",
+    allowed_addresses: Sequence[str] = (),
+    facilities_by_address: Optional[Dict[str, List[str]]] = None,
+):
+    """`allowed_addresses` / `facilities_by_address`: where the patient's contact may be sent (none by default)."""
+    if message == "###DIAGNOSIS###":
+        dummy_message = ""
+    else:
+        dummy_message = message
+
+    addresses_text, facilities_text = format_allowed_options(allowed_addresses, facilities_by_address or {})
+    return {
+        "diagnosis": diagnosis,
+        "medical_record": normalize_record(medical_record),
+        "allowed_addresses": addresses_text,
+        "facilities_by_address": facilities_text,
+        "history": history_messages(history, history_summary),
+        "message": dummy_message,
+    }
@@ -1,26 +1,21 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from entities.medical_record_entity import MedicalRecord
-from config import Config
-
-# Initialize the LLM with a system prompt
-llm = ChatOpenAI(
-    model="gpt-4o",
-    openai_api_key=Config.OPENAI_API_KEY
-)
+from graph.chains.registry import get_structured_llm
 
 system ="""
     You are a professional Medical Information Extractor. Your task is to analyze the additional conversations between a medical assistant and a patient and accurately complete the structured medical record form. Ensure completeness, resolve ambiguities, and correctly map information to the appropriate fields while maintaining the intended meaning of the patient's responses.
 """
 
-# Return the configured LLM object
-structured_llm_router = llm.with_structured_output(MedicalRecord)
+def create_process_additional_info_chain():
+    structured_llm_router = get_structured_llm(MedicalRecord, "gpt-4o")
+
+    extraction_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            ("human", "###Additional Conversation: \n{additional_info}\n\n###Current Medical Record: {medical_record}")
+        ]
+    )
 
-extraction_prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", system),
-        ("human", "###Additional Conversation: \n{additional_info}\n\n###Current Medical Record: {medical_record}")
-    ]
-)
+    process_additional_info_chain = extraction_prompt | structured_llm_router
 
-process_additional_info_chain = extraction_prompt | structured_llm_router
\ No newline at end of file
+    return process_additional_info_chain
@@ -1,9 +1,8 @@
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, Field
 from langchain_core.prompts import ChatPromptTemplate
 from typing import Optional, List
 from entities.predicted_diseases_entity import DiagnosisResponse
-from config import Config
+from graph.chains.registry import get_structured_llm
 
 class Diagnosis(BaseModel):
     """Generated response and predicted disease (problem)"""
@@ -11,13 +10,6 @@ class Diagnosis(BaseModel):
     generation: str = Field(description="Your answer about the initial diagnosis")
     predicted_disease: Optional[List[List[str]]] = Field(description="Lists of your predicted diseases (problems) aligning with the following 3 categories: 1. [The most highly possible diagnosis], 2. [The possible diagnosis (up to 6)], 3. [The disease should be ruled out]")
 
-# Initialize the LLM with a system prompt
-llm = ChatOpenAI(
-    model="gpt-4o",
-    openai_api_key=Config.OPENAI_API_KEY,
-    temperature=0.5
-)
-
 system = """
 ### System Prompt for LLM: Professional Medical Analysis & Disease Prediction
 
@@ -51,13 +43,15 @@ You are a professional medical analysis assistant trained in evaluating patient
 - Don't remove previous diagnosis useful information and reasoning.
 """
 
-# Return the configured LLM object
-structured_llm_router = llm.with_structured_output(DiagnosisResponse)
+def create_re_diagnosis_chain():
+    structured_llm_router = get_structured_llm(DiagnosisResponse, "gpt-4o", 0.5)
+
+    diagnosis_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            ("human", "##Conversation with patient: {history}\n\n##Medical Record: {medical_record}\n\n##Previous diagnosis: {diagnosis}\n\n##Additional_info: {additional_info}")
+        ]
+    )
+    re_diagnosis_chain = diagnosis_prompt | structured_llm_router
 
-diagnosis_prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", system),
-        ("human", "##Conversation with patient: {history}\n\n##Medical Record: {medical_record}\n\n##Previous diagnosis: {diagnosis}\n\n##Additional_info: {additional_info}")
-    ]
-)
-re_diagnosis_chain = diagnosis_prompt | structured_llm_router
\ No newline at end of file
+    return re_diagnosis_chain
\ No newline at end of file
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+from config import Config
+
+# langchain / openai / httpx take over a second to import, so they are imported on
+# first use (or by warm_up at startup) rather than when the app imports this module.
+if TYPE_CHECKING:
+    import httpx
+    from langchain_openai import ChatOpenAI
+
+# name -> "module:factory". Modules are only imported the first time a chain is requested.
+CHAIN_FACTORIES = {
+    "conversation": "graph.chains.conversation_chain:create_conversation_chain",
+    "conversation_after": "graph.chains.conversation_after_chain:create_conversation_after_chain",
+    "conversation_stream": "graph.chains.conversation_chain:create_conversation_stream_chain",
+    "conversation_after_stream": "graph.chains.conversation_after_chain:create_conversation_after_stream_chain",
+    "information": "graph.chains.information_chain:create_information_chain",
+    "diagnosis": "graph.chains.diagnosis_chain:create_diagnosis_chain",
+    "extraction": "graph.chains.extraction_chain:create_extraction_chain",
+    "summary": "graph.chains.summary_chain:create_summary_chain",
+    "follow_up_questions": "graph.chains.follow_up_questions_chain:create_follow_up_questions_chain",
+    "process_additional_info": "graph.chains.process_additional_info_chain:create_process_additional_info_chain",
+    "re_diagnosis": "graph.chains.re_diagnosis_chain:create_re_diagnosis_chain",
+}
+
+# Chains the API serves; the remaining ones only back the LangGraph workflow
+SERVED_CHAINS = (
+    "conversation", "conversation_after", "conversation_stream", "conversation_after_stream",
+    "information", "diagnosis", "extraction", "summary",
+)
+
+
+# One keep-alive pool per process, shared by every ChatOpenAI client so that
+# turns reuse warm TLS connections to the API instead of opening new ones.
+def _http_options():
+    import httpx
+
+    limits = httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=120)
+    return {"limits": limits, "timeout": httpx.Timeout(120.0, connect=10.0)}
+
+
+@lru_cache(maxsize=1)
+def _http_client() -> httpx.Client:
+    import httpx
+
+    return httpx.Client(**_http_options())
+
+
+@lru_cache(maxsize=1)
+def _http_async_client() -> httpx.AsyncClient:
+    import httpx
+
+    return httpx.AsyncClient(**_http_options())
+
+
+@lru_cache(maxsize=None)
+def get_llm(
+    model: str = "gpt-4o",
+    temperature: float | None = None,
+    reasoning_effort: str | None = None,
+    max_tokens: int | None = None,
+    timeout: float | None = None,
+) -> ChatOpenAI:
+    """Return the process-wide ChatOpenAI client for this model configuration.
+
+    `max_tokens` caps the completion and `timeout` (seconds) bounds each API request.
+    """
+    from langchain_openai import ChatOpenAI
+
+    kwargs = {}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    if reasoning_effort is not None:
+        kwargs["reasoning_effort"] = reasoning_effort
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+    if timeout is not None:
+        # Fail fast instead of retrying a request that already used its whole budget
+        kwargs["timeout"] = timeout
+        kwargs["max_retries"] = 0
+    return ChatOpenAI(
+        model=model,
+        openai_api_key=Config.OPENAI_API_KEY,
+        http_client=_http_client(),
+        http_async_client=_http_async_client(),
+        **kwargs,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_structured_llm(
+    schema,
+    model: str = "gpt-4o",
+    temperature: float | None = None,
+    reasoning_effort: str | None = None,
+    max_tokens: int | None = None,
+    timeout: float | None = None,
+):
+    """Return the cached `with_structured_output` runnable for a schema/model pair."""
+    return get_llm(model, temperature, reasoning_effort, max_tokens, timeout).with_structured_output(schema)
+
+
+@lru_cache(maxsize=None)
+def get_streaming_llm(schema, model: str = "gpt-4o", temperature: float | None = None, reasoning_effort: str | None = None):
+    """Like `get_structured_llm`, but streams the tool arguments as growing partial dicts.
+
+    The pydantic parser used by `with_structured_output` only emits once every required
+    field validates, so it cannot surface the reply text while the rest is still decoding.
+    """
+    from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
+
+    tool_name = schema.__name__
+    llm = get_llm(model, temperature, reasoning_effort).bind_tools([schema], tool_choice=tool_name, parallel_tool_calls=False)
+    return llm | JsonOutputKeyToolsParser(key_name=tool_name, first_tool_only=True)
+
+
+@lru_cache(maxsize=None)
+def get_chain(name: str):
+    """Build the named chain once per process and return the cached runnable."""
+    try:
+        target = CHAIN_FACTORIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown chain: {name}") from None
+    module_path, factory_name = target.split(":")
+    factory = getattr(import_module(module_path), factory_name)
+    return factory()
+
+
+def warm_up(names=SERVED_CHAINS) -> None:
+    """Import and build the given chains now, so the first request does not pay for it."""
+    for name in names:
+        get_chain(name)
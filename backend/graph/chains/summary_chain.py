@@ -0,0 +1,27 @@
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from graph.chains.registry import get_llm
+
+system = """
+    You maintain a running summary of a medical intake conversation between a medical assistant and a patient.
+    The summary replaces the older messages in later prompts, so it must keep every clinically relevant fact:
+    - symptoms (onset, duration, frequency, severity, progression) and symptoms the patient denied
+    - questions the assistant already asked, so they are not asked again
+    - medications, allergies, history, lifestyle details and anything else the patient disclosed
+    - the patient's language and how the assistant addresses them
+    Write it in the same language as the conversation, as short bullet points. Do not add facts or interpretations.
+"""
+
+def create_summary_chain():
+    summary_prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", system),
+            ("human", "###Current summary (may be empty):\n{summary}\n\n###Messages to fold into the summary:"),
+            MessagesPlaceholder("messages"),
+            ("human", "Return the updated summary only."),
+        ]
+    )
+
+    summary_chain = summary_prompt | get_llm("gpt-4o-mini", 0) | StrOutputParser()
+
+    return summary_chain
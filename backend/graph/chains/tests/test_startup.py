@@ -0,0 +1,46 @@
+"""
+Startup: the app imports without the LLM libraries, which load with the chains during the
+warm-up that /v1/health/ready reports on. The import time budget is enforced by
+`python -m benchmarks.bench_import_time --budget`, not here.
+"""
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from benchmarks.bench_import_time import measure
+from services.health import warmup
+from services.health.router import router as health_router
+
+# Only imported by the chains, i.e. after startup (rich still comes in with httpx's CLI module)
+LAZY_PACKAGES = ("langchain_core", "langchain_openai", "openai", "langgraph")
+
+
+def test_app_imports_without_llm_libraries():
+    _, imports = measure("import main")
+    eager = sorted({name for name, _, _ in imports if name.split(".")[0] in LAZY_PACKAGES})
+    assert not eager, f"imported by main: {eager[:10]}"
+
+
+def test_ready_once_warm_up_has_finished(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(warmup, "warm_up", release.wait)
+    monkeypatch.setattr(warmup, "_warm_up", None)
+
+    app = FastAPI()
+    app.include_router(health_router)
+
+    @app.on_event("startup")
+    async def _startup():
+        warmup.get_warm_up().start()
+
+    with TestClient(app) as client:
+        response = client.get("/v1/health/ready")
+        assert response.status_code == 503 and response.json() == {"status": "warming_up"}
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while (response := client.get("/v1/health/ready")).status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert response.status_code == 200 and response.json()["status"] == "ready"
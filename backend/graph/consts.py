@@ -4,4 +4,6 @@ DIAGNOSIS = "diagnosis"
 FOLLOW_UP = "follow_up"
 PROCESS_ADDITIONAL_INFO = "process_additional_info"
 RE_DIAGNOSIS = "re_diagnosis"
-CONVERSATION_AFTER = "conversation_after"
\ No newline at end of file
+CONVERSATION_AFTER = "conversation_after"
+# Same value as langgraph.graph.END, without importing langgraph
+END = "__end__"
@@ -1,17 +1,9 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from langgraph.graph import END, StateGraph
+from functools import lru_cache
 
-from graph.consts import CONVERSATION, EXTRACTION, DIAGNOSIS, CONVERSATION_AFTER, PROCESS_ADDITIONAL_INFO, RE_DIAGNOSIS, FOLLOW_UP
-
-from graph.nodes.conversation import conversation
-from graph.nodes.extraction import extraction
-from graph.nodes.diagnosis import diagnosis
-from graph.nodes.conversation_after import conversation_after
-from graph.nodes.follow_up_questions import follow_up
-from graph.nodes.process_additional_info import process_additional_info
-from graph.nodes.re_diagnosis import re_diagnosis
+from graph.consts import CONVERSATION, EXTRACTION, DIAGNOSIS, CONVERSATION_AFTER, PROCESS_ADDITIONAL_INFO, RE_DIAGNOSIS, FOLLOW_UP, END
 
 from graph.state import GraphState
 
@@ -84,67 +76,83 @@ def decide_to_conversation_or_follow_up_question(state: GraphState) -> str:
         return FOLLOW_UP
 
 
-workflow = StateGraph(GraphState)
-workflow.add_node(CONVERSATION, conversation)
-workflow.add_node(EXTRACTION, extraction)
-workflow.add_node(DIAGNOSIS, diagnosis)
-workflow.add_node(FOLLOW_UP, follow_up)
-workflow.add_node(PROCESS_ADDITIONAL_INFO, process_additional_info)
-workflow.add_node(RE_DIAGNOSIS, re_diagnosis)
-workflow.add_node(CONVERSATION_AFTER, conversation_after)
-
-workflow.set_entry_point(CONVERSATION)
-
-workflow.add_conditional_edges(
-    CONVERSATION,
-    decide_to_extraction,
-    path_map={
-        CONVERSATION: CONVERSATION,
-        EXTRACTION: EXTRACTION,
-    },
-)
-
-workflow.add_edge(EXTRACTION, DIAGNOSIS)
-
-workflow.add_conditional_edges(
-    DIAGNOSIS,
-    decide_to_conversation_or_follow_up_question,
-    path_map={
-        CONVERSATION_AFTER: CONVERSATION_AFTER,
-        FOLLOW_UP: FOLLOW_UP
-    },
-)
-
-workflow.add_conditional_edges(
-    FOLLOW_UP,
-    decide_to_process,
-    path_map={
-        FOLLOW_UP: FOLLOW_UP,
-        PROCESS_ADDITIONAL_INFO: PROCESS_ADDITIONAL_INFO,
-    },
-)
-
-workflow.add_edge(PROCESS_ADDITIONAL_INFO, RE_DIAGNOSIS)
-
-workflow.add_conditional_edges(
-    RE_DIAGNOSIS,
-    decide_to_conversation_or_follow_up_question,
-    path_map={
-        CONVERSATION_AFTER: CONVERSATION_AFTER,
-        FOLLOW_UP: FOLLOW_UP
-    },
-)
-
-workflow.add_conditional_edges(
-    CONVERSATION_AFTER,
-    decide_to_extraction_after,
-    path_map={
-        CONVERSATION_AFTER: CONVERSATION_AFTER,
-        PROCESS_ADDITIONAL_INFO: PROCESS_ADDITIONAL_INFO,
-        END: END,
-    },
-)
-
-app = workflow.compile()
-
-app.get_graph().draw_mermaid_png(output_file_path="graph.png")
\ No newline at end of file
+def build_workflow():
+    """
+    The uncompiled graph. LangGraph and the node modules (with their chains) are imported here, not at import time.
+
+    The conversation nodes still have the interactive loop's interface (the user's message as a
+    second argument, a tuple returned), so the compiled graph is built and rendered but not run;
+    the API drives the same chains through services.chat.
+    """
+    from langgraph.graph import StateGraph
+
+    from graph.nodes import conversation, extraction, diagnosis, follow_up, process_additional_info, re_diagnosis, conversation_after
+
+    workflow = StateGraph(GraphState)
+    workflow.add_node(CONVERSATION, conversation)
+    workflow.add_node(EXTRACTION, extraction)
+    workflow.add_node(DIAGNOSIS, diagnosis)
+    workflow.add_node(FOLLOW_UP, follow_up)
+    workflow.add_node(PROCESS_ADDITIONAL_INFO, process_additional_info)
+    workflow.add_node(RE_DIAGNOSIS, re_diagnosis)
+    workflow.add_node(CONVERSATION_AFTER, conversation_after)
+
+    workflow.set_entry_point(CONVERSATION)
+
+    workflow.add_conditional_edges(
+        CONVERSATION,
+        decide_to_extraction,
+        path_map={
+            CONVERSATION: CONVERSATION,
+            EXTRACTION: EXTRACTION,
+        },
+    )
+
+    workflow.add_edge(EXTRACTION, DIAGNOSIS)
+
+    workflow.add_conditional_edges(
+        DIAGNOSIS,
+        decide_to_conversation_or_follow_up_question,
+        path_map={
+            CONVERSATION_AFTER: CONVERSATION_AFTER,
+            FOLLOW_UP: FOLLOW_UP
+        },
+    )
+
+    workflow.add_conditional_edges(
+        FOLLOW_UP,
+        decide_to_process,
+        path_map={
+            FOLLOW_UP: FOLLOW_UP,
+            PROCESS_ADDITIONAL_INFO: PROCESS_ADDITIONAL_INFO,
+        },
+    )
+
+    workflow.add_edge(PROCESS_ADDITIONAL_INFO, RE_DIAGNOSIS)
+
+    workflow.add_conditional_edges(
+        RE_DIAGNOSIS,
+        decide_to_conversation_or_follow_up_question,
+        path_map={
+            CONVERSATION_AFTER: CONVERSATION_AFTER,
+            FOLLOW_UP: FOLLOW_UP
+        },
+    )
+
+    workflow.add_conditional_edges(
+        CONVERSATION_AFTER,
+        decide_to_extraction_after,
+        path_map={
+            CONVERSATION_AFTER: CONVERSATION_AFTER,
+            PROCESS_ADDITIONAL_INFO: PROCESS_ADDITIONAL_INFO,
+            END: END,
+        },
+    )
+
+    return workflow
+
+
+@lru_cache(maxsize=1)
+def get_app():
+    """The compiled graph, built on first use and shared by the process."""
+    return build_workflow().compile()
@@ -1,6 +1,8 @@
 from entities.api_entities import GraphState
+from graph.state import history_rows
+from graph.chains.inputs import conversation_inputs
 from typing import Any, Dict
-from graph.chains.conversation_chain import conversation_chain
+from graph.chains.registry import get_chain
 
 def conversation(state: GraphState, user_message):
     print("\n---CONVERSATION---")
@@ -9,13 +11,17 @@ def conversation(state: GraphState, user_message):
         print("[bold red]Waiting for user input...[/bold red]")
         return {"awaiting_input": True}
 
-    history = state["history"] + f"\nPatient: {user_message}"
     medical_record = state["medical_record"]
     reasoning = state.get("reasoning", "")
     note = state.get("note", "")
 
-    # Generate response
-    response = conversation_chain.invoke({"history": history, "medical_record": medical_record, "reasoning": reasoning, "note": note})
+    # Generate response; the new message is passed apart from the history, as the API does
+    inputs = conversation_inputs(
+        medical_record, reasoning, note, history_rows(state["history"]), user_message,
+        state.get("diseases_already_asked", []), state.get("disease_to_ask", ""),
+    )
+    response = get_chain("conversation").invoke(inputs)
+    history = state["history"] + f"\nPatient: {user_message}"
 
     generation = response.generation
     decision = response.decision
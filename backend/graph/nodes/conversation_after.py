@@ -1,6 +1,7 @@
-from graph.state import GraphState
+from graph.state import GraphState, history_rows
+from graph.chains.inputs import conversation_after_inputs
 from typing import Any, Dict
-from graph.chains.conversation_after_chain import conversation_after_chain
+from graph.chains.registry import get_chain
 from rich import print
 from rich.prompt import Prompt
 
@@ -26,9 +27,10 @@ def conversation_after(state: GraphState, user_message):
     # Generate response
 
     diagnosis_paper = state["diagnosis_paper"]
-    history = state["history"]
+    # The interactive loop has nowhere to send a contact to, so no addresses are offered
+    inputs = conversation_after_inputs(diagnosis_paper, history_rows(state["history"]), user_message, state["medical_record"])
+    response = get_chain("conversation_after").invoke(inputs)
     history = state["history"] + f"\nPatient: {user_message}"
-    response = conversation_after_chain.invoke({"diagnosis": diagnosis_paper, "history": history})
 
     generation = response.generation
     # play_audio(generation)
@@ -1,7 +1,7 @@
 import joblib
 from typing import Any, Dict
 from entities.predicted_diseases_entity import DiagnosisPaper
-from graph.chains.diagnosis_chain import diagnosis_chain
+from graph.chains.registry import get_chain
 from graph.state import GraphState
 from utils.displayer import Displayer
 import threading
@@ -19,7 +19,7 @@ def diagnosis(state: GraphState):
     progress_thread = threading.Thread(target=displayer.display_progress_bar, args=("Processing Diagnosis...",))
     progress_thread.start()
     
-    diagnosis_response = diagnosis_chain.invoke({"history": history, "medical_record": medical_record, "note": note})
+    diagnosis_response = get_chain("diagnosis").invoke({"history": history, "medical_record": medical_record, "note": note})
     # follow_up_questions = diagnosis_response.further_question_to_ask
     # generation = diagnosis_response.generation
     previous_state = "DIAGNOSIS"
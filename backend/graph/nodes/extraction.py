@@ -1,4 +1,4 @@
-from graph.chains.extraction_chain import extraction_chain
+from graph.chains.registry import get_chain
 from graph.state import GraphState
 from typing import Any, Dict
 from utils.displayer import Displayer
@@ -14,7 +14,7 @@ def extraction(state: GraphState) -> Dict[str, Any]:
     progress_thread = threading.Thread(target=displayer.display_progress_bar, args=("Processing Medical Record...",))
     progress_thread.start()
 
-    response = extraction_chain.invoke({"history": history})
+    response = get_chain("extraction").invoke({"history": history})
     
     # Stop the progress bar
     progress_thread.join()
@@ -1,6 +1,6 @@
 from graph.state import GraphState
 from typing import Any, Dict
-from graph.chains.follow_up_questions_chain import follow_up_questions_chain
+from graph.chains.registry import get_chain
 from rich import print
 from rich.prompt import Prompt
 
@@ -29,7 +29,7 @@ def follow_up(state: GraphState)-> Dict[str, Any]:
     medical_record = state["medical_record"]
 
     # Generate response
-    response = follow_up_questions_chain.invoke({"history": history, "questions": questions, "medical_record": medical_record})
+    response = get_chain("follow_up_questions").invoke({"history": history, "questions": questions, "medical_record": medical_record})
 
     generation = response.generation
     # play_audio(generation)
@@ -1,4 +1,4 @@
-from graph.chains.process_additional_info_chain import process_additional_info_chain
+from graph.chains.registry import get_chain
 from graph.state import GraphState
 from typing import Any, Dict
 from utils.displayer import Displayer
@@ -17,7 +17,7 @@ def process_additional_info(state: GraphState)-> Dict[str, Any]:
     progress_thread = threading.Thread(target=displayer.display_progress_bar, args=("Processing Medical Record...",))
     progress_thread.start()
 
-    response = process_additional_info_chain.invoke({"additional_info": additional_info, "medical_record": medical_record})
+    response = get_chain("process_additional_info").invoke({"additional_info": additional_info, "medical_record": medical_record})
 
     # Stop the progress bar
     progress_thread.join()
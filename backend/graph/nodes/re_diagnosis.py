@@ -1,6 +1,6 @@
 import joblib
 from typing import Any, Dict
-from graph.chains.re_diagnosis_chain import re_diagnosis_chain
+from graph.chains.registry import get_chain
 from graph.state import GraphState
 from utils.displayer import Displayer
 import threading
@@ -22,7 +22,7 @@ def re_diagnosis(state: GraphState)-> Dict[str, Any]:
     progress_thread = threading.Thread(target=displayer.display_progress_bar, args=("Processing Diagnosis...",))
     progress_thread.start()
 
-    new_diagnosis = re_diagnosis_chain.invoke({"history": history, "medical_record": medical_record, "diagnosis": diagnosis_response, "additional_info": additional_info})
+    new_diagnosis = get_chain("re_diagnosis").invoke({"history": history, "medical_record": medical_record, "diagnosis": diagnosis_response, "additional_info": additional_info})
 
     # Stop the progress bar
     progress_thread.join()
@@ -0,0 +1,35 @@
+"""
+Render the LangGraph workflow diagram.
+
+Run from backend/:
+    python -m graph.render                      # Mermaid source to graph.mmd, no network
+    python -m graph.render --png graph.png      # PNG rendered locally with pyppeteer
+    python -m graph.render --png graph.png --remote   # PNG rendered by the mermaid.ink API
+
+Nothing renders at import time any more; this is the only place the diagram is produced.
+"""
+import argparse
+
+
+def render(output: str, png: bool = False, remote: bool = False) -> str:
+    from langchain_core.runnables.graph import MermaidDrawMethod
+
+    from graph.graph import get_app
+
+    drawable = get_app().get_graph()
+    if not png:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(drawable.draw_mermaid())
+        return output
+    method = MermaidDrawMethod.API if remote else MermaidDrawMethod.PYPPETEER
+    drawable.draw_mermaid_png(output_file_path=output, draw_method=method)
+    return output
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="graph.mmd", help="Mermaid source file (default graph.mmd)")
+    parser.add_argument("--png", metavar="PATH", help="render a PNG to PATH instead")
+    parser.add_argument("--remote", action="store_true", help="with --png, use the mermaid.ink API instead of a local browser")
+    args = parser.parse_args()
+    print(render(args.png or args.output, png=bool(args.png), remote=args.remote))
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import List, NamedTuple, Optional
 from typing_extensions import TypedDict
 from entities.medical_record_entity import MedicalRecord
 from entities.predicted_diseases_entity import DiagnosisPaper, DiagnosisResponse
@@ -14,4 +14,25 @@ class GraphState(TypedDict):
     diagnosis_response: DiagnosisResponse
     additional_info: str = ""
     follow_up_questions: Optional[List[str]] = None
-    previous_state: str = "CONVERSATION"
\ No newline at end of file
+    previous_state: str = "CONVERSATION"
+
+
+class HistoryRow(NamedTuple):
+    """One line of the state's transcript, shaped like the ChatHistory rows the chain inputs take."""
+    role: str
+    content: str
+
+
+def history_rows(history: str) -> List[HistoryRow]:
+    """Split the "Patient: ..." / "You: ..." transcript kept in GraphState.history into rows."""
+    rows: List[HistoryRow] = []
+    for line in (history or "").splitlines():
+        for prefix, role in (("Patient:", "human"), ("You:", "ai")):
+            if line.startswith(prefix):
+                rows.append(HistoryRow(role, line[len(prefix):].strip()))
+                break
+        else:
+            # Continuation of a multi-line message
+            if rows and line.strip():
+                rows[-1] = rows[-1]._replace(content=f"{rows[-1].content}\n{line}")
+    return rows
@@ -8,12 +8,24 @@ from services.record.router import router as record_router
 from services.history.router import router as history_router
 from services.todo.router import router as todo_router
 from services.contact.router import router as contact_router
+from services.metrics.router import router as metrics_router
+from services.health.router import router as health_router
+from services.health.warmup import get_warm_up
+from services.login.token_cache import get_token_cache
+from services.login.security import get_password_hasher
 
 app = FastAPI()
 
 @app.on_event('startup')
-def _startup():
-    create_db_and_tables()
+async def _startup():
+    await create_db_and_tables()
+    get_token_cache().start()
+    get_warm_up().start()
+
+@app.on_event('shutdown')
+async def _shutdown():
+    await get_token_cache().stop()
+    get_password_hasher().shutdown()
 
 @app.get("/")
 def read_root():
@@ -33,6 +45,8 @@ app.include_router(record_router)
 app.include_router(history_router)
 app.include_router(todo_router)
 app.include_router(contact_router)
+app.include_router(metrics_router)
+app.include_router(health_router)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8080, reload=True)
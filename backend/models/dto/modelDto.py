@@ -100,9 +100,21 @@ class ChatMessageDto(BaseModel):
 class GetChatHistoryRequest(BaseModel):
     user_id: str
     record_id: str
+    limit: int = Field(50, ge=1, le=200)
+    # At most one of these: older page before a cursor, newer messages after a cursor,
+    # or newer messages after a time (delta polling)
+    before: Optional[str] = None
+    after: Optional[str] = None
+    since: Optional[datetime] = None
 
 class GetChatHistoryResponse(BaseModel):
     history: List[ChatMessageDto]
+    # Pass as `before` for the previous (older) page
+    before_cursor: Optional[str] = None
+    # Pass as `after` to fetch what is newer than this page
+    after_cursor: Optional[str] = None
+    # More messages beyond this page in the requested direction
+    has_more: bool = False
 
 class Reasoning(BaseModel):
     class PredictedDisease(BaseModel):
@@ -129,6 +141,9 @@ class AIStateData(BaseModel):
     decision: str
     diseases_already_asked: Set[str] = Field(default_factory=set)
     disease_to_ask: Optional[str] = None
+    # Rolling summary of chat history[:summarized_count], see services/chat/history_compaction.py
+    history_summary: str = ""
+    summarized_count: int = 0
 
 class ChatTextRequest(BaseModel):
     user_id: str
@@ -180,6 +195,9 @@ class GetCurrentRecordResponse(BaseModel):
 
 class GetAllChatHistoryRequest(BaseModel):
     user_id: str
+    limit: int = Field(30, ge=1, le=100)
+    # next_cursor of the previous page
+    cursor: Optional[str] = None
 
 # --- TODO DTOs ---
 class GetCurrentTodoRequest(BaseModel):
@@ -189,11 +207,15 @@ class GetCurrentTodoRequest(BaseModel):
 class TodoItem(BaseModel):
     text: str
     is_check: bool = False
+    # Index of the todo in the record's list
+    position: Optional[int] = None
 
 class GetCurrentTodoResponse(BaseModel):
     user_id: str
     record_id: str
     items: List[TodoItem]
+    # Bumped by every change of the record's todos; send it back with updates
+    version: int = 0
 
 class UpdateTodoItemRequest(BaseModel):
     user_id: str
@@ -204,6 +226,24 @@ class UpdateTodoItemRequest(BaseModel):
 class UpdateTodoItemResponse(GetCurrentTodoResponse):
     pass
 
+class TodoCheckOp(BaseModel):
+    position: int = Field(ge=0)
+    is_check: bool
+
+class UpdateTodoChecksRequest(BaseModel):
+    user_id: str
+    record_id: Optional[str] = None
+    # Version the client last saw; a newer one on the server fails with 409
+    version: Optional[int] = None
+    ops: List[TodoCheckOp] = Field(min_length=1, max_length=200)
+
+class UpdateTodoChecksResponse(BaseModel):
+    user_id: str
+    record_id: str
+    version: int
+    # Only the todos changed by the request
+    items: List[TodoItem]
+
 # --- Contact DTOs ---
 class SendContactRequest(BaseModel):
     user_id: str
@@ -222,12 +262,20 @@ class PatientCard(BaseModel):
     full_name: str
     age: int
     address: str
+    status: str = "new"
+    last_message_at: Optional[datetime] = None
 
 class ListPatientsRequest(BaseModel):
     doctor_id: str
+    # Optional case-insensitive prefix of the patient's name
+    full_name: Optional[str] = None
+    limit: int = Field(50, ge=1, le=200)
+    # next_cursor of the previous page
+    cursor: Optional[str] = None
 
 class ListPatientsResponse(BaseModel):
     patients: List[PatientCard]
+    next_cursor: Optional[str] = None
 
 class GetContactDetailRequest(BaseModel):
     contact_id: str
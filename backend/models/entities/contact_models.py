@@ -5,13 +5,26 @@ from typing import Optional, Any, Dict
 from uuid import UUID as PyUUID, uuid4
 
 from sqlmodel import SQLModel, Field
-from sqlalchemy import Column, DateTime, func, JSON, String, Boolean, UniqueConstraint
+from sqlalchemy import Column, DateTime, func, String, Boolean, Integer, LargeBinary, UniqueConstraint, Index
+
+from models.entities.model import JSONType, clock_now
 
 
 class Contact(SQLModel, table=True):
     __tablename__ = "contacts"
+    # Fetch server defaults (created_at, updated_at, ...) with RETURNING during the flush
+    __mapper_args__ = {"eager_defaults": True}
     __table_args__ = (
         UniqueConstraint("patient_id", "record_id", name="uq_contact_patient_record"),
+        # Doctor inbox (newest first, keyset on (created_at, id)); INCLUDE makes the card
+        # listing an index-only scan on PostgreSQL
+        Index(
+            "ix_contacts_inbox",
+            "address", "facility", "created_at", "id",
+            postgresql_include=["patient_id", "patient_name", "birth_year", "patient_address", "status", "last_message_at"],
+        ),
+        # A patient's contacts (newest first)
+        Index("ix_contacts_patient_created", "patient_id", "created_at"),
     )
 
     id: PyUUID = Field(default_factory=uuid4, primary_key=True, index=True)
@@ -27,12 +40,46 @@ class Contact(SQLModel, table=True):
 
     include_conversation: bool = Field(sa_column=Column(Boolean, nullable=False, server_default="0"))
 
-    # Snapshot payload for convenience: medical_record, diagnosis, todo, conversation
-    payload: Dict[str, Any] = Field(
+    # Patient card, copied from the payload at creation so the inbox does not read the payload
+    patient_name: str = Field(default="", sa_column=Column(String(255), nullable=False, server_default=""))
+    birth_year: Optional[int] = Field(default=None, sa_column=Column(Integer, nullable=True))
+    patient_address: Optional[str] = Field(default=None, sa_column=Column(String(255), nullable=True))
+    # "new" until a doctor replies, then "assigned"
+    status: str = Field(default="new", sa_column=Column(String(16), nullable=False, server_default="new"))
+    last_message_at: Optional[datetime] = Field(default=None, sa_column=Column(DateTime(timezone=True), nullable=True))
+
+    # Snapshot of the record at send time: section name (medical_record, diagnosis, todos,
+    # conversation, ...) -> hash of its SnapshotBlob, or None for an empty section
+    payload_refs: Dict[str, Optional[str]] = Field(
         default_factory=dict,
-        sa_column=Column(JSON, nullable=False, server_default="{}"),
+        sa_column=Column(JSONType, nullable=False, server_default="{}"),
     )
 
+    # Part of the inbox keyset, so it needs sub-second precision on SQLite as well
+    created_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, server_default=clock_now())
+    )
+
+
+# Case-insensitive prefix search on the patient name in the inbox
+Index(
+    "ix_contacts_patient_name",
+    func.lower(Contact.__table__.c.patient_name).label("patient_name"),
+    postgresql_ops={"patient_name": "text_pattern_ops"},
+)
+
+
+class SnapshotBlob(SQLModel, table=True):
+    """A compressed contact payload section, stored once and addressed by the hash of its content."""
+    __tablename__ = "snapshot_blobs"
+
+    # sha256 of the canonical JSON of the section
+    hash: str = Field(sa_column=Column(String(64), primary_key=True))
+    # Compression of `data`, e.g. "zlib"
+    codec: str = Field(sa_column=Column(String(16), nullable=False))
+    # Uncompressed size in bytes
+    size: int = Field(sa_column=Column(Integer, nullable=False))
+    data: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     )
@@ -40,6 +87,10 @@ class Contact(SQLModel, table=True):
 
 class ContactMessage(SQLModel, table=True):
     __tablename__ = "contact_messages"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_contact_messages_contact_created", "contact_id", "created_at"),
+    )
 
     id: PyUUID = Field(default_factory=uuid4, primary_key=True, index=True)
     contact_id: PyUUID = Field(foreign_key="contacts.id", index=True)
@@ -7,12 +7,69 @@ from uuid import UUID as PyUUID, uuid4
 import uuid
 
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, DateTime, func, JSON, PrimaryKeyConstraint, String, Boolean, Integer
-from sqlalchemy import text
-from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy import Column, DateTime, func, JSON, PrimaryKeyConstraint, String, Boolean, Integer, Index
+from sqlalchemy import text, literal_column
+from sqlalchemy.dialects.postgresql import JSONB, UUID as PGUUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 # If you're on Postgres and want native UUID + FK, you can optionally use:
 # from sqlalchemy.dialects.postgresql import UUID as pgUUID
 
+# JSONB on PostgreSQL (GIN / expression indexes), plain JSON elsewhere
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+
+class json_text(FunctionElement):
+    """
+    The text at `path` inside a JSON column, e.g. json_text(MedicalRecord.data, "patient_info", "full_name").
+
+    The path is rendered inline rather than bound, so the expression in a query is
+    identical to the one in the expression indexes below and the planner can use them.
+    """
+    type = String()
+    inherit_cache = True
+
+    def __init__(self, column, *path: str):
+        super().__init__(column, *(literal_column(part.replace("'", "''")) for part in path))
+
+
+def _json_path(element):
+    column, *path = element.clauses
+    return column, [part.name for part in path]
+
+
+@compiles(json_text)
+def _json_text_default(element, compiler, **kw):
+    column, path = _json_path(element)
+    return "json_extract(%s, '$%s')" % (compiler.process(column, **kw), "".join('."%s"' % part for part in path))
+
+
+@compiles(json_text, "postgresql")
+def _json_text_postgresql(element, compiler, **kw):
+    column, path = _json_path(element)
+    return "(%s #>> '{%s}')" % (compiler.process(column, **kw), ",".join(path))
+
+
+class clock_now(FunctionElement):
+    """
+    The time at which a row is written. now() is the transaction start on PostgreSQL,
+    which gives every row of one transaction the same timestamp. On SQLite the format
+    matches how SQLAlchemy stores datetimes, so the values compare correctly with bound ones.
+    """
+    type = DateTime(timezone=True)
+    inherit_cache = True
+
+
+@compiles(clock_now)
+def _clock_now_default(element, compiler, **kw):
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+@compiles(clock_now, "postgresql")
+def _clock_now_postgresql(element, compiler, **kw):
+    return "clock_timestamp()"
+
+
 # --- Base schemas (Pydantic-style) ---
 
 class MedicalRecordBase(SQLModel):
@@ -38,6 +95,12 @@ class MedicalRecordRead(MedicalRecordBase):
 
 class MedicalRecord(MedicalRecordBase, table=True):
     __tablename__ = "medical_records"
+    # Fetch server defaults (created_at, updated_at, ...) with RETURNING during the flush
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Latest record of a user; INCLUDE makes it an index-only scan on PostgreSQL
+        Index("ix_medical_records_user_created", "user_id", "created_at", postgresql_include=["record_id"]),
+    )
 
     # Primary key
     record_id: PyUUID = Field(
@@ -59,7 +122,7 @@ class MedicalRecord(MedicalRecordBase, table=True):
     # Flexible form data as JSON
     data: Dict[str, Any] = Field(
         default_factory=dict,
-        sa_column=Column(JSON, nullable=False, server_default="{}"),
+        sa_column=Column(JSONType, nullable=False, server_default="{}"),
     )
 
     # Timestamps
@@ -73,8 +136,14 @@ class MedicalRecord(MedicalRecordBase, table=True):
     # If you later add a relationship:
     # user: Optional["User"] = Relationship(back_populates="medical_records")
 
+# GIN indexes only exist on PostgreSQL; the expression indexes work on SQLite too
+Index("ix_medical_records_data_gin", MedicalRecord.__table__.c.data, postgresql_using="gin", postgresql_ops={"data": "jsonb_path_ops"}).ddl_if(dialect="postgresql")
+Index("ix_medical_records_full_name", json_text(MedicalRecord.__table__.c.data, "patient_info", "full_name"))
+Index("ix_medical_records_chief_complaint", json_text(MedicalRecord.__table__.c.data, "medical_history", "chief_complaint"))
+
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    __mapper_args__ = {"eager_defaults": True}
     id: Optional[uuid.UUID] = Field(
         default=None,
         sa_column=Column(
@@ -88,11 +157,14 @@ class User(SQLModel, table=True):
     role_type: str = Field(sa_column=Column(String(50), nullable=False, server_default="patient"))  # "patient" | "doctor"
     user_metadata: Dict[str, Any] = Field(
         default_factory=dict,
-        sa_column=Column(JSON, nullable=False, server_default="{}"),
+        sa_column=Column(JSONType, nullable=False, server_default="{}"),
         description="Additional user metadata",
     )
     is_active: bool = Field(sa_column=Column(Boolean, nullable=False, server_default="1"))
     token_version: int = Field(sa_column=Column(Integer, nullable=False, server_default="0"))
+    # Kept by MedicalRecordRepo.add_record, so the auth flows need no medical_records lookup
+    latest_record_id: Optional[uuid.UUID] = Field(default=None, sa_column=Column(PGUUID(as_uuid=True), nullable=True))
+    record_count: int = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
     created_at: datetime = Field(
         sa_column=Column(
             DateTime(timezone=True),
@@ -109,15 +181,49 @@ class User(SQLModel, table=True):
         )
     )
 
+# Doctors are matched to contacts by the address / facility in their metadata
+Index(
+    "ix_users_doctor_facility",
+    json_text(User.__table__.c.user_metadata, "address"),
+    json_text(User.__table__.c.user_metadata, "facility"),
+)
+
 class ChatHistory(SQLModel, table=True):
     __tablename__ = "chat_history"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # One conversation in (created_at, id) keyset order, and all conversations of a user in order
+        Index("ix_chat_history_record_user_created_id", "record_id", "user_id", "created_at", "id"),
+        Index("ix_chat_history_user_created", "user_id", "created_at"),
+    )
 
     id: PyUUID = Field(default_factory=uuid4, primary_key=True, index=True)
     record_id: PyUUID = Field(foreign_key="medical_records.record_id", index=True)
     user_id: PyUUID = Field(index=True)
     role: str                           # "user" | "ai" | "system"
     content: str
+    # Per-row clock (not the transaction start), so messages saved together keep their order
     created_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, server_default=clock_now())
+    )
+
+# --- Conversation list ---
+class ConversationSummary(SQLModel, table=True):
+    """One row per conversation, kept up to date by ChatHistoryRepo.add_messages for the history list."""
+    __tablename__ = "conversation_summaries"
+    __table_args__ = (
+        PrimaryKeyConstraint("record_id", "user_id", name="pk_conversation_summaries"),
+        # A user's conversations by last activity, keyset-paginated on (updated_at, record_id)
+        Index("ix_conversation_summaries_user_updated", "user_id", "updated_at", "record_id"),
+    )
+
+    record_id: PyUUID = Field(foreign_key="medical_records.record_id")
+    user_id: PyUUID = Field(foreign_key="users.id")
+    # First 100 characters of the last message
+    last_message: str = Field(sa_column=Column(String(100), nullable=False, server_default=""))
+    chief_complaint: Optional[str] = Field(default=None, sa_column=Column(String(1024), nullable=True))
+    # created_at of the last message
+    updated_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     )
 
@@ -134,12 +240,27 @@ class AIState(AIStateBase, table=True):
     user_id: PyUUID = Field(index=True)
     data: Dict[str, Any] = Field(
         default_factory=dict,
-        sa_column=Column(JSON, nullable=False, server_default="{}"),
+        sa_column=Column(JSONType, nullable=False, server_default="{}"),
     )
 
+Index("ix_ai_state_data_gin", AIState.__table__.c.data, postgresql_using="gin", postgresql_ops={"data": "jsonb_path_ops"}).ddl_if(dialect="postgresql")
+Index("ix_ai_state_decision", json_text(AIState.__table__.c.data, "decision"))
+
 # --- TODO model ---
 class Todo(SQLModel, table=True):
     __tablename__ = "todos"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Listing skips the empty placeholder row, so the index does too
+        Index(
+            "ix_todos_user_record_position",
+            "user_id", "record_id", "position", "created_at",
+            postgresql_where=text("text <> ''"),
+            sqlite_where=text("text <> ''"),
+            postgresql_include=["text", "is_check"],
+        ),
+        Index("ix_todos_user_record_created", "user_id", "record_id", "created_at"),
+    )
 
     id: PyUUID = Field(default_factory=uuid4, primary_key=True, index=True)
     user_id: PyUUID = Field(foreign_key="users.id", index=True)
@@ -151,16 +272,49 @@ class Todo(SQLModel, table=True):
         sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     )
 
+class TodoList(SQLModel, table=True):
+    """Version counter of a record's todos, bumped by every change, for optimistic concurrency."""
+    __tablename__ = "todo_lists"
+    __table_args__ = (
+        PrimaryKeyConstraint("record_id", "user_id", name="pk_todo_lists"),
+    )
+
+    record_id: PyUUID = Field(foreign_key="medical_records.record_id")
+    user_id: PyUUID = Field(foreign_key="users.id")
+    version: int = Field(sa_column=Column(Integer, nullable=False, server_default="0"))
+
 # --- Diagnosis model ---
 class Diagnosis(SQLModel, table=True):
     __tablename__ = "diagnoses"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        Index("ix_diagnoses_user_record_created", "user_id", "record_id", "created_at"),
+    )
 
     id: PyUUID = Field(default_factory=uuid4, primary_key=True, index=True)
     user_id: PyUUID = Field(foreign_key="users.id", index=True)
     record_id: PyUUID = Field(foreign_key="medical_records.record_id", index=True)
     reasoning_process: str = Field(sa_column=Column(String(4096), nullable=False))
-    diagnosis: Dict[str, Any] = Field(sa_column=Column(JSON, nullable=False, server_default="{}"))
-    further_test: Dict[str, Any] = Field(sa_column=Column(JSON, nullable=False, server_default="{}"))
+    diagnosis: Dict[str, Any] = Field(sa_column=Column(JSONType, nullable=False, server_default="{}"))
+    further_test: Dict[str, Any] = Field(sa_column=Column(JSONType, nullable=False, server_default="{}"))
     created_at: datetime = Field(
         sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     )
+
+# --- Pending (speculative) diagnosis ---
+class PendingDiagnosis(SQLModel, table=True):
+    __tablename__ = "pending_diagnoses"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        PrimaryKeyConstraint("record_id", "user_id", name="pk_pending_diagnoses"),
+    )
+
+    record_id: PyUUID = Field(foreign_key="medical_records.record_id")
+    user_id: PyUUID = Field(foreign_key="users.id")
+    status: str = Field(sa_column=Column(String(16), nullable=False, server_default="running"))  # "running" | "ready" | "failed"
+    # Number of chat_history rows the diagnosis was computed from; a mismatch means it is stale
+    history_count: int = Field(sa_column=Column(Integer, nullable=False, server_default="0"))
+    result: Dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSONType, nullable=False, server_default="{}"))
+    updated_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    )
@@ -15,3 +15,14 @@ __all__ = [
 from .contact_repo import ContactRepo
 __all__.append('ContactRepo')
 
+from .pending_diagnosis_repo import PendingDiagnosisRepo
+__all__.append('PendingDiagnosisRepo')
+
+from .unit_of_work import unit_of_work
+__all__.append('unit_of_work')
+
+from .conversation_summary_repo import ConversationSummaryRepo
+__all__.append('ConversationSummaryRepo')
+
+from .snapshot_repo import SnapshotRepo
+__all__.append('SnapshotRepo')
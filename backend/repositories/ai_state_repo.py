@@ -1,21 +1,29 @@
 # repositories/ai_state_repo.py
-from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from sqlalchemy.dialects.postgresql import insert as pg_insert
-from sqlalchemy import literal_column
-from models.entities.model import AIState
+from sqlalchemy import func
+from models.entities.model import AIState, json_text
 from fastapi import HTTPException
+from repositories.dialect import dialect_insert
+from repositories.unit_of_work import commit_or_flush, rollback_unless_in_unit_of_work
+from repositories.working_set import get_working_set
+import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 from uuid import UUID
 
 logger = logging.getLogger(__name__)
 
 class AIStateRepo:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        self.cache = get_working_set()
 
-    def get_ai_state(self, record_id: UUID, user_id: UUID) -> AIState:
+    async def get_ai_state(self, record_id: UUID, user_id: UUID) -> AIState:
+        cached = await self.cache.get("state", record_id, user_id)
+        if cached is not None:
+            return cached
         try:
             # populate_existing=True forces SQLAlchemy to refresh an already-loaded
             # instance in the identity map with fresh DB values. This avoids stale
@@ -28,10 +36,11 @@ class AIStateRepo:
                 )
                 .execution_options(populate_existing=True)
             )
-            state = self.db.exec(stmt).first()
+            state = (await self.db.exec(stmt)).first()
             if not state:
                 raise HTTPException(status_code=404, detail="AI State not found.")
             logger.info("AI State retrieved: %s", record_id)
+            await self.cache.fill("state", record_id, user_id, state)
             return state
         except SQLAlchemyError as e:
             logger.exception("DB error retrieving state %s", record_id)
@@ -40,35 +49,83 @@ class AIStateRepo:
                 detail="Database error occurred while retrieving the state.",
             ) from e
 
-    # repositories/ai_state_repo.py
-    def add_ai_state(self, *, user_id: UUID, record_id: UUID, data: Dict[str, Any]) -> AIState:
-        table = AIState.__table__
+    async def list_record_ids_by_decision(self, *, user_id: UUID, decision: str) -> List[UUID]:
+        """Records of a user whose conversation is at the given stage (decision), via ix_ai_state_decision."""
+        try:
+            stmt = select(AIState.record_id).where(
+                AIState.user_id == user_id,
+                json_text(AIState.data, "decision") == decision,
+            )
+            return list((await self.db.exec(stmt)).all())
+        except SQLAlchemyError as e:
+            logger.exception("DB error listing states of user %s", user_id)
+            raise HTTPException(
+                status_code=500,
+                detail="Database error occurred while retrieving the state.",
+            ) from e
+
+    async def _upsert(self, *, user_id: UUID, record_id: UUID, data: Dict[str, Any], merged_data) -> AIState:
+        insert = dialect_insert(self.db, AIState)
         stmt = (
-            pg_insert(table)
-            .values(record_id=record_id, user_id=user_id, data=data)
+            insert.values(record_id=record_id, user_id=user_id, data=data)
             .on_conflict_do_update(
-                index_elements=[table.c.record_id, table.c.user_id],
-                set_={"data": literal_column("EXCLUDED.data")}
+                index_elements=[AIState.record_id, AIState.user_id],
+                set_={"data": merged_data(insert.excluded.data)},
             )
-            .returning(*table.c)
+            # Hydrate the ORM object from RETURNING; populate_existing overwrites a stale
+            # instance of the same row already in the identity map
+            .returning(AIState)
+            .execution_options(populate_existing=True)
         )
-        # Avoid autoflush surprises during raw SQL
-        with self.db.no_autoflush:
-            row = self.db.exec(stmt).first()
-        # No commit here. Let the service do it.
-        # If you want an ORM instance, refetch with the same session (still no commit):
-        return self.get_ai_state(record_id=record_id, user_id=user_id)
+        try:
+            # Avoid autoflush surprises during the raw upsert
+            with self.db.no_autoflush:
+                state = (await self.db.exec(stmt)).scalars().one()
+            # RETURNING gave the whole stored state, merged or not
+            self.cache.after_commit(self.db, lambda cache: cache.put("state", record_id, user_id, state))
+            await commit_or_flush(self.db)
+            return state
+        except SQLAlchemyError as e:
+            await rollback_unless_in_unit_of_work(self.db)
+            logger.exception("DB error upserting state %s", record_id)
+            raise HTTPException(
+                status_code=500,
+                detail="Database error occurred while saving the state.",
+            ) from e
+
+    async def add_ai_state(self, *, user_id: UUID, record_id: UUID, data: Dict[str, Any]) -> AIState:
+        """Insert or replace the whole state in one round trip."""
+        return await self._upsert(user_id=user_id, record_id=record_id, data=data, merged_data=lambda new: new)
+
+    async def merge_ai_state(self, *, user_id: UUID, record_id: UUID, patch: Dict[str, Any]) -> AIState:
+        """
+        Set only the given top-level keys of the state, keeping the others.
+        Inserts `patch` as the whole state when there is no row yet.
+        """
+        if self.db.bind.dialect.name == "postgresql":
+            def merged_data(_new):
+                return AIState.data.op("||")(_new)
+        else:
+            def merged_data(_new):
+                # json_set(data, '$."k1"', json(:v1), ...): values are bound as JSON text so
+                # nested objects and lists stay JSON instead of becoming strings
+                args = []
+                for key, value in patch.items():
+                    args.append('$."%s"' % str(key).replace('"', '\\"'))
+                    args.append(func.json(json.dumps(value, ensure_ascii=False)))
+                return func.json_set(AIState.data, *args) if args else AIState.data
+        return await self._upsert(user_id=user_id, record_id=record_id, data=patch, merged_data=merged_data)
 
 
-    def update_state(self, state: AIState):
+    async def update_state(self, state: AIState):
         try:
             self.db.add(state)
-            self.db.commit()
-            self.db.refresh(state)
+            self.cache.after_commit(self.db, lambda cache: cache.invalidate(state.record_id, state.user_id, ("state",)))
+            await commit_or_flush(self.db)
             logger.info(f"state updated successfully: {state.record_id}")
             return state
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await rollback_unless_in_unit_of_work(self.db)
             logger.error(f"SQLAlchemyError while updating state {state.record_id}: {str(e)}")
             raise HTTPException(
                 status_code=500,
@@ -1,26 +1,37 @@
 from models.entities.model import ChatHistory
-from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from sqlalchemy import insert, tuple_
 from sqlalchemy.exc import SQLAlchemyError
 from fastapi import HTTPException
+from repositories.conversation_summary_repo import ConversationSummaryRepo
+from repositories.unit_of_work import unit_of_work
+from repositories.working_set import get_working_set
 import logging
 import datetime
-from typing import Dict, Any, Optional, Sequence
-from uuid import UUID
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from uuid import UUID, uuid4
 
 logger = logging.getLogger(__name__)
 
 class ChatHistoryRepo:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        self.cache = get_working_set()
 
-    def get_chat_history(self, record_id: UUID, user_id: UUID) -> ChatHistory:
+    async def get_chat_history(self, record_id: UUID, user_id: UUID) -> ChatHistory:
+        cached = await self.cache.get("history", record_id, user_id)
+        if cached is not None:
+            return cached
         try:
             stmt = (
                 select(ChatHistory)
                 .where(ChatHistory.record_id == record_id, ChatHistory.user_id == user_id)
-                .order_by(ChatHistory.created_at.asc())
+                .order_by(ChatHistory.created_at.asc(), ChatHistory.id.asc())
             )
-            return self.db.exec(stmt).all()
+            rows = (await self.db.exec(stmt)).all()
+            await self.cache.fill("history", record_id, user_id, rows)
+            return rows
         except SQLAlchemyError as e:
             logger.exception("DB error retrieving record %s", record_id)
             raise HTTPException(
@@ -28,22 +39,52 @@ class ChatHistoryRepo:
                 detail="Database error occurred while retrieving the record.",
             ) from e
         
-    def get_all_chat_history(self, user_id: UUID) -> ChatHistory:
+    async def get_chat_history_page(
+        self,
+        *,
+        record_id: UUID,
+        user_id: UUID,
+        limit: int,
+        before: Optional[Tuple[datetime.datetime, UUID]] = None,
+        after: Optional[Tuple[datetime.datetime, UUID]] = None,
+        since: Optional[datetime.datetime] = None,
+    ) -> Tuple[List[ChatHistory], bool]:
+        """
+        One page of a conversation, keyset-paginated on (created_at, id).
+
+        Without `after` / `since` the page is the `limit` newest messages older than `before`
+        (or the newest overall); with them it is the `limit` oldest messages newer than that
+        position. Messages are returned oldest first, with whether more exist beyond the page.
+        """
         try:
-            stmt = (
-                select(ChatHistory)
-                .where(ChatHistory.user_id == user_id)
-                .order_by(ChatHistory.created_at.asc())
-            )
-            return self.db.exec(stmt).all()
+            key = tuple_(ChatHistory.created_at, ChatHistory.id)
+            stmt = select(ChatHistory).where(ChatHistory.record_id == record_id, ChatHistory.user_id == user_id)
+            forward = after is not None or since is not None
+            if after is not None:
+                stmt = stmt.where(key > tuple_(*after))
+            elif since is not None:
+                stmt = stmt.where(ChatHistory.created_at > since)
+            elif before is not None:
+                stmt = stmt.where(key < tuple_(*before))
+            if forward:
+                stmt = stmt.order_by(ChatHistory.created_at.asc(), ChatHistory.id.asc())
+            else:
+                stmt = stmt.order_by(ChatHistory.created_at.desc(), ChatHistory.id.desc())
+            # One extra row tells whether there is another page
+            rows = list((await self.db.exec(stmt.limit(limit + 1))).all())
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            if not forward:
+                rows.reverse()
+            return rows, has_more
         except SQLAlchemyError as e:
-            logger.exception("DB error retrieving chat history for user %s", user_id)
+            logger.exception("DB error retrieving record %s", record_id)
             raise HTTPException(
                 status_code=500,
-                detail="Database error occurred while retrieving the chat history.",
+                detail="Database error occurred while retrieving the record.",
             ) from e
-    
-    def add_messages(
+
+    async def add_messages(
         self,
         *,
         user_id: UUID,
@@ -54,32 +95,34 @@ class ChatHistoryRepo:
         if not messages:
             raise HTTPException(status_code=400, detail="messages must be non-empty")
         try:
-            rows: list[ChatHistory] = []
-            for msg in messages:
+            # Rows of one batch can share created_at (coarse clocks); ascending ids keep
+            # their (created_at, id) order equal to the insertion order
+            ids = sorted(uuid4() for _ in messages)
+            values: list[dict] = []
+            for msg_id, msg in zip(ids, messages):
                 role = msg.get("role")
                 content = (msg.get("content") or "").strip()
                 if role not in {"human", "ai", "system"}:
                     raise HTTPException(status_code=400, detail=f"invalid role: {role}")
                 if not content:
                     raise HTTPException(status_code=400, detail="content cannot be empty")
+                # created_at is left to the server default
+                values.append({"id": msg_id, "user_id": user_id, "record_id": record_id, "role": role, "content": content})
 
-                row = ChatHistory(
-                    user_id=user_id,
-                    record_id=record_id,
-                    role=role,
-                    content=content,
-                    # do NOT set created_at; let DB server_default handle it
+            # The messages and the conversation summary are saved together
+            async with unit_of_work(self.db):
+                # One multi-row INSERT; no ORM objects, flush or per-row refresh
+                stmt = insert(ChatHistory).values(values).returning(ChatHistory.id, ChatHistory.created_at)
+                created = dict((await self.db.exec(stmt)).all())
+                last = values[-1]
+                await ConversationSummaryRepo(self.db).touch(
+                    user_id=user_id, record_id=record_id, last_message=last["content"], updated_at=created[last["id"]]
                 )
-                self.db.add(row)
-                rows.append(row)
-
-                # If you want DB-generated fields on the objects now:
-            self.db.commit()
+                rows = None
+                if return_rows or self.cache.enabled:
+                    rows = [ChatHistory(created_at=created[v["id"]], **v) for v in values]
+                    self.cache.after_commit(self.db, lambda cache: cache.append_history(record_id, user_id, rows))
             if return_rows:
-                self.db.flush()  # assign PKs
-                for r in rows:
-                    # pull server_default columns like created_at
-                    self.db.refresh(r, attribute_names=["id", "created_at"])
                 return rows
 
             return None  # success, nothing to return
@@ -1,40 +1,79 @@
-﻿from typing import List, Optional, Dict, Any
+﻿from datetime import datetime
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 from fastapi import HTTPException
-from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from sqlalchemy import and_, func, tuple_, update
+from sqlalchemy.orm import load_only
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
 from models.entities.contact_models import Contact, ContactMessage
-from models.entities.model import User
+from models.entities.model import User, json_text
 from repositories.medical_record_repo import MedicalRecordRepo
 from repositories.chat_history_repo import ChatHistoryRepo
 from repositories.todo_repo import TodoRepo
 from repositories.diagnosis_repo import DiagnosisRepo
+from repositories.snapshot_repo import SnapshotRepo
+from repositories.unit_of_work import commit_or_flush, rollback_unless_in_unit_of_work, unit_of_work
+from utils.snapshot import LazySnapshot
+
+
+# Columns of the doctor inbox card; the inbox never loads payload_refs
+CARD_COLUMNS = (
+    Contact.id,
+    Contact.patient_id,
+    Contact.patient_name,
+    Contact.birth_year,
+    Contact.patient_address,
+    Contact.address,
+    Contact.status,
+    Contact.last_message_at,
+    Contact.created_at,
+)
+
+
+def _patient_card(medical_record: Dict[str, Any]) -> Dict[str, Any]:
+    pi = (medical_record or {}).get("patient_info") or {}
+    birth_year = None
+    try:
+        if pi.get("birthday"):
+            birth_year = int(str(pi["birthday"])[0:4])
+        elif pi.get("year_of_birth"):
+            birth_year = int(pi["year_of_birth"])
+    except (TypeError, ValueError):
+        birth_year = None
+    return {
+        "patient_name": str(pi.get("full_name") or "")[:255],
+        "birth_year": birth_year,
+        "patient_address": (str(pi["address"])[:255] if pi.get("address") else None),
+    }
 
 
 class ContactRepo:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.med = MedicalRecordRepo(db)
         self.chat = ChatHistoryRepo(db)
         self.todo = TodoRepo(db)
         self.diag = DiagnosisRepo(db)
+        self.snapshots = SnapshotRepo(db)
 
-    def create_contact(self, *, patient_id: UUID, record_id: UUID, address: str, facility: str, include_conversation: bool) -> Contact:
+    async def create_contact(self, *, patient_id: UUID, record_id: UUID, address: str, facility: str, include_conversation: bool) -> Contact:
         try:
             # Prevent duplicate sends for the same record by the same patient
             exists_stmt = select(Contact).where(
                 Contact.patient_id == patient_id,
                 Contact.record_id == record_id,
             )
-            existing = self.db.exec(exists_stmt).first()
+            existing = (await self.db.exec(exists_stmt)).first()
             if existing:
                 raise HTTPException(status_code=409, detail="This medical record has already been sent")
 
-            record = self.med.get_medical_record_by_id(record_id=record_id, user_id=patient_id)
-            latest_diag = self.diag.get_latest(user_id=patient_id, record_id=record_id)
-            todos = self.todo.list_todos(user_id=patient_id, record_id=record_id)
-            history = self.chat.get_chat_history(user_id=patient_id, record_id=record_id) if include_conversation else []
+            record = await self.med.get_medical_record_by_id(record_id=record_id, user_id=patient_id)
+            latest_diag = await self.diag.get_latest(user_id=patient_id, record_id=record_id)
+            todos = await self.todo.list_todos(user_id=patient_id, record_id=record_id)
+            history = await self.chat.get_chat_history(user_id=patient_id, record_id=record_id) if include_conversation else []
 
             payload: Dict[str, Any] = {
                 "medical_record": record.data,
@@ -50,85 +89,135 @@ class ContactRepo:
                 ] if include_conversation else None,
             }
 
-            row = Contact(
-                patient_id=patient_id,
-                record_id=record_id,
-                address=address,
-                facility=facility,
-                include_conversation=include_conversation,
-                payload=payload,
-            )
-            self.db.add(row)
-            self.db.commit()
-            self.db.refresh(row)
+            # The blobs and the contact referencing them are written together
+            async with unit_of_work(self.db):
+                row = Contact(
+                    patient_id=patient_id,
+                    record_id=record_id,
+                    address=address,
+                    facility=facility,
+                    include_conversation=include_conversation,
+                    payload_refs=await self.snapshots.put_sections(payload),
+                    **_patient_card(record.data),
+                )
+                self.db.add(row)
+                await commit_or_flush(self.db)
             return row
         except IntegrityError as e:
             # Unique constraint violation (edge case race condition)
-            self.db.rollback()
+            await rollback_unless_in_unit_of_work(self.db)
             raise HTTPException(status_code=409, detail="This medical record has already been sent") from e
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await rollback_unless_in_unit_of_work(self.db)
             raise HTTPException(status_code=500, detail="Failed to create contact") from e
 
-    def list_for_doctor(self, *, doctor_id: UUID) -> List[Contact]:
+    async def list_for_doctor(
+        self,
+        *,
+        doctor_id: UUID,
+        limit: int,
+        before: Optional[Tuple[datetime, UUID]] = None,
+        full_name: Optional[str] = None,
+    ) -> Tuple[List[Contact], bool]:
+        """
+        One page of a doctor's inbox, newest first, keyset-paginated on (created_at, id).
+        Only the card columns are loaded; touching `payload_refs` on the results raises
+        (load the contact with get_contact, then its snapshot with get_payload).
+        """
         try:
-            doc = self.db.get(User, doctor_id)
-            if not doc or doc.role_type != "doctor":
-                raise HTTPException(status_code=400, detail="Invalid doctor")
-            meta = doc.user_metadata or {}
-            addr = meta.get("address")
-            fac = meta.get("facility")
-            if not addr or not fac:
-                return []
-            stmt = select(Contact).where(Contact.address == addr, Contact.facility == fac).order_by(Contact.created_at.desc())
-            return self.db.exec(stmt).all()
+            # Match contacts to the doctor's address / facility in SQL instead of loading the doctor first
+            doctor_meta = User.user_metadata
+            stmt = (
+                select(Contact)
+                .options(load_only(*CARD_COLUMNS, raiseload=True))
+                .join(
+                    User,
+                    and_(
+                        User.id == doctor_id,
+                        User.role_type == "doctor",
+                        Contact.address == json_text(doctor_meta, "address"),
+                        Contact.facility == json_text(doctor_meta, "facility"),
+                    ),
+                )
+                .order_by(Contact.created_at.desc(), Contact.id.desc())
+                .limit(limit + 1)
+            )
+            if before is not None:
+                stmt = stmt.where(tuple_(Contact.created_at, Contact.id) < tuple_(*before))
+            if full_name:
+                # Case-insensitive prefix match, served by ix_contacts_patient_name
+                prefix = full_name.strip().lower().replace("/", "//").replace("%", "/%").replace("_", "/_")
+                stmt = stmt.where(func.lower(Contact.patient_name).like(prefix + "%", escape="/"))
+            rows = list((await self.db.exec(stmt)).all())
+            if not rows and before is None:
+                # Only tell an unknown doctor apart from an empty inbox when there is nothing to show
+                doc = await self.db.get(User, doctor_id)
+                if not doc or doc.role_type != "doctor":
+                    raise HTTPException(status_code=400, detail="Invalid doctor")
+            return rows[:limit], len(rows) > limit
         except SQLAlchemyError as e:
             raise HTTPException(status_code=500, detail="DB error listing contacts") from e
 
-    def get_contact(self, *, contact_id: UUID) -> Optional[Contact]:
-        return self.db.get(Contact, contact_id)
+    async def get_contact(self, *, contact_id: UUID) -> Optional[Contact]:
+        return await self.db.get(Contact, contact_id)
+
+    async def get_payload(self, contact: Contact) -> LazySnapshot:
+        """The contact's snapshot payload; each section is decompressed on first access."""
+        return await self.snapshots.load(contact.payload_refs or {})
 
-    def get_messages(self, *, contact_id: UUID) -> List[ContactMessage]:
+    async def get_messages(self, *, contact_id: UUID) -> List[ContactMessage]:
         try:
             stmt = select(ContactMessage).where(ContactMessage.contact_id == contact_id).order_by(ContactMessage.created_at.asc())
-            return self.db.exec(stmt).all()
+            return (await self.db.exec(stmt)).all()
         except SQLAlchemyError as e:
             raise HTTPException(status_code=500, detail="DB error fetching messages") from e
 
-    def add_message(self, *, contact_id: UUID, sender_id: UUID, role: str, content: str) -> ContactMessage:
+    async def add_message(self, *, contact_id: UUID, sender_id: UUID, role: str, content: str) -> ContactMessage:
         try:
             row = ContactMessage(contact_id=contact_id, sender_id=sender_id, role=role, content=(content or "").strip())
             if not row.content:
                 raise HTTPException(status_code=400, detail="Message content cannot be empty")
             self.db.add(row)
-            # assign doctor if first doctor message and none yet
-            contact = self.get_contact(contact_id=contact_id)
-            if role == "doctor" and contact and not contact.assigned_doctor_id:
-                contact.assigned_doctor_id = sender_id
-                self.db.add(contact)
-            self.db.commit()
-            self.db.refresh(row)
+            # created_at is populated by the flush (eager_defaults)
+            await self.db.flush()
+            values: Dict[str, Any] = {"last_message_at": row.created_at}
+            if role == "doctor":
+                # assign doctor if first doctor message and none yet
+                values["assigned_doctor_id"] = func.coalesce(Contact.assigned_doctor_id, sender_id)
+                values["status"] = "assigned"
+            # Update the card in place instead of loading the contact with its payload
+            await self.db.exec(
+                update(Contact)
+                .where(Contact.id == contact_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            await commit_or_flush(self.db)
             return row
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await rollback_unless_in_unit_of_work(self.db)
             raise HTTPException(status_code=500, detail="DB error adding message") from e
 
     
-    def get_my_doctors(self, *, patient_id: UUID) -> list[dict]:
+    async def get_my_doctors(self, *, patient_id: UUID) -> list[dict]:
         try:
             # collect latest contact per doctor
-            stmt = select(Contact).where(Contact.patient_id == patient_id, Contact.assigned_doctor_id.is_not(None)).order_by(Contact.created_at.desc())
-            rows = self.db.exec(stmt).all()
+            stmt = (
+                select(Contact.id, Contact.assigned_doctor_id)
+                .where(Contact.patient_id == patient_id, Contact.assigned_doctor_id.is_not(None))
+                .order_by(Contact.created_at.desc())
+            )
+            rows = (await self.db.exec(stmt)).all()
             latest_by_doctor: dict[UUID, UUID] = {}
-            for c in rows:
-                if not c.assigned_doctor_id:
+            for contact_id, doctor_id in rows:
+                if not doctor_id:
                     continue
-                if c.assigned_doctor_id not in latest_by_doctor:
-                    latest_by_doctor[c.assigned_doctor_id] = c.id
+                if doctor_id not in latest_by_doctor:
+                    latest_by_doctor[doctor_id] = contact_id
             if not latest_by_doctor:
                 return []
             stmt2 = select(User).where(User.id.in_(list(latest_by_doctor.keys())))
-            users = self.db.exec(stmt2).all()
+            users = (await self.db.exec(stmt2)).all()
             result = []
             for u in users:
                 result.append({
@@ -0,0 +1,119 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from sqlalchemy import func, tuple_
+from sqlalchemy.exc import SQLAlchemyError
+from models.entities.model import ChatHistory, ConversationSummary, MedicalRecord, json_text
+from fastapi import HTTPException
+from repositories.dialect import dialect_insert
+from repositories.unit_of_work import commit_or_flush, rollback_unless_in_unit_of_work
+import datetime
+import logging
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_CHARS = 100
+
+
+def _upsert_from(insert):
+    # A slower writer must not replace a newer message with an older one
+    return insert.on_conflict_do_update(
+        index_elements=[ConversationSummary.record_id, ConversationSummary.user_id],
+        set_={
+            "last_message": insert.excluded.last_message,
+            "chief_complaint": insert.excluded.chief_complaint,
+            "updated_at": insert.excluded.updated_at,
+        },
+        where=ConversationSummary.updated_at <= insert.excluded.updated_at,
+    )
+
+
+class ConversationSummaryRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def touch(self, *, user_id: UUID, record_id: UUID, last_message: str, updated_at: datetime.datetime) -> None:
+        """Record a new last message of a conversation; the chief complaint is re-read from the record."""
+        try:
+            chief_complaint = (
+                select(json_text(MedicalRecord.data, "medical_history", "chief_complaint"))
+                .where(MedicalRecord.record_id == record_id)
+                .scalar_subquery()
+            )
+            insert = dialect_insert(self.db, ConversationSummary).values(
+                record_id=record_id,
+                user_id=user_id,
+                last_message=(last_message or "")[:PREVIEW_CHARS],
+                chief_complaint=chief_complaint,
+                updated_at=updated_at,
+            )
+            await self.db.exec(_upsert_from(insert))
+            await commit_or_flush(self.db)
+        except SQLAlchemyError as e:
+            await rollback_unless_in_unit_of_work(self.db)
+            logger.exception("DB error updating conversation summary %s", record_id)
+            raise HTTPException(status_code=500, detail="Database error occurred.") from e
+
+    async def list_for_user(
+        self,
+        *,
+        user_id: UUID,
+        limit: int,
+        before: Optional[Tuple[datetime.datetime, UUID]] = None,
+    ) -> Tuple[List[ConversationSummary], bool]:
+        """A user's conversations, most recently active first, keyset-paginated on (updated_at, record_id)."""
+        try:
+            stmt = select(ConversationSummary).where(ConversationSummary.user_id == user_id)
+            if before is not None:
+                stmt = stmt.where(tuple_(ConversationSummary.updated_at, ConversationSummary.record_id) < tuple_(*before))
+            stmt = stmt.order_by(ConversationSummary.updated_at.desc(), ConversationSummary.record_id.desc()).limit(limit + 1)
+            rows = list((await self.db.exec(stmt)).all())
+            return rows[:limit], len(rows) > limit
+        except SQLAlchemyError as e:
+            logger.exception("DB error listing conversations for user %s", user_id)
+            raise HTTPException(
+                status_code=500,
+                detail="Database error occurred while retrieving the chat history.",
+            ) from e
+
+    async def backfill(self, *, user_id: Optional[UUID] = None) -> None:
+        """
+        (Re)build summaries from chat_history in one statement: the latest message per
+        conversation (window function) joined to its record's chief complaint.
+        """
+        try:
+            latest_first = func.row_number().over(
+                partition_by=(ChatHistory.record_id, ChatHistory.user_id),
+                order_by=(ChatHistory.created_at.desc(), ChatHistory.id.desc()),
+            )
+            ranked = select(
+                ChatHistory.record_id,
+                ChatHistory.user_id,
+                ChatHistory.content,
+                ChatHistory.created_at,
+                latest_first.label("rank"),
+            )
+            if user_id is not None:
+                ranked = ranked.where(ChatHistory.user_id == user_id)
+            ranked = ranked.subquery()
+            latest = (
+                select(
+                    ranked.c.record_id,
+                    ranked.c.user_id,
+                    func.substr(ranked.c.content, 1, PREVIEW_CHARS),
+                    json_text(MedicalRecord.data, "medical_history", "chief_complaint"),
+                    ranked.c.created_at,
+                )
+                .join(MedicalRecord, MedicalRecord.record_id == ranked.c.record_id)
+                .where(ranked.c.rank == 1)
+            )
+            insert = dialect_insert(self.db, ConversationSummary).from_select(
+                ["record_id", "user_id", "last_message", "chief_complaint", "updated_at"], latest
+            )
+            await self.db.exec(_upsert_from(insert))
+            await commit_or_flush(self.db)
+        except SQLAlchemyError as e:
+            await rollback_unless_in_unit_of_work(self.db)
+            logger.exception("DB error backfilling conversation summaries")
+            raise HTTPException(status_code=500, detail="Database error occurred.") from e
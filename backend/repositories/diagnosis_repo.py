@@ -1,7 +1,9 @@
-from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
 from sqlalchemy.exc import SQLAlchemyError
 from models.entities.model import Diagnosis
 from fastapi import HTTPException
+from repositories.unit_of_work import commit_or_flush, rollback_unless_in_unit_of_work
 import logging
 from typing import Optional
 from uuid import UUID
@@ -9,10 +11,10 @@ from uuid import UUID
 logger = logging.getLogger(__name__)
 
 class DiagnosisRepo:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def add_diagnosis(
+    async def add_diagnosis(
         self,
         *,
         user_id: UUID,
@@ -30,15 +32,14 @@ class DiagnosisRepo:
                 further_test={"items": further_test} if isinstance(further_test, list) else (further_test or {}),
             )
             self.db.add(row)
-            self.db.commit()
-            self.db.refresh(row)
+            await commit_or_flush(self.db)
             return row
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await rollback_unless_in_unit_of_work(self.db)
             logger.exception("DB error adding diagnosis for user %s", user_id)
             raise HTTPException(status_code=500, detail="Database error adding diagnosis.") from e
 
-    def get_latest(self, *, user_id: UUID, record_id: UUID) -> Optional[Diagnosis]:
+    async def get_latest(self, *, user_id: UUID, record_id: UUID) -> Optional[Diagnosis]:
         try:
             stmt = (
                 select(Diagnosis)
@@ -46,7 +47,7 @@ class DiagnosisRepo:
                 .order_by(Diagnosis.created_at.desc())
                 .limit(1)
             )
-            return self.db.exec(stmt).first()
+            return (await self.db.exec(stmt)).first()
         except SQLAlchemyError as e:
             logger.exception("DB error fetching latest diagnosis for user %s", user_id)
             raise HTTPException(status_code=500, detail="Database error fetching diagnosis.") from e
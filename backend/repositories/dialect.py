@@ -0,0 +1,17 @@
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+def dialect_insert(db: AsyncSession, model):
+    """
+    INSERT construct of the session's database, for ON CONFLICT ... RETURNING.
+
+    Both PostgreSQL and SQLite support it, but behind dialect-specific constructs.
+    """
+    dialect = db.bind.dialect.name
+    if dialect == "postgresql":
+        return pg_insert(model)
+    if dialect == "sqlite":
+        return sqlite_insert(model)
+    raise NotImplementedError(f"upsert is not implemented for {dialect}")
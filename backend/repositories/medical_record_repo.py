@@ -1,7 +1,11 @@
-from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from sqlalchemy import update
 from sqlalchemy.exc import SQLAlchemyError
-from models.entities.model import MedicalRecord
+from models.entities.model import MedicalRecord, User
 from fastapi import HTTPException
+from repositories.unit_of_work import commit_or_flush, rollback_unless_in_unit_of_work
+from repositories.working_set import get_working_set
 import logging
 import datetime
 from typing import Dict, Any
@@ -10,23 +14,29 @@ from uuid import UUID
 logger = logging.getLogger(__name__)
 
 class MedicalRecordRepo:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        self.cache = get_working_set()
 
-    def get_medical_record_by_id(self, record_id: UUID, user_id: UUID) -> MedicalRecord:
+    async def get_medical_record_by_id(self, record_id: UUID, user_id: UUID) -> MedicalRecord:
         """
         Fetch a record by id, scoped to the owner (user_id).
         Raises 404 if not found and 500 on DB errors.
+        Served from the working-set cache when the record is in it.
         """
+        cached = await self.cache.get("record", record_id, user_id)
+        if cached is not None:
+            return cached
         try:
             stmt = select(MedicalRecord).where(
                 MedicalRecord.record_id == record_id,
                 MedicalRecord.user_id == user_id,
             )
-            record = self.db.exec(stmt).first()
+            record = (await self.db.exec(stmt)).first()
             if not record:
                 raise HTTPException(status_code=404, detail="Medical record not found.")
             logger.info("MedicalRecord retrieved: %s", record_id)
+            await self.cache.fill("record", record_id, user_id, record)
             return record
         except SQLAlchemyError as e:
             logger.exception("DB error retrieving record %s", record_id)
@@ -35,19 +45,15 @@ class MedicalRecordRepo:
                 detail="Database error occurred while retrieving the record.",
             ) from e
         
-    def get_latest_record_id(self, user_id: UUID) -> UUID | None:
+    async def get_latest_record_id(self, user_id: UUID) -> UUID | None:
         """
         Return the most recently created record_id for a given user.
         Returns None if no records exist.
+        Read from users.latest_record_id, which add_record keeps up to date.
         """
         try:
-            stmt = (
-                select(MedicalRecord.record_id)
-                .where(MedicalRecord.user_id == user_id)
-                .order_by(MedicalRecord.created_at.desc())
-                .limit(1)
-            )
-            result = self.db.exec(stmt).first()
+            stmt = select(User.latest_record_id).where(User.id == user_id)
+            result = (await self.db.exec(stmt)).first()
             return result  # will be None if no rows
         except SQLAlchemyError as e:
             logger.exception("DB error fetching latest record for user %s", user_id)
@@ -58,7 +64,7 @@ class MedicalRecordRepo:
 
 
 
-    def add_record(self, *, user_id: UUID, data: Dict[str, Any]) -> MedicalRecord:
+    async def add_record(self, *, user_id: UUID, data: Dict[str, Any]) -> MedicalRecord:
         """
         Create a new record. Timestamps are handled by the model (server defaults).
         Returns the created record.
@@ -66,46 +72,66 @@ class MedicalRecordRepo:
         try:
             rec = MedicalRecord(user_id=user_id, data=data)
             self.db.add(rec)
-            self.db.commit()
-            self.db.refresh(rec)
+            # Timestamps come back with the flush (eager_defaults)
+            await self.db.flush()
+            # Same transaction, so the user row never points at a rolled back record
+            await self.db.exec(
+                update(User)
+                .where(User.id == user_id)
+                .values(latest_record_id=rec.record_id, record_count=User.record_count + 1)
+            )
+            # A new record has no messages yet, so its (empty) history can be cached too
+            self.cache.after_commit(self.db, lambda cache: cache.put("record", rec.record_id, user_id, rec))
+            self.cache.after_commit(self.db, lambda cache: cache.put("history", rec.record_id, user_id, []))
+            await commit_or_flush(self.db)
             logger.info("MedicalRecord created: %s (user=%s)", rec.record_id, user_id)
             return rec
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await rollback_unless_in_unit_of_work(self.db)
             logger.exception("DB error creating record for user %s", user_id)
             raise HTTPException(
                 status_code=500,
                 detail="Database error occurred while creating the record.",
             ) from e
     
-    def update_record(self, record: MedicalRecord):
+    async def update_record(self, record: MedicalRecord):
+        """
+        Save the record's data. `record` may be a cached, session-less instance, so
+        it is written with an UPDATE by primary key rather than added to the session.
+        """
         try:
-            self.db.add(record)
-            self.db.commit()
-            self.db.refresh(record)
+            stmt = (
+                update(MedicalRecord)
+                .where(MedicalRecord.record_id == record.record_id, MedicalRecord.user_id == record.user_id)
+                .values(data=record.data)
+                .returning(MedicalRecord)
+                .execution_options(populate_existing=True)
+            )
+            saved = (await self.db.exec(stmt)).scalars().one()
+            self.cache.after_commit(self.db, lambda cache: cache.put("record", saved.record_id, saved.user_id, saved))
+            await commit_or_flush(self.db)
             logger.info(f"record updated successfully: {record.record_id}")
-            return record
+            return saved
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await rollback_unless_in_unit_of_work(self.db)
             logger.error(f"SQLAlchemyError while updating record {record.record_id}: {str(e)}")
             raise HTTPException(
                 status_code=500,
                 detail="Database error occurred while updating the record."
             )
     
-    def update_record_status(self, record: MedicalRecord, status, error_message=None):
+    async def update_record_status(self, record: MedicalRecord, status, error_message=None):
         try:
             record.ingress_status = status
             record.update_date = datetime.datetime.now()
             record.error_details = str(error_message)
 
             self.db.add(record)
-            self.db.commit()
-            self.db.refresh(record)
+            await commit_or_flush(self.db)
             logger.info(f"Updated record {record.record_id} status to {status} with error: {error_message}")
             return record
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await rollback_unless_in_unit_of_work(self.db)
             logger.error(f"Error updating status for record {getattr(record, 'record_id', None)}: {e}")
             raise HTTPException(
                 status_code=500,
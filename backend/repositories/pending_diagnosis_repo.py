@@ -0,0 +1,56 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+from models.entities.model import PendingDiagnosis
+from fastapi import HTTPException
+from repositories.unit_of_work import commit_or_flush, rollback_unless_in_unit_of_work
+import logging
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+logger = logging.getLogger(__name__)
+
+class PendingDiagnosisRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, *, user_id: UUID, record_id: UUID) -> Optional[PendingDiagnosis]:
+        try:
+            return await self.db.get(PendingDiagnosis, (record_id, user_id), populate_existing=True)
+        except SQLAlchemyError as e:
+            logger.exception("DB error fetching pending diagnosis for record %s", record_id)
+            raise HTTPException(status_code=500, detail="Database error fetching pending diagnosis.") from e
+
+    async def set_status(
+        self,
+        *,
+        user_id: UUID,
+        record_id: UUID,
+        status: str,
+        history_count: int,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> PendingDiagnosis:
+        try:
+            row = await self.db.get(PendingDiagnosis, (record_id, user_id))
+            if row is None:
+                row = PendingDiagnosis(record_id=record_id, user_id=user_id)
+            row.status = status
+            row.history_count = history_count
+            row.result = result or {}
+            self.db.add(row)
+            await commit_or_flush(self.db)
+            return row
+        except SQLAlchemyError as e:
+            await rollback_unless_in_unit_of_work(self.db)
+            logger.exception("DB error saving pending diagnosis for record %s", record_id)
+            raise HTTPException(status_code=500, detail="Database error saving pending diagnosis.") from e
+
+    async def delete(self, *, user_id: UUID, record_id: UUID) -> None:
+        try:
+            row = await self.db.get(PendingDiagnosis, (record_id, user_id))
+            if row is not None:
+                await self.db.delete(row)
+                await commit_or_flush(self.db)
+        except SQLAlchemyError as e:
+            await rollback_unless_in_unit_of_work(self.db)
+            logger.exception("DB error deleting pending diagnosis for record %s", record_id)
+            raise HTTPException(status_code=500, detail="Database error deleting pending diagnosis.") from e
@@ -0,0 +1,62 @@
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select
+from sqlalchemy.exc import SQLAlchemyError
+from models.entities.contact_models import SnapshotBlob
+from fastapi import HTTPException
+from repositories.dialect import dialect_insert
+from repositories.unit_of_work import commit_or_flush, rollback_unless_in_unit_of_work
+from utils.snapshot import CODEC, LazySnapshot, encode_section
+import logging
+from typing import Any, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def put_sections(self, sections: Mapping[str, Any]) -> Dict[str, Optional[str]]:
+        """
+        Store each non-empty section as a compressed blob and return section -> hash.
+
+        Blobs are content-addressed: a section already stored by another contact is
+        not written again.
+        """
+        refs: Dict[str, Optional[str]] = {}
+        rows: Dict[str, Dict[str, Any]] = {}
+        for name, value in sections.items():
+            if value is None:
+                refs[name] = None
+                continue
+            digest, data, size = encode_section(value)
+            refs[name] = digest
+            rows[digest] = {"hash": digest, "codec": CODEC, "size": size, "data": data}
+        if not rows:
+            return refs
+        try:
+            insert = dialect_insert(self.db, SnapshotBlob).values(list(rows.values()))
+            await self.db.exec(insert.on_conflict_do_nothing(index_elements=[SnapshotBlob.hash]))
+            await commit_or_flush(self.db)
+            return refs
+        except SQLAlchemyError as e:
+            await rollback_unless_in_unit_of_work(self.db)
+            logger.exception("DB error storing snapshot blobs")
+            raise HTTPException(status_code=500, detail="Database error occurred.") from e
+
+    async def load(self, refs: Mapping[str, Optional[str]]) -> LazySnapshot:
+        """Fetch the blobs of a snapshot in one query; sections are decompressed when read."""
+        hashes = {ref for ref in refs.values() if ref}
+        blobs = {}
+        if hashes:
+            try:
+                stmt = select(SnapshotBlob.hash, SnapshotBlob.codec, SnapshotBlob.data).where(SnapshotBlob.hash.in_(hashes))
+                blobs = {digest: (codec, data) for digest, codec, data in (await self.db.exec(stmt)).all()}
+            except SQLAlchemyError as e:
+                logger.exception("DB error fetching snapshot blobs")
+                raise HTTPException(status_code=500, detail="Database error fetching the contact snapshot.") from e
+        missing = hashes - blobs.keys()
+        if missing:
+            logger.error("Snapshot blobs missing: %s", sorted(missing))
+            raise HTTPException(status_code=500, detail="Contact snapshot is incomplete.")
+        return LazySnapshot(refs, blobs)
@@ -0,0 +1,207 @@
+"""
+Query-plan regression tests for the repository queries.
+
+Every repository call runs against a seeded SQLite database; the SELECTs, UPDATEs
+and DELETEs it issues are captured and run again under EXPLAIN QUERY PLAN. A full
+table scan or a temporary B-tree (sort) in the plan means an index the query relies
+on is missing or no longer matches it.
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import MetaData, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.entities.contact_models import Contact, ContactMessage, SnapshotBlob
+from models.entities.model import AIState, ChatHistory, ConversationSummary, Diagnosis, MedicalRecord, PendingDiagnosis, Todo, TodoList, User
+from repositories import (
+    AIStateRepo, ChatHistoryRepo, ConversationSummaryRepo, DiagnosisRepo, MedicalRecordRepo, PendingDiagnosisRepo, SnapshotRepo,
+    TodoRepo,
+)
+from repositories.contact_repo import ContactRepo
+from repositories.working_set import LocalBackend, WorkingSetCache, configure_working_set
+
+USERS = 40
+RECORDS_PER_USER = 5
+MESSAGES_PER_RECORD = 20
+
+DOCTOR_ID = uuid.uuid4()
+PATIENT_ID = uuid.uuid4()
+
+
+async def _create_schema(conn):
+    # users.id defaults to gen_random_uuid(), which SQLite does not have
+    users = User.__table__.to_metadata(MetaData())
+    users.c.id.server_default = None
+    await conn.run_sync(users.create)
+    for model in (MedicalRecord, ChatHistory, ConversationSummary, AIState, Todo, TodoList, Diagnosis, PendingDiagnosis, Contact, ContactMessage, SnapshotBlob):
+        await conn.run_sync(model.__table__.create)
+
+
+def _seed(db: AsyncSession):
+    now = datetime.now(timezone.utc)
+    db.add(User(id=DOCTOR_ID, username="doctor", hashed_password="x", role_type="doctor",
+                user_metadata={"address": "Tokyo", "facility": "Clinic 1"}))
+    for u in range(USERS):
+        user_id = PATIENT_ID if u == 0 else uuid.uuid4()
+        user = User(id=user_id, username=f"patient{u}", hashed_password="x", role_type="patient", user_metadata={},
+                    record_count=RECORDS_PER_USER)
+        db.add(user)
+        for r in range(RECORDS_PER_USER):
+            record_id = uuid.uuid4()
+            if r == 0:
+                # As MedicalRecordRepo.add_record keeps it: r == 0 is the newest record
+                user.latest_record_id = record_id
+            created = now - timedelta(days=r, minutes=u)
+            db.add(MedicalRecord(record_id=record_id, user_id=user_id, created_at=created, updated_at=created, data={
+                "patient_info": {"full_name": f"Patient {u}"},
+                "medical_history": {"chief_complaint": f"complaint {r}"},
+            }))
+            db.add(AIState(record_id=record_id, user_id=user_id, data={"decision": "MAIN_QUESTIONING"}))
+            for m in range(MESSAGES_PER_RECORD):
+                db.add(ChatHistory(record_id=record_id, user_id=user_id, role="human" if m % 2 else "ai",
+                                   content=f"message {m}", created_at=created + timedelta(seconds=m)))
+            for position in range(3):
+                db.add(Todo(user_id=user_id, record_id=record_id, text=f"todo {position}", is_check=False,
+                            position=position, created_at=created))
+            db.add(TodoList(user_id=user_id, record_id=record_id, version=0))
+            db.add(Diagnosis(user_id=user_id, record_id=record_id, reasoning_process="...", diagnosis={},
+                             further_test={}, created_at=created))
+            contact_id = uuid.uuid4()
+            db.add(Contact(id=contact_id, patient_id=user_id, record_id=record_id,
+                           assigned_doctor_id=DOCTOR_ID if r == 0 else None,
+                           address="Tokyo" if r % 2 else "Osaka", facility=f"Clinic {r % 3}",
+                           include_conversation=False, created_at=created, patient_name=f"Patient {u}"))
+            db.add(ContactMessage(contact_id=contact_id, sender_id=user_id, role="patient", content="hello",
+                                  created_at=created))
+
+
+async def _explain_repo_calls(call):
+    """Run `call(db, ids)` on a seeded database and return the plan of every query it issued."""
+    # Every read has to reach the database
+    configure_working_set(WorkingSetCache(LocalBackend(max_entries=0), ttl=0))
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with engine.begin() as conn:
+            await _create_schema(conn)
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            _seed(db)
+            await db.commit()
+            await ConversationSummaryRepo(db).backfill()
+            record_id = (await MedicalRecordRepo(db).get_latest_record_id(PATIENT_ID))
+            contact_id = (await ContactRepo(db).get_my_doctors(patient_id=PATIENT_ID))[0]["contact_id"]
+
+            statements = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                    statements.append((statement, parameters))
+
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                await call(db, {"record_id": record_id, "contact_id": contact_id})
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+            assert statements, "the repository call issued no query"
+            plans = []
+            for statement, parameters in statements:
+                rows = (await db.connection()).exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+                plans.append((statement, [row[3] for row in (await rows).all()]))
+            return plans
+    finally:
+        await engine.dispose()
+
+
+def _assert_indexed(call):
+    for statement, plan in asyncio.run(_explain_repo_calls(call)):
+        for step in plan:
+            # "SCAN t" is a full table scan, "SCAN t USING INDEX" a full index scan;
+            # "USE TEMP B-TREE" is a sort or grouping done outside an index
+            assert not step.startswith("SCAN") and "TEMP B-TREE" not in step, (
+                f"{step!r} in the plan of:\n{statement}\nfull plan: {plan}"
+            )
+
+
+def test_chat_history_for_record_uses_index():
+    _assert_indexed(lambda db, ids: ChatHistoryRepo(db).get_chat_history(record_id=ids["record_id"], user_id=PATIENT_ID))
+
+
+def test_chat_history_pages_use_index():
+    async def calls(db, ids):
+        repo = ChatHistoryRepo(db)
+        rows, _ = await repo.get_chat_history_page(record_id=ids["record_id"], user_id=PATIENT_ID, limit=5)
+        cursor = (rows[0].created_at, rows[0].id)
+        await repo.get_chat_history_page(record_id=ids["record_id"], user_id=PATIENT_ID, limit=5, before=cursor)
+        await repo.get_chat_history_page(record_id=ids["record_id"], user_id=PATIENT_ID, limit=5, after=cursor)
+        await repo.get_chat_history_page(record_id=ids["record_id"], user_id=PATIENT_ID, limit=5, since=cursor[0])
+    _assert_indexed(calls)
+
+
+def test_conversation_list_uses_index():
+    async def calls(db, ids):
+        repo = ConversationSummaryRepo(db)
+        rows, _ = await repo.list_for_user(user_id=PATIENT_ID, limit=2)
+        await repo.list_for_user(user_id=PATIENT_ID, limit=2, before=(rows[-1].updated_at, rows[-1].record_id))
+    _assert_indexed(calls)
+
+
+def test_list_todos_uses_index():
+    _assert_indexed(lambda db, ids: TodoRepo(db).list_todos(user_id=PATIENT_ID, record_id=ids["record_id"]))
+
+
+def test_todo_checks_use_index():
+    _assert_indexed(lambda db, ids: TodoRepo(db).set_checks(
+        user_id=PATIENT_ID, record_id=ids["record_id"], checks={0: True, 2: True}, expected_version=0
+    ))
+
+
+def test_latest_diagnosis_uses_index():
+    _assert_indexed(lambda db, ids: DiagnosisRepo(db).get_latest(user_id=PATIENT_ID, record_id=ids["record_id"]))
+
+
+def test_medical_record_lookups_use_index():
+    async def calls(db, ids):
+        repo = MedicalRecordRepo(db)
+        await repo.get_medical_record_by_id(record_id=ids["record_id"], user_id=PATIENT_ID)
+        await repo.get_latest_record_id(PATIENT_ID)
+    _assert_indexed(calls)
+
+
+def test_ai_state_lookups_use_index():
+    async def calls(db, ids):
+        repo = AIStateRepo(db)
+        await repo.get_ai_state(record_id=ids["record_id"], user_id=PATIENT_ID)
+        await repo.list_record_ids_by_decision(user_id=PATIENT_ID, decision="DIAGNOSIS")
+    _assert_indexed(calls)
+
+
+def test_pending_diagnosis_lookup_uses_index():
+    _assert_indexed(lambda db, ids: PendingDiagnosisRepo(db).get(user_id=PATIENT_ID, record_id=ids["record_id"]))
+
+
+def test_doctor_inbox_uses_index():
+    async def calls(db, ids):
+        repo = ContactRepo(db)
+        rows, _ = await repo.list_for_doctor(doctor_id=DOCTOR_ID, limit=5)
+        await repo.list_for_doctor(doctor_id=DOCTOR_ID, limit=5, before=(rows[-1].created_at, rows[-1].id))
+        await repo.list_for_doctor(doctor_id=DOCTOR_ID, limit=5, full_name="patient 1")
+    _assert_indexed(calls)
+
+
+def test_contact_messages_use_index():
+    _assert_indexed(lambda db, ids: ContactRepo(db).get_messages(contact_id=ids["contact_id"]))
+
+
+def test_my_doctors_uses_index():
+    _assert_indexed(lambda db, ids: ContactRepo(db).get_my_doctors(patient_id=PATIENT_ID))
+
+
+def test_contact_snapshot_uses_index():
+    async def calls(db, ids):
+        repo = SnapshotRepo(db)
+        refs = await repo.put_sections({"medical_record": {"patient_info": {}}, "todos": [], "conversation": None})
+        await repo.load(refs)
+    _assert_indexed(calls)
@@ -0,0 +1,38 @@
+import asyncio
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.entities.model import TodoList
+from repositories import MedicalRecordRepo, TodoRepo
+from repositories.tests.test_query_plans import PATIENT_ID, _create_schema, _seed
+
+
+async def _check_without_version_row():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with engine.begin() as conn:
+            await _create_schema(conn)
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            _seed(db)
+            await db.commit()
+            record_id = await MedicalRecordRepo(db).get_latest_record_id(PATIENT_ID)
+            # Todos written before todo_lists existed
+            await db.exec(delete(TodoList).where(TodoList.record_id == record_id))
+            await db.commit()
+
+            repo = TodoRepo(db)
+            assert await repo.get_version(user_id=PATIENT_ID, record_id=record_id) == 0
+            version, rows = await repo.set_checks(
+                user_id=PATIENT_ID, record_id=record_id, checks={1: True}, expected_version=0
+            )
+            return version, [(row.position, row.is_check) for row in rows]
+    finally:
+        await engine.dispose()
+
+
+def test_set_checks_creates_missing_version_row():
+    version, rows = asyncio.run(_check_without_version_row())
+    assert version == 1
+    assert rows == [(1, True)]
@@ -0,0 +1,175 @@
+"""
+Working-set cache: LRU / TTL of the local backend, write-through on commit (and not on
+rollback), zero reads on a steady-state turn, a backend shared by several workers
+through the Redis-protocol stand-in server, and one that is skipped while unreachable.
+"""
+import asyncio
+import subprocess
+import sys
+import time
+import uuid
+
+from sqlalchemy import MetaData, event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from models.entities.model import AIState, ChatHistory, ConversationSummary, MedicalRecord, User
+from repositories import AIStateRepo, ChatHistoryRepo, MedicalRecordRepo, unit_of_work
+from repositories.working_set import LocalBackend, RespBackend, WorkingSetCache, configure_working_set
+
+
+def test_local_backend_evicts_least_recently_used_and_expires():
+    async def run():
+        backend = LocalBackend(max_entries=2)
+        await backend.set("a", b"1", ttl=60)
+        await backend.set("b", b"2", ttl=60)
+        await backend.get("a")
+        await backend.set("c", b"3", ttl=60)
+        assert await backend.get("b") is None
+        assert await backend.get("a") == b"1"
+        assert backend.evictions == 1
+
+        await backend.set("d", b"4", ttl=0.01)
+        await asyncio.sleep(0.02)
+        assert await backend.get("d") is None
+
+        await backend.set("a", b"new", ttl=60, only_if_absent=True)
+        assert await backend.get("a") == b"1"
+    asyncio.run(run())
+
+
+async def _turn_reads(call):
+    """Seed one conversation through the repositories and count the SELECTs of `call(db, ids)`."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with engine.begin() as conn:
+            # users.id defaults to gen_random_uuid(), which SQLite does not have
+            users = User.__table__.to_metadata(MetaData())
+            users.c.id.server_default = None
+            await conn.run_sync(users.create)
+            for model in (MedicalRecord, ChatHistory, ConversationSummary, AIState):
+                await conn.run_sync(model.__table__.create)
+
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user_id = uuid.uuid4()
+            db.add(User(id=user_id, username="patient", hashed_password="x", role_type="patient", user_metadata={}))
+            await db.commit()
+            # As ChatService.create_new_medical_record does
+            async with unit_of_work(db):
+                record = await MedicalRecordRepo(db).add_record(user_id=user_id, data={"patient_info": {"full_name": "A"}})
+                await AIStateRepo(db).add_ai_state(user_id=user_id, record_id=record.record_id, data={"decision": "MAIN_QUESTIONING"})
+                await ChatHistoryRepo(db).add_messages(user_id=user_id, record_id=record.record_id,
+                                                       messages=[{"role": "ai", "content": "hello"}])
+
+            selects = []
+
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith("SELECT"):
+                    selects.append(statement)
+
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                result = await call(db, {"user_id": user_id, "record_id": record.record_id})
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+            return selects, result
+    finally:
+        await engine.dispose()
+
+
+async def _read_turn(db, user_id, record_id):
+    history = await ChatHistoryRepo(db).get_chat_history(user_id=user_id, record_id=record_id)
+    state = await AIStateRepo(db).get_ai_state(user_id=user_id, record_id=record_id)
+    record = await MedicalRecordRepo(db).get_medical_record_by_id(user_id=user_id, record_id=record_id)
+    return history, state, record
+
+
+def test_steady_state_turn_reads_nothing():
+    cache = WorkingSetCache(LocalBackend(max_entries=100), ttl=60)
+    configure_working_set(cache)
+
+    async def turns(db, ids):
+        await _read_turn(db, **ids)
+        async with unit_of_work(db):
+            await AIStateRepo(db).merge_ai_state(patch={"note": "turn 1"}, **ids)
+            await ChatHistoryRepo(db).add_messages(messages=[{"role": "human", "content": "hi"}, {"role": "ai", "content": "ok"}], **ids)
+        return await _read_turn(db, **ids)
+
+    selects, (history, state, record) = asyncio.run(_turn_reads(turns))
+    assert selects == []
+    assert [(row.role, row.content) for row in history] == [("ai", "hello"), ("human", "hi"), ("ai", "ok")]
+    assert state.data == {"decision": "MAIN_QUESTIONING", "note": "turn 1"}
+    assert record.data == {"patient_info": {"full_name": "A"}}
+    assert cache.metrics()["history_hits"] == 2 and cache.metrics()["history_misses"] == 0
+
+
+def test_rolled_back_turn_is_not_cached():
+    configure_working_set(WorkingSetCache(LocalBackend(max_entries=100), ttl=60))
+
+    async def failed_turn(db, ids):
+        try:
+            async with unit_of_work(db):
+                await AIStateRepo(db).merge_ai_state(patch={"note": "lost"}, **ids)
+                await ChatHistoryRepo(db).add_messages(messages=[{"role": "human", "content": "lost"}], **ids)
+                raise RuntimeError("LLM call failed")
+        except RuntimeError:
+            pass
+        return await _read_turn(db, **ids)
+
+    selects, (history, state, _) = asyncio.run(_turn_reads(failed_turn))
+    assert selects == []
+    assert [row.content for row in history] == ["hello"]
+    assert "note" not in state.data
+
+
+def test_workers_share_the_resp_backend():
+    server = subprocess.Popen(
+        [sys.executable, "-m", "utils.resp_server", "--port", "0"],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        address = server.stdout.readline().split()[-1]
+
+        async def run():
+            # Two workers, each with its own cache object and connection
+            worker_a = WorkingSetCache(RespBackend(f"redis://{address}"), ttl=60)
+            worker_b = WorkingSetCache(RespBackend(f"redis://{address}"), ttl=60)
+            user_id, record_id = uuid.uuid4(), uuid.uuid4()
+            state = AIState(user_id=user_id, record_id=record_id, data={"decision": "DIAGNOSIS"})
+
+            assert await worker_b.get("state", record_id, user_id) is None
+            await worker_a.put("state", record_id, user_id, state)
+            cached = await worker_b.get("state", str(record_id), str(user_id))
+            assert cached.data == {"decision": "DIAGNOSIS"} and cached.record_id == record_id
+
+            await worker_b.invalidate(record_id, user_id)
+            assert await worker_a.get("state", record_id, user_id) is None
+            assert worker_b.metrics()["state_hits"] == 1 and worker_b.metrics()["state_misses"] == 1
+
+            # Concurrent commands share a few pooled connections
+            await asyncio.gather(*(worker_a.get("record", uuid.uuid4(), user_id) for _ in range(20)))
+            assert 1 < len(worker_a.backend.client._idle) <= 4
+
+            for worker in (worker_a, worker_b):
+                await worker.backend.client.close()
+        asyncio.run(run())
+    finally:
+        server.terminate()
+        server.wait(timeout=5)
+
+
+def test_unreachable_backend_degrades_to_misses():
+    async def run():
+        cache = WorkingSetCache(RespBackend("redis://127.0.0.1:1"), ttl=60)
+        started = time.monotonic()
+        assert await cache.get("record", uuid.uuid4(), uuid.uuid4()) is None
+        assert time.monotonic() - started < 2
+        assert cache.metrics()["errors"] == 1
+
+        # Cooling down: the next calls skip the backend instead of trying it again
+        started = time.monotonic()
+        results = await asyncio.gather(*(cache.get("state", uuid.uuid4(), uuid.uuid4()) for _ in range(20)))
+        assert results == [None] * 20 and time.monotonic() - started < 0.05
+        metrics = cache.metrics()
+        assert metrics["errors"] == 1 and metrics["skipped"] == 20 and metrics["backend_available"] is False
+    asyncio.run(run())
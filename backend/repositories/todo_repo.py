@@ -1,18 +1,23 @@
-from sqlmodel import Session, select, delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlmodel import select, delete
+from sqlalchemy import case, insert, update
 from sqlalchemy.exc import SQLAlchemyError
-from models.entities.model import Todo
+from models.entities.model import Todo, TodoList
 from fastapi import HTTPException
+from repositories.dialect import dialect_insert
+from repositories.unit_of_work import commit_or_flush, rollback_unless_in_unit_of_work, unit_of_work
 import logging
-from typing import List, Tuple, Optional
+from collections import defaultdict, deque
+from typing import Dict, List, Tuple, Optional
 from uuid import UUID
 
 logger = logging.getLogger(__name__)
 
 class TodoRepo:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def list_todos(self, *, user_id: UUID, record_id: UUID) -> List[Todo]:
+    async def list_todos(self, *, user_id: UUID, record_id: UUID) -> List[Todo]:
         try:
             # Exclude placeholders (empty text)
             stmt = (
@@ -20,51 +25,146 @@ class TodoRepo:
                 .where(Todo.user_id == user_id, Todo.record_id == record_id, Todo.text != "")
                 .order_by(Todo.position.asc(), Todo.created_at.asc())
             )
-            return self.db.exec(stmt).all()
+            return (await self.db.exec(stmt)).all()
         except SQLAlchemyError as e:
             logger.exception("DB error listing todos for user %s", user_id)
             raise HTTPException(status_code=500, detail="Database error listing todos.") from e
 
-    def replace_todos(self, *, user_id: UUID, record_id: UUID, items: List[Tuple[str, bool]]):
+    async def replace_todos(self, *, user_id: UUID, record_id: UUID, items: List[Tuple[str, bool]]) -> List[Todo]:
+        """
+        Make the record's todos equal to `items` (in order) and return them.
+
+        Existing rows are reused: a row whose text is still present only gets its
+        position / check updated, left-over rows take over changed texts, and only the
+        remainder is inserted (one multi-row INSERT) or deleted (one DELETE).
+        """
         try:
-            # clear current
-            self.db.exec(delete(Todo).where(Todo.user_id == user_id, Todo.record_id == record_id))
-            # insert new
-            if not items:
-                # insert a placeholder to mark presence for this record
-                self.db.add(Todo(user_id=user_id, record_id=record_id, text="", is_check=False, position=0))
-            else:
-                pos = 0
-                for text, is_check in items:
-                    row = Todo(user_id=user_id, record_id=record_id, text=text, is_check=bool(is_check), position=pos)
-                    pos += 1
-                    self.db.add(row)
-            self.db.commit()
-            return self.list_todos(user_id=user_id, record_id=record_id)
+            existing = (await self.db.exec(
+                select(Todo)
+                .where(Todo.user_id == user_id, Todo.record_id == record_id)
+                .order_by(Todo.position.asc(), Todo.created_at.asc())
+            )).all()
+            # Positions count listed (non-empty) todos only, so they match the client's indexes;
+            # an empty list is kept as a placeholder row to mark presence for this record
+            wanted = [(text, bool(is_check)) for text, is_check in items if text] or [("", False)]
+
+            by_text: Dict[str, deque] = defaultdict(deque)
+            for row in existing:
+                by_text[row.text].append(row)
+            kept: List[Optional[Todo]] = [by_text[text].popleft() if by_text[text] else None for text, _ in wanted]
+            kept_ids = {row.id for row in kept if row is not None}
+            spare = deque(row for row in existing if row.id not in kept_ids)
+
+            new_rows: List[dict] = []
+            for position, ((text, is_check), row) in enumerate(zip(wanted, kept)):
+                if row is None and spare:
+                    row = kept[position] = spare.popleft()
+                if row is None:
+                    new_rows.append({"user_id": user_id, "record_id": record_id, "text": text, "is_check": is_check, "position": position})
+                    continue
+                # Only changed attributes are written, batched by the flush
+                if row.text != text:
+                    row.text = text
+                if row.is_check != is_check:
+                    row.is_check = is_check
+                if row.position != position:
+                    row.position = position
+
+            if spare:
+                await self.db.exec(delete(Todo).where(Todo.id.in_([row.id for row in spare])))
+            if new_rows:
+                inserted = (await self.db.exec(insert(Todo).values(new_rows).returning(Todo))).scalars().all()
+                inserted_at = iter(sorted(inserted, key=lambda row: row.position))
+                kept = [row if row is not None else next(inserted_at) for row in kept]
+            # Upsert: also creates the version row for todos written before it existed
+            await self._bump_version(user_id=user_id, record_id=record_id)
+            await commit_or_flush(self.db)
+            # Same rows and order as list_todos, without querying again
+            return [row for row in kept if row.text]
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await rollback_unless_in_unit_of_work(self.db)
             logger.exception("DB error replacing todos for user %s", user_id)
             raise HTTPException(status_code=500, detail="Database error replacing todos.") from e
 
-    def update_todo_checked_by_index(self, *, user_id: UUID, record_id: UUID, index: int, is_check: bool) -> List[Todo]:
+    async def _bump_version(self, *, user_id: UUID, record_id: UUID) -> int:
+        insert_stmt = dialect_insert(self.db, TodoList).values(record_id=record_id, user_id=user_id, version=1)
+        stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[TodoList.record_id, TodoList.user_id],
+            set_={"version": TodoList.version + 1},
+        ).returning(TodoList.version)
+        return (await self.db.exec(stmt)).scalar_one()
+
+    async def _ensure_version_row(self, *, user_id: UUID, record_id: UUID) -> None:
+        # Todos written before todo_lists existed have no version row yet; they count as version 0
+        stmt = dialect_insert(self.db, TodoList).values(record_id=record_id, user_id=user_id, version=0)
+        await self.db.exec(stmt.on_conflict_do_nothing(index_elements=[TodoList.record_id, TodoList.user_id]))
+
+    async def get_version(self, *, user_id: UUID, record_id: UUID) -> int:
         try:
-            rows = self.list_todos(user_id=user_id, record_id=record_id)
-            if index < 0 or index >= len(rows):
-                raise HTTPException(status_code=400, detail="Todo index out of range")
-            target = rows[index]
-            target.is_check = bool(is_check)
-            self.db.add(target)
-            self.db.commit()
-            self.db.refresh(target)
-            return self.list_todos(user_id=user_id, record_id=record_id)
+            stmt = select(TodoList.version).where(TodoList.record_id == record_id, TodoList.user_id == user_id)
+            return (await self.db.exec(stmt)).first() or 0
+        except SQLAlchemyError as e:
+            logger.exception("DB error fetching todo version for user %s", user_id)
+            raise HTTPException(status_code=500, detail="Database error.") from e
+
+    async def set_checks(
+        self,
+        *,
+        user_id: UUID,
+        record_id: UUID,
+        checks: Dict[int, bool],
+        expected_version: Optional[int] = None,
+    ) -> Tuple[int, List[Todo]]:
+        """
+        Check / uncheck todos by position and return (new version, changed todos).
+
+        The version is bumped with one conditional UPDATE and the whole batch applied
+        with a second one (CASE on position), both RETURNING. With `expected_version`
+        a concurrent change makes it fail with 409 instead of overwriting it. A missing
+        version row is created first (as version 0), like `get_version` reports it.
+        """
+        if not checks:
+            raise HTTPException(status_code=400, detail="No todo changes given")
+        try:
+            async with unit_of_work(self.db):
+                await self._ensure_version_row(user_id=user_id, record_id=record_id)
+                bump = (
+                    update(TodoList)
+                    .where(TodoList.record_id == record_id, TodoList.user_id == user_id)
+                    .values(version=TodoList.version + 1)
+                    .returning(TodoList.version)
+                )
+                if expected_version is not None:
+                    bump = bump.where(TodoList.version == expected_version)
+                version = (await self.db.exec(bump)).scalar_one_or_none()
+                if version is None:
+                    current = (await self.db.exec(
+                        select(TodoList.version).where(TodoList.record_id == record_id, TodoList.user_id == user_id)
+                    )).first()
+                    raise HTTPException(status_code=409, detail=f"Todos were changed (version {current}); reload them")
+
+                stmt = (
+                    update(Todo)
+                    .where(
+                        Todo.user_id == user_id,
+                        Todo.record_id == record_id,
+                        Todo.position.in_(list(checks)),
+                        Todo.text != "",
+                    )
+                    .values(is_check=case(checks, value=Todo.position))
+                    .returning(Todo)
+                )
+                rows = list((await self.db.exec(stmt)).scalars().all())
+                if len(rows) != len(checks):
+                    raise HTTPException(status_code=400, detail="Todo position out of range")
+            return version, sorted(rows, key=lambda row: row.position)
         except HTTPException:
             raise
         except SQLAlchemyError as e:
-            self.db.rollback()
-            logger.exception("DB error updating todo check for user %s", user_id)
+            logger.exception("DB error updating todo checks for user %s", user_id)
             raise HTTPException(status_code=500, detail="Database error updating todo.") from e
 
-    def get_latest_record_id_for_user(self, *, user_id: UUID) -> Optional[UUID]:
+    async def get_latest_record_id_for_user(self, *, user_id: UUID) -> Optional[UUID]:
         try:
             # pick the record_id that has most recent todo
             from sqlalchemy import func
@@ -75,7 +175,7 @@ class TodoRepo:
                 .order_by(func.max(Todo.created_at).desc())
                 .limit(1)
             )
-            row = self.db.exec(stmt).first()
+            row = (await self.db.exec(stmt)).first()
             return row[0] if row else None
         except SQLAlchemyError as e:
             logger.exception("DB error getting latest record_id from todos for user %s", user_id)
@@ -0,0 +1,53 @@
+from contextlib import asynccontextmanager
+from sqlmodel.ext.asyncio.session import AsyncSession
+from repositories.working_set import apply_staged, discard_staged
+
+# session.info key holding the nesting depth of unit_of_work blocks on that session
+_UOW_KEY = "uow"
+
+
+def in_unit_of_work(db: AsyncSession) -> bool:
+    return db.info.get(_UOW_KEY, 0) > 0
+
+
+@asynccontextmanager
+async def unit_of_work(db: AsyncSession):
+    """
+    Group repository writes into a single transaction.
+
+    Inside the block repositories flush instead of committing; the outermost block
+    commits once on success and rolls everything back on error. Nested blocks join
+    the outer one. Working-set cache writes of the block are applied after the commit.
+    """
+    db.info[_UOW_KEY] = db.info.get(_UOW_KEY, 0) + 1
+    committed = False
+    try:
+        yield db
+        if db.info[_UOW_KEY] == 1:
+            await db.commit()
+            committed = True
+    except BaseException:
+        if db.info[_UOW_KEY] == 1:
+            await db.rollback()
+            discard_staged(db)
+        raise
+    finally:
+        db.info[_UOW_KEY] -= 1
+    if committed:
+        await apply_staged(db)
+
+
+async def commit_or_flush(db: AsyncSession) -> None:
+    """Commit, or only flush when a unit of work owns the transaction."""
+    if in_unit_of_work(db):
+        await db.flush()
+    else:
+        await db.commit()
+        await apply_staged(db)
+
+
+async def rollback_unless_in_unit_of_work(db: AsyncSession) -> None:
+    """Roll back a failed write; inside a unit of work the outermost block does it."""
+    if not in_unit_of_work(db):
+        await db.rollback()
+        discard_staged(db)
@@ -0,0 +1,263 @@
+"""
+Working set of a conversation: the medical record, AI state and chat history a chat
+turn needs, cached between turns so that a steady-state turn reads nothing from the
+database.
+
+The repositories read through it and write through it. A write is staged on the session
+and reaches the cache only once its transaction commits (see unit_of_work), so a rolled
+back turn never leaves its data behind. Entries expire after a TTL; the in-process
+backend also evicts the least recently used ones. With WORKING_SET_URL set, the entries
+live in a Redis-protocol server instead, shared by all workers.
+"""
+import datetime
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Protocol, Tuple
+
+from sqlalchemy import DateTime, Uuid
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config import Config
+from models.entities.model import AIState, ChatHistory, MedicalRecord
+from utils.metrics import register_metrics
+from utils.resp import RespClient, RespUnavailable
+
+logger = logging.getLogger(__name__)
+
+# kind -> entity; "history" holds a list of ChatHistory rows in (created_at, id) order
+KINDS = {"record": MedicalRecord, "state": AIState, "history": ChatHistory}
+
+# session.info key of the cache writes waiting for the transaction to commit
+_STAGED_KEY = "working_set"
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ttl: float, only_if_absent: bool = False) -> None: ...
+
+    async def delete(self, *keys: str) -> None: ...
+
+
+class LocalBackend:
+    """In-process entries with a TTL, least recently used evicted beyond `max_entries`."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        # key -> (value, expires at on the monotonic clock)
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    async def set(self, key: str, value: bytes, ttl: float, only_if_absent: bool = False) -> None:
+        if only_if_absent and await self.get(key) is not None:
+            return
+        self._entries[key] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RespBackend:
+    """Entries in a Redis-protocol server (Redis, Valkey, utils.resp_server), shared by all workers."""
+
+    def __init__(self, url: str):
+        self.client = RespClient(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.command("GET", key)
+
+    async def set(self, key: str, value: bytes, ttl: float, only_if_absent: bool = False) -> None:
+        args = ["SET", key, value, "PX", max(1, int(ttl * 1000))]
+        if only_if_absent:
+            args.append("NX")
+        await self.client.command(*args)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.command("DEL", *keys)
+
+
+def _encode_row(row) -> Dict[str, Any]:
+    out = {}
+    for column in type(row).__table__.columns:
+        value = getattr(row, column.name)
+        if isinstance(value, uuid.UUID):
+            value = str(value)
+        elif isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        out[column.name] = value
+    return out
+
+
+def _decode_row(model, data: Dict[str, Any]):
+    values = {}
+    for column in model.__table__.columns:
+        value = data.get(column.name)
+        if value is not None and isinstance(column.type, Uuid):
+            value = uuid.UUID(value)
+        elif value is not None and isinstance(column.type, DateTime):
+            value = datetime.datetime.fromisoformat(value)
+        values[column.name] = value
+    return model(**values)
+
+
+class WorkingSetCache:
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self._counters: Dict[str, int] = {"writes": 0, "invalidations": 0, "errors": 0, "skipped": 0}
+        for kind in KINDS:
+            self._counters[f"{kind}_hits"] = 0
+            self._counters[f"{kind}_misses"] = 0
+
+    @classmethod
+    def from_config(cls) -> "WorkingSetCache":
+        if Config.WORKING_SET_URL:
+            backend: CacheBackend = RespBackend(Config.WORKING_SET_URL)
+        else:
+            backend = LocalBackend(Config.WORKING_SET_MAX_ENTRIES)
+        return cls(backend, Config.WORKING_SET_TTL)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @staticmethod
+    def key(kind: str, record_id, user_id) -> str:
+        # Normalized, so str and UUID ids of the same record share an entry
+        return f"ws1:{kind}:{uuid.UUID(str(record_id))}:{uuid.UUID(str(user_id))}"
+
+    def metrics(self) -> Dict[str, Any]:
+        snapshot: Dict[str, Any] = dict(self._counters)
+        if isinstance(self.backend, LocalBackend):
+            snapshot["entries"] = len(self.backend)
+            snapshot["evictions"] = self.backend.evictions
+        elif isinstance(self.backend, RespBackend):
+            snapshot["backend_available"] = self.backend.client.available
+        return snapshot
+
+    @staticmethod
+    def _dumps(kind: str, value) -> bytes:
+        data = [_encode_row(row) for row in value] if kind == "history" else _encode_row(value)
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    @staticmethod
+    def _loads(kind: str, raw: bytes):
+        data = json.loads(raw)
+        if kind == "history":
+            return [_decode_row(ChatHistory, row) for row in data]
+        return _decode_row(KINDS[kind], data)
+
+    async def _guard(self, action: Awaitable, default=None):
+        # The cache is an optimization: a backend failure degrades to a database read
+        try:
+            return await action
+        except RespUnavailable:
+            # Backing off after a failure that was counted (and logged) already
+            self._counters["skipped"] += 1
+            return default
+        except Exception:
+            self._counters["errors"] += 1
+            logger.warning("Working-set cache backend error", exc_info=True)
+            return default
+
+    async def _read(self, kind: str, record_id, user_id):
+        raw = await self._guard(self.backend.get(self.key(kind, record_id, user_id)))
+        return None if raw is None else self._loads(kind, raw)
+
+    async def get(self, kind: str, record_id, user_id):
+        """The cached entity (a fresh, session-less instance) or None."""
+        if not self.enabled:
+            return None
+        value = await self._read(kind, record_id, user_id)
+        self._counters[f"{kind}_misses" if value is None else f"{kind}_hits"] += 1
+        return value
+
+    async def fill(self, kind: str, record_id, user_id, value) -> None:
+        """Cache what a read returned; never overwrites a (newer) write-through entry."""
+        if self.enabled:
+            await self._guard(
+                self.backend.set(self.key(kind, record_id, user_id), self._dumps(kind, value), self.ttl, only_if_absent=True)
+            )
+
+    async def put(self, kind: str, record_id, user_id, value) -> None:
+        if self.enabled:
+            self._counters["writes"] += 1
+            await self._guard(self.backend.set(self.key(kind, record_id, user_id), self._dumps(kind, value), self.ttl))
+
+    async def append_history(self, record_id, user_id, rows: List[ChatHistory]) -> None:
+        """Append new messages to a cached history; an entry that cannot take them is dropped."""
+        if not self.enabled:
+            return
+        history = await self._read("history", record_id, user_id)
+        if history is None:
+            return
+        if history and (history[-1].created_at, history[-1].id) >= (rows[0].created_at, rows[0].id):
+            # Another writer got in between; let the next read rebuild it
+            await self.invalidate(record_id, user_id, ("history",))
+            return
+        await self.put("history", record_id, user_id, history + list(rows))
+
+    async def invalidate(self, record_id, user_id, kinds: Iterable[str] = tuple(KINDS)) -> None:
+        """Drop cached entries of a record, e.g. after it was changed outside the repositories."""
+        if self.enabled:
+            self._counters["invalidations"] += 1
+            await self._guard(self.backend.delete(*(self.key(kind, record_id, user_id) for kind in kinds)))
+
+    def after_commit(self, db: AsyncSession, action: Callable[["WorkingSetCache"], Awaitable[None]]) -> None:
+        """Run `action(cache)` once the session's current transaction has committed."""
+        if self.enabled:
+            db.info.setdefault(_STAGED_KEY, []).append(action)
+
+
+_working_set: Optional[WorkingSetCache] = None
+
+
+def get_working_set() -> WorkingSetCache:
+    global _working_set
+    if _working_set is None:
+        _working_set = WorkingSetCache.from_config()
+        register_metrics("working_set", _working_set.metrics)
+    return _working_set
+
+
+def configure_working_set(cache: WorkingSetCache) -> None:
+    """Replace the process-wide cache (tests, or a backend chosen at startup)."""
+    global _working_set
+    _working_set = cache
+    register_metrics("working_set", cache.metrics)
+
+
+async def apply_staged(db: AsyncSession) -> None:
+    """Write the cache updates staged by the transaction that just committed."""
+    staged = db.info.pop(_STAGED_KEY, None)
+    if staged:
+        cache = get_working_set()
+        for action in staged:
+            await action(cache)
+
+
+def discard_staged(db: AsyncSession) -> None:
+    """Forget the cache updates of a rolled back transaction."""
+    db.info.pop(_STAGED_KEY, None)
@@ -1,7 +1,6 @@
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Depends, status
 from entities.api_entities import ConversationRequest, MedicalRecordRequest
 from entities.patient_information_entity import PatientInformation
-from graph.graph import app  # Your compiled LangGraph app
 from graph.nodes.conversation_after import conversation_after
 from graph.nodes.diagnosis import diagnosis
 from graph.state import GraphState
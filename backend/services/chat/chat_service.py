@@ -1,9 +1,19 @@
-﻿from services.chat.chat_utils import get_ai_response, get_conversation_after, get_diagnosis, get_information, update_medical_record
-from sqlmodel import Session
+﻿import asyncio
+import json
+import logging
+import uuid
+
+from services.chat.chat_utils import aget_ai_response, aget_conversation_after, aget_diagnosis, aget_information
+from services.chat.history_compaction import COMPACTION_POLICIES, compact_history
+from services.chat.diagnosis_prefetch import start_diagnosis, take_diagnosis
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import session_scope
 from fastapi import HTTPException
-from repositories import MedicalRecordRepo, ChatHistoryRepo, AIStateRepo, TodoRepo, DiagnosisRepo
+from repositories import MedicalRecordRepo, ChatHistoryRepo, AIStateRepo, TodoRepo, DiagnosisRepo, unit_of_work
 from services.contact.contact_service import ContactService
+from services.login.token_cache import get_token_cache
 from services.contact.options import get_allowed_addresses, get_facilities_by_address
+from utils.cursor import decode_cursor, encode_cursor
 from models.dto.modelDto import (
     AIStateData,
     AddMedicalRecordRequest,
@@ -16,8 +26,26 @@ from models.dto.modelDto import (
     SendContactRequest,
 )
 
+logger = logging.getLogger(__name__)
+
+# Streamed turns still running after their client went away; held so they are not collected
+_detached_turns: set = set()
+
+def _dump(value):
+    return value.model_dump(mode="json") if hasattr(value, "model_dump") else value
+
+def _followup_diagnosis(reasoning_process, diagnosis, further_test) -> dict:
+    """The diagnosis conversation_after is given, shaped as DiagnosisRepo stores it (further_test as {"items": [...]})."""
+    if isinstance(further_test, list):
+        further_test = {"items": [_dump(item) for item in further_test]}
+    return {
+        "reasoning_process": reasoning_process,
+        "diagnosis": _dump(diagnosis),
+        "further_test": further_test or {},
+    }
+
 class ChatService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.medical_record_repo = MedicalRecordRepo(db)
         self.chat_history_repo = ChatHistoryRepo(db)
@@ -34,41 +62,35 @@ class ChatService:
         
         print(f"Data: {data}")
         
-        record = self.medical_record_repo.add_record(user_id=user_id, data=data)
-        record_id = record.record_id
-        
-        # ai_response = get_information(record, [], "")
-        
-        
-        ai_state = self.ai_state_repo.add_ai_state(
-            user_id=user_id, 
-            record_id=record_id, 
-            data=AIStateData(reasoning=None, note="", decision="MAIN_QUESTIONING").model_dump(mode="json")
+        # New records start in MAIN_QUESTIONING. Ask for the opening question before
+        # writing anything so the record, state, todos and greeting commit together.
+        ai_response = await aget_ai_response(data, None, "", [], "", None, "")
+        # Normalize nested Pydantic from chain output to our DTO schema
+        normalized_reasoning = (
+            ai_response.reasoning.model_dump(mode="json")
+            if getattr(ai_response, "reasoning", None) is not None and hasattr(ai_response.reasoning, "model_dump")
+            else (ai_response.reasoning if getattr(ai_response, "reasoning", None) is not None else None)
         )
 
-        # Initialize an empty todo list for this new record
-        self.todo_repo.replace_todos(user_id=user_id, record_id=record_id, items=[])
+        async with unit_of_work(self.db):
+            record = await self.medical_record_repo.add_record(user_id=user_id, data=data)
+            record_id = record.record_id
 
-        if ai_state.data["decision"] == "MAIN_QUESTIONING":
-            ai_response = get_ai_response(record, ai_state.data["reasoning"] if ai_state else None, ai_state.data["note"] if ai_state else "", [], "", None, "")
-            # Normalize nested Pydantic from chain output to our DTO schema
-            normalized_reasoning = (
-                ai_response.reasoning.model_dump(mode="json")
-                if getattr(ai_response, "reasoning", None) is not None and hasattr(ai_response.reasoning, "model_dump")
-                else (ai_response.reasoning if getattr(ai_response, "reasoning", None) is not None else None)
-            )
-            ai_state = self.ai_state_repo.add_ai_state(
+            await self.ai_state_repo.add_ai_state(
                 user_id=user_id, 
                 record_id=record_id, 
                 data=AIStateData(reasoning=normalized_reasoning, note=ai_response.note, decision=ai_response.decision).model_dump(mode="json")
             )
-            
-        first_bot_message = (getattr(ai_response, "generation", "") or "").strip()
-        if first_bot_message:
-            messages = [{"role": "ai", "content": first_bot_message}]
-            self.chat_history_repo.add_messages(user_id=user_id, record_id=record_id, messages=messages)
 
-        self.db.refresh(record)
+            # Initialize an empty todo list for this new record
+            await self.todo_repo.replace_todos(user_id=user_id, record_id=record_id, items=[])
+
+            first_bot_message = (getattr(ai_response, "generation", "") or "").strip()
+            if first_bot_message:
+                messages = [{"role": "ai", "content": first_bot_message}]
+                await self.chat_history_repo.add_messages(user_id=user_id, record_id=record_id, messages=messages)
+        # The cached auth user carries the latest record id
+        await get_token_cache().invalidate(user_id)
 
         return AddMedicalRecordResponse(
             message=ai_response.generation,
@@ -88,9 +110,21 @@ class ChatService:
         if not record_id:
             raise HTTPException(status_code=400, detail=f'Invalid record id')
         
-        rows = self.chat_history_repo.get_chat_history(
-            user_id=request.user_id,
-            record_id=request.record_id,
+        if sum(value is not None for value in (request.before, request.after, request.since)) > 1:
+            raise HTTPException(status_code=400, detail='Use only one of before, after and since')
+
+        try:
+            user_uuid, record_uuid = uuid.UUID(str(user_id)), uuid.UUID(str(record_id))
+        except ValueError:
+            raise HTTPException(status_code=400, detail='Invalid user or record id')
+
+        rows, has_more = await self.chat_history_repo.get_chat_history_page(
+            user_id=user_uuid,
+            record_id=record_uuid,
+            limit=request.limit,
+            before=decode_cursor(request.before) if request.before else None,
+            after=decode_cursor(request.after) if request.after else None,
+            since=request.since,
         )
         return GetChatHistoryResponse(
             history=[
@@ -101,10 +135,14 @@ class ChatService:
                     created_at=row.created_at,
                 )
                 for row in rows
-            ]
+            ],
+            before_cursor=encode_cursor(rows[0].created_at, rows[0].id) if rows else request.before,
+            # Nothing new yet: poll again from the same position
+            after_cursor=encode_cursor(rows[-1].created_at, rows[-1].id) if rows else request.after,
+            has_more=has_more,
         )
     
-    async def process_chat_message(self, request: ChatTextRequest):
+    async def process_chat_message(self, request: ChatTextRequest, on_token=None):
         user_id = request.user_id
         record_id = request.record_id
         message = request.message
@@ -116,27 +154,35 @@ class ChatService:
         if not message:
             raise HTTPException(status_code=400, detail=f'Message cannot be empty')
         
-        chat_history = self.chat_history_repo.get_chat_history(
+        chat_history = await self.chat_history_repo.get_chat_history(
             user_id=user_id,
             record_id=record_id,
         )
 
-        ai_state = self.ai_state_repo.get_ai_state(user_id=user_id, record_id=record_id)
-        medical_record = self.medical_record_repo.get_medical_record_by_id(user_id=user_id, record_id=record_id)
+        ai_state = await self.ai_state_repo.get_ai_state(user_id=user_id, record_id=record_id)
+        medical_record = await self.medical_record_repo.get_medical_record_by_id(user_id=user_id, record_id=record_id)
+        # End the read transaction: the LLM calls below must not hold a pooled connection.
+        # All writes of the turn then go through one unit of work at the end.
+        await self.db.commit()
 
-        if ai_state.data["decision"] == "INFORMATION_COLLECTION":
-            ai_response = get_information(medical_record, chat_history, message)
-            ai_state = self.ai_state_repo.add_ai_state(
-                user_id=user_id, 
-                record_id=record_id, 
-                data=AIStateData(reasoning=None, note="", decision=ai_response.decision).model_dump(mode="json")
-            )
+        state = dict(ai_state.data or {})
+
+        if state["decision"] == "INFORMATION_COLLECTION":
+            ai_response = await aget_information(medical_record, chat_history, message)
+            state = AIStateData(
+                reasoning=None,
+                note="",
+                decision=ai_response.decision,
+                history_summary=state.get("history_summary", ""),
+                summarized_count=state.get("summarized_count", 0),
+            ).model_dump(mode="json")
         
-        diseases_already_asked = set(ai_state.data.get("diseases_already_asked", []))
-        disease_to_ask = ai_state.data.get("disease_to_ask", "")
+        diseases_already_asked = set(state.get("diseases_already_asked", []))
+        disease_to_ask = state.get("disease_to_ask", "")
 
-        if ai_state.data["decision"] == "MAIN_QUESTIONING":
-            ai_response = get_ai_response(medical_record, ai_state.data["reasoning"] if ai_state else None, ai_state.data["note"] if ai_state else "", chat_history, message, diseases_already_asked, disease_to_ask)
+        if state["decision"] == "MAIN_QUESTIONING":
+            compacted = await compact_history(chat_history, state, COMPACTION_POLICIES["conversation"])
+            ai_response = await aget_ai_response(medical_record, state.get("reasoning"), state.get("note", ""), compacted.messages, message, diseases_already_asked, disease_to_ask, on_token=on_token, history_summary=compacted.summary)
             normalized_reasoning = (
                 ai_response.reasoning.model_dump(mode="json")
                 if getattr(ai_response, "reasoning", None) is not None and hasattr(ai_response.reasoning, "model_dump")
@@ -147,78 +193,66 @@ class ChatService:
             
             disease_to_ask = ai_response.disease_to_ask_on_the_next_question
 
-            ai_state = self.ai_state_repo.add_ai_state(
-                user_id=user_id, 
-                record_id=record_id, 
-                data=AIStateData(reasoning=normalized_reasoning, note=ai_response.note, decision=ai_response.decision, diseases_already_asked=diseases_already_asked, disease_to_ask=disease_to_ask).model_dump(mode="json")
-            )
+            state = AIStateData(
+                reasoning=normalized_reasoning,
+                note=ai_response.note,
+                decision=ai_response.decision,
+                diseases_already_asked=diseases_already_asked,
+                disease_to_ask=disease_to_ask,
+                history_summary=compacted.summary,
+                summarized_count=compacted.summarized_count,
+            ).model_dump(mode="json")
 
             messages = [{"role": "human", "content": message}, {"role": "ai", "content": ai_response.generation}]
 
-            self.chat_history_repo.add_messages(user_id=user_id, record_id=record_id, messages=messages)
+            async with unit_of_work(self.db):
+                await self.ai_state_repo.add_ai_state(user_id=user_id, record_id=record_id, data=state)
+                await self.chat_history_repo.add_messages(user_id=user_id, record_id=record_id, messages=messages)
 
+            # The next turn is the diagnosis; start it now so the patient does not wait for all of it
+            if state["decision"] == "DIAGNOSIS":
+                start_diagnosis(user_id=user_id, record_id=record_id)
 
             return ChatTextResponse(
                 message=ai_response.generation,
                 multiple_choices=ai_response.multiple_choices if ai_response.multiple_choices else None,
-                decision=ai_state.data["decision"] if ai_state.data["decision"] else None
+                decision=state["decision"] if state["decision"] else None
             )
         
-        if ai_state.data["decision"] == "DIAGNOSIS":
+        diagnosis_response = None
+        if state["decision"] == "DIAGNOSIS":
             message = "###DIAGNOSIS###"
-            ai_response = get_diagnosis(medical_record, chat_history, ai_state.data["note"] if ai_state else "")
-            current_state = ai_state.data if ai_state and hasattr(ai_state, "data") else {}
-            # Also persist todos independently using TodoRepo
-            normalized_todos = []
-            if getattr(ai_response, "todo", None):
-                try:
-                    for t in ai_response.todo:
-                        normalized_todos.append((str(t), False))
-                except Exception:
-                    normalized_todos = []
-            if normalized_todos:
-                self.todo_repo.replace_todos(user_id=user_id, record_id=record_id, items=normalized_todos)
-
-            # Persist diagnosis into its own table
-            self.diagnosis_repo.add_diagnosis(
-                user_id=user_id,
-                record_id=record_id,
-                reasoning_process=ai_response.reasoning_process,
-                diagnosis=(ai_response.diagnosis.model_dump(mode="json") if hasattr(ai_response.diagnosis, "model_dump") else ai_response.diagnosis),
-                further_test=[
-                    (item.model_dump(mode="json") if hasattr(item, "model_dump") else item)
-                    for item in (ai_response.further_test or [])
-                ],
-            )
-
-            new_state = {
-                **(current_state or {}),
+            diagnosis_response = await take_diagnosis(self.db, user_id=user_id, record_id=record_id, history_count=len(chat_history))
+            if diagnosis_response is None:
+                diagnosis_response = await aget_diagnosis(medical_record, chat_history, state.get("note", ""))
+            state = {
+                **state,
                 "reasoning": None,
                 "note": "",
                 "decision": "FINAL_STEPS",
             }
-            ai_state = self.ai_state_repo.add_ai_state(
-                user_id=user_id,
-                record_id=record_id,
-                data=new_state,
-            )
-
-            updated_medical_record_data = ai_response.medical_record
-            if hasattr(updated_medical_record_data, "model_dump"):
-                medical_record.data = updated_medical_record_data.model_dump(mode="json")
-            else:
-                medical_record.data = updated_medical_record_data
-            self.medical_record_repo.update_record(medical_record)
         
-        if ai_state.data["decision"] == "FINAL_STEPS":
+        contact_request = None
+        if state["decision"] == "FINAL_STEPS":
             print("Getting final steps...")
-            latest = self.diagnosis_repo.get_latest(user_id=user_id, record_id=record_id)
-            diagnosis_for_followup = {
-                "reasoning_process": getattr(latest, "reasoning_process", ""),
-                "diagnosis": getattr(latest, "diagnosis", {}),
-                "further_test": getattr(latest, "further_test", {}),
-            } if latest else {}
-            ai_response = get_conversation_after(diagnosis=diagnosis_for_followup, history=chat_history, medical_record=medical_record, message=message)
+            record_for_followup = medical_record
+            if diagnosis_response is not None:
+                # Same shape as the stored diagnosis the later turns read back below
+                diagnosis_for_followup = _followup_diagnosis(
+                    diagnosis_response.reasoning_process,
+                    diagnosis_response.diagnosis,
+                    diagnosis_response.further_test or [],
+                )
+                # The completed record is only saved with the diagnosis below, but this reply already uses it
+                if diagnosis_response.medical_record is not None:
+                    record_for_followup = _dump(diagnosis_response.medical_record)
+            else:
+                latest = await self.diagnosis_repo.get_latest(user_id=user_id, record_id=record_id)
+                diagnosis_for_followup = _followup_diagnosis(
+                    latest.reasoning_process, latest.diagnosis, latest.further_test,
+                ) if latest else {}
+            compacted = await compact_history(chat_history, state, COMPACTION_POLICIES["conversation_after"])
+            ai_response = await aget_conversation_after(diagnosis=diagnosis_for_followup, history=compacted.messages, medical_record=record_for_followup, message=message, on_token=on_token, history_summary=compacted.summary)
             # Agent action: auto-send contact if collected
             try:
                 if str(getattr(ai_response, 'action', '')).upper() == 'SEND_CONTACT':
@@ -229,43 +263,114 @@ class ChatService:
                     allowed_addresses = get_allowed_addresses()
                     facilities_map = get_facilities_by_address()
                     if address in allowed_addresses and facility in (facilities_map.get(address) or []):
-                        svc = ContactService(self.db)
-                        await svc.send(SendContactRequest(
+                        contact_request = SendContactRequest(
                             user_id=str(user_id),
                             record_id=str(record_id),
                             include_conversation=include_conversation,
                             address=address,
                             facility=facility,
-                        ))
+                        )
             except Exception:
                 # Do not break the conversation on send failure
                 pass
-            merged_state = {
-                **(ai_state.data if ai_state and hasattr(ai_state, "data") else {}),
+            state = {
+                **state,
                 "reasoning": None,
                 "note": "",
                 "decision": "FINAL_STEPS",
+                "history_summary": compacted.summary,
+                "summarized_count": compacted.summarized_count,
             }
-            ai_state = self.ai_state_repo.add_ai_state(
-                user_id=user_id,
-                record_id=record_id,
-                data=merged_state,
-            )
 
         if message == "###DIAGNOSIS###":
             messages = [{"role": "ai", "content": ai_response.generation}]
         else:
             messages = [{"role": "human", "content": message}, {"role": "ai", "content": ai_response.generation}]
 
-        self.chat_history_repo.add_messages(user_id=user_id, record_id=record_id, messages=messages)
+        async with unit_of_work(self.db):
+            if diagnosis_response is not None:
+                await self._save_diagnosis(user_id, record_id, medical_record, diagnosis_response)
+            # Only the keys this turn changed; the rest of the stored state is left as is
+            patch = {key: value for key, value in state.items() if (ai_state.data or {}).get(key) != value}
+            await self.ai_state_repo.merge_ai_state(user_id=user_id, record_id=record_id, patch=patch)
+            await self.chat_history_repo.add_messages(user_id=user_id, record_id=record_id, messages=messages)
+            if contact_request is not None:
+                try:
+                    # Savepoint: a failed send must not roll back the rest of the turn
+                    async with self.db.begin_nested():
+                        await ContactService(self.db).send(contact_request)
+                except Exception:
+                    # Do not break the conversation on send failure
+                    pass
 
         return ChatTextResponse(
             message=ai_response.generation,
             multiple_choices=ai_response.multiple_choices if ai_response.multiple_choices else None,
-            decision=ai_state.data["decision"] if ai_state.data["decision"] else None
+            decision=state["decision"] if state["decision"] else None
         )
 
+    async def _save_diagnosis(self, user_id, record_id, medical_record, ai_response):
+        # Also persist todos independently using TodoRepo
+        normalized_todos = []
+        if getattr(ai_response, "todo", None):
+            try:
+                for t in ai_response.todo:
+                    normalized_todos.append((str(t), False))
+            except Exception:
+                normalized_todos = []
+        if normalized_todos:
+            await self.todo_repo.replace_todos(user_id=user_id, record_id=record_id, items=normalized_todos)
 
+        # Persist diagnosis into its own table
+        await self.diagnosis_repo.add_diagnosis(
+            user_id=user_id,
+            record_id=record_id,
+            reasoning_process=ai_response.reasoning_process,
+            diagnosis=_dump(ai_response.diagnosis),
+            further_test=[_dump(item) for item in (ai_response.further_test or [])],
+        )
 
+        updated_medical_record_data = ai_response.medical_record
+        # None when the record-completion sub-call was skipped; keep the stored record then
+        if updated_medical_record_data is not None:
+            medical_record.data = _dump(updated_medical_record_data)
+            await self.medical_record_repo.update_record(medical_record)
 
+    @classmethod
+    async def stream_chat_message(cls, request: ChatTextRequest):
+        """
+        Run one chat turn and yield it as Server-Sent Events.
+        `token` events carry the reply text as it is decoded; a final `done` event
+        carries the ChatTextResponse once the turn has been persisted.
+
+        The turn runs in a task with its own session, so a client disconnect neither
+        aborts it halfway through persisting nor closes the session under it.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def on_token(delta: str):
+            await queue.put(("token", {"delta": delta}))
+
+        async def run_turn():
+            try:
+                async with session_scope() as db:
+                    result = await cls(db).process_chat_message(request, on_token=on_token)
+                await queue.put(("done", result.model_dump(mode="json")))
+            except HTTPException as e:
+                await queue.put(("error", {"status_code": e.status_code, "detail": e.detail}))
+            except Exception:
+                logger.exception("Streaming chat turn failed for record %s", request.record_id)
+                await queue.put(("error", {"status_code": 500, "detail": "Failed to process message."}))
+            finally:
+                await queue.put(None)
 
+        task = asyncio.create_task(run_turn())
+        try:
+            while (item := await queue.get()) is not None:
+                event, data = item
+                yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+        finally:
+            if not task.done():
+                # Left to finish on its own; nothing reads its events any more
+                _detached_turns.add(task)
+                task.add_done_callback(_detached_turns.discard)
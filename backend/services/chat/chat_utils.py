@@ -1,73 +1,90 @@
-﻿from graph.chains.extraction_chain import create_extraction_chain
-from graph.chains.conversation_after_chain import create_conversation_after_chain
-from graph.chains.conversation_chain import create_conversation_chain
-from graph.chains.information_chain import create_information_chain
-from graph.chains.diagnosis_chain import create_diagnosis_chain
+﻿from graph.chains.inputs import conversation_after_inputs, conversation_inputs, information_inputs, normalize_record
+from graph.chains.registry import get_chain
 from services.contact.options import get_allowed_addresses, get_facilities_by_address
-import json
 
-def _normalize_record(medical_record):
-    try:
-        if hasattr(medical_record, 'data'):
-            return getattr(medical_record, 'data') or {}
-    except Exception:
-        pass
-    return medical_record or {}
+def _conversation_after_inputs(diagnosis, history, message, medical_record, history_summary=""):
+    return conversation_after_inputs(
+        diagnosis, history, message, medical_record, history_summary,
+        allowed_addresses=get_allowed_addresses(),
+        facilities_by_address=get_facilities_by_address(),
+    )
+
+async def _astream_generation(chain, inputs, schema, on_token):
+    """Run a streaming chain, forwarding each new piece of `generation` to on_token.
+
+    Returns the completed structured output, validated against schema.
+    """
+    sent = ""
+    result = {}
+    async for partial in chain.astream(inputs):
+        if not isinstance(partial, dict):
+            continue
+        result = partial
+        generation = partial.get("generation")
+        # Partial JSON may briefly drop an unfinished escape sequence; only emit clean extensions
+        if isinstance(generation, str) and len(generation) > len(sent) and generation.startswith(sent):
+            await on_token(generation[len(sent):])
+            sent = generation
+    return schema.model_validate(result)
 
 def get_ai_response(medical_record, reasoning, note, history, message, diseases_already_asked, disease_to_ask):
-    # Ensure plain-text for prompt interpolation
-    if isinstance(reasoning, (dict, list)):
-        try:
-            reasoning_text = json.dumps(reasoning, ensure_ascii=False)
-        except Exception:
-            reasoning_text = str(reasoning)
-    elif reasoning is None:
-        reasoning_text = ""
-    else:
-        reasoning_text = str(reasoning)
-
-    note_text = "" if note is None else str(note)
-
-    conversation_chain = create_conversation_chain(
-        reasoning=reasoning_text,
-        note=note_text,
-        conversation_history=history,
-        message=message,
-        diseases_already_asked=diseases_already_asked,
-        disease_to_ask=disease_to_ask
-    )
-    response = conversation_chain.invoke({"medical_record": _normalize_record(medical_record), "reasoning": reasoning, "note": note_text, "diseases_already_asked": diseases_already_asked})
+    inputs = conversation_inputs(medical_record, reasoning, note, history, message, diseases_already_asked, disease_to_ask)
+    response = get_chain("conversation").invoke(inputs)
+
+    return response
+
+async def aget_ai_response(medical_record, reasoning, note, history, message, diseases_already_asked, disease_to_ask, on_token=None, history_summary=""):
+    inputs = conversation_inputs(medical_record, reasoning, note, history, message, diseases_already_asked, disease_to_ask, history_summary)
+    if on_token is not None:
+        from graph.chains.conversation_chain import Conversation
+
+        return await _astream_generation(get_chain("conversation_stream"), inputs, Conversation, on_token)
+    response = await get_chain("conversation").ainvoke(inputs)
 
     return response
 
 def get_information(medical_record, history, message):
-    information_chain = create_information_chain(conversation_history=history, message=message)
-    response = information_chain.invoke({"medical_record": _normalize_record(medical_record)})
+    response = get_chain("information").invoke(information_inputs(medical_record, history, message))
+
+    return response
+
+async def aget_information(medical_record, history, message):
+    response = await get_chain("information").ainvoke(information_inputs(medical_record, history, message))
 
     return response
 
 def get_diagnosis(medical_record, history, note):
-    diagnosis_chain = create_diagnosis_chain()
-    response = diagnosis_chain.invoke({"medical_record": _normalize_record(medical_record), "history": history, "note": note})
+    response = get_chain("diagnosis").invoke({"medical_record": normalize_record(medical_record), "history": history, "note": note})
+
+    return response
+
+async def aget_diagnosis(medical_record, history, note):
+    response = await get_chain("diagnosis").ainvoke({"medical_record": normalize_record(medical_record), "history": history, "note": note})
 
     return response
 
 def get_conversation_after(diagnosis, history, message, medical_record):
-    if message == "###DIAGNOSIS###":
-        dummy_message = ""
-    else:
-        dummy_message = message
-    allowed_addresses = get_allowed_addresses()
-    facilities_by_address = get_facilities_by_address()
-    conversation_after_chain = create_conversation_after_chain(conversation_history=history, message=dummy_message, allowed_addresses=allowed_addresses, facilities_by_address=facilities_by_address)
-    response = conversation_after_chain.invoke({"diagnosis": diagnosis, "medical_record": _normalize_record(medical_record)})
+    response = get_chain("conversation_after").invoke(_conversation_after_inputs(diagnosis, history, message, medical_record))
+
+    return response
+
+async def aget_conversation_after(diagnosis, history, message, medical_record, on_token=None, history_summary=""):
+    inputs = _conversation_after_inputs(diagnosis, history, message, medical_record, history_summary)
+    if on_token is not None:
+        from graph.chains.conversation_after_chain import Conversation as ConversationAfter
+
+        return await _astream_generation(get_chain("conversation_after_stream"), inputs, ConversationAfter, on_token)
+    response = await get_chain("conversation_after").ainvoke(inputs)
 
     return response
 
 def update_medical_record(medical_record, history):
-    update_medical_record_chain = create_extraction_chain()
-    response = update_medical_record_chain.invoke({"medical_record": _normalize_record(medical_record), "history": history})
+    response = get_chain("extraction").invoke({"medical_record": normalize_record(medical_record), "history": history})
 
     return response
 
+async def aupdate_medical_record(medical_record, history):
+    response = await get_chain("extraction").ainvoke({"medical_record": normalize_record(medical_record), "history": history})
+
+    return response
 
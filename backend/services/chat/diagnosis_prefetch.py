@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from database import session_scope
+from entities.predicted_diseases_entity import DiagnosisResponse
+from repositories import AIStateRepo, ChatHistoryRepo, MedicalRecordRepo, PendingDiagnosisRepo
+from services.chat.chat_utils import aget_diagnosis
+
+logger = logging.getLogger(__name__)
+
+# How long the ###DIAGNOSIS### turn waits for a diagnosis computed elsewhere
+# (another worker) before computing it inline.
+JOIN_TIMEOUT_SECONDS = 90
+_POLL_INTERVAL_SECONDS = 0.5
+
+# (user_id, record_id) -> in-flight diagnosis task of this process
+_inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+
+
+def _key(user_id, record_id) -> Tuple[str, str]:
+    return (str(user_id), str(record_id))
+
+
+async def _run_diagnosis(user_id, record_id) -> Optional[DiagnosisResponse]:
+    # Runs outside the request that scheduled it, so it uses its own sessions; none is
+    # held open across the LLM call so the background work does not pin a pooled connection
+    async with session_scope() as db:
+        history = await ChatHistoryRepo(db).get_chat_history(user_id=user_id, record_id=record_id)
+        ai_state = await AIStateRepo(db).get_ai_state(user_id=user_id, record_id=record_id)
+        medical_record = await MedicalRecordRepo(db).get_medical_record_by_id(user_id=user_id, record_id=record_id)
+        history_count = len(history)
+        await PendingDiagnosisRepo(db).set_status(user_id=user_id, record_id=record_id, status="running", history_count=history_count)
+
+    try:
+        response = await aget_diagnosis(medical_record, history, ai_state.data.get("note", ""))
+    except Exception:
+        logger.exception("Background diagnosis failed for record %s", record_id)
+        response = None
+
+    async with session_scope() as db:
+        await PendingDiagnosisRepo(db).set_status(
+            user_id=user_id,
+            record_id=record_id,
+            status="ready" if response is not None else "failed",
+            history_count=history_count,
+            result=response.model_dump(mode="json") if response is not None else None,
+        )
+    return response
+
+
+def start_diagnosis(user_id, record_id) -> None:
+    """
+    Start computing the diagnosis for a record in the background.
+
+    Called as soon as the questioning stage decides on DIAGNOSIS, so that the
+    following ###DIAGNOSIS### turn can pick up the result instead of starting the call.
+    """
+    key = _key(user_id, record_id)
+    task = _inflight.get(key)
+    if task is not None and not task.done():
+        return
+    task = asyncio.create_task(_run_diagnosis(user_id, record_id))
+    _inflight[key] = task
+    task.add_done_callback(lambda t: _inflight.pop(key, None) if _inflight.get(key) is t else None)
+
+
+async def take_diagnosis(db, user_id, record_id, history_count: int) -> Optional[DiagnosisResponse]:
+    """
+    Return the speculative diagnosis for a record, joining it if it is still running.
+
+    Returns None when there is none, it failed, or it was computed from a different
+    history than the current one; the caller then computes the diagnosis inline.
+    The pending row is consumed either way.
+    """
+    pending_repo = PendingDiagnosisRepo(db)
+    response = None
+    task = _inflight.get(_key(user_id, record_id))
+    if task is not None:
+        try:
+            # shield: a cancelled request must not cancel the shared computation
+            response = await asyncio.shield(task)
+        except Exception:
+            logger.exception("Background diagnosis task failed for record %s", record_id)
+    else:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + JOIN_TIMEOUT_SECONDS
+        while True:
+            row = await pending_repo.get(user_id=user_id, record_id=record_id)
+            if row is None or row.status != "running" or loop.time() >= deadline:
+                break
+            await asyncio.sleep(_POLL_INTERVAL_SECONDS)
+        if row is not None and row.status == "ready" and row.history_count == history_count:
+            response = DiagnosisResponse.model_validate(row.result)
+
+    row = await pending_repo.get(user_id=user_id, record_id=record_id)
+    if row is not None and row.history_count != history_count:
+        response = None
+    await pending_repo.delete(user_id=user_id, record_id=record_id)
+    return response
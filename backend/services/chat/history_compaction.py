@@ -0,0 +1,86 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List
+import logging
+
+from graph.chains.registry import get_chain
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CompactionPolicy:
+    # Token budget for the verbatim part of the history sent with each turn
+    max_history_tokens: int
+    # Most recent messages that always stay verbatim
+    keep_recent_messages: int
+
+
+# Per-chain budgets. Compaction folds everything but the recent tail at once, so a
+# summarization call happens roughly once every (budget - tail) tokens of conversation.
+COMPACTION_POLICIES: Dict[str, CompactionPolicy] = {
+    "conversation": CompactionPolicy(max_history_tokens=3000, keep_recent_messages=10),
+    "conversation_after": CompactionPolicy(max_history_tokens=3000, keep_recent_messages=10),
+}
+
+# Per-message overhead of the chat format (role markers, separators)
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+
+@dataclass
+class CompactedHistory:
+    summary: str
+    summarized_count: int
+    messages: List[Any] = field(default_factory=list)
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+        return tiktoken.encoding_for_model("gpt-4o")
+    except Exception:
+        # BPE files are fetched on first use; offline workers fall back to an estimate
+        logger.warning("tiktoken encoding unavailable, estimating token counts")
+        return None
+
+
+def count_tokens(messages) -> int:
+    enc = _encoding()
+    total = 0
+    for msg in messages:
+        content = msg.content or ""
+        total += _MESSAGE_OVERHEAD_TOKENS + (len(enc.encode(content)) if enc else len(content) // 3 + 1)
+    return total
+
+
+async def compact_history(history, state_data: Dict[str, Any], policy: CompactionPolicy) -> CompactedHistory:
+    """
+    Split history into a rolling summary plus the verbatim tail that fits the policy.
+
+    `state_data` is the AIState payload; its `history_summary` / `summarized_count`
+    record how many leading messages are already folded into the summary. The
+    returned values should be written back to the state by the caller.
+    """
+    summary = (state_data or {}).get("history_summary") or ""
+    summarized_count = int((state_data or {}).get("summarized_count") or 0)
+    history = list(history or [])
+    if summarized_count > len(history):
+        summary, summarized_count = "", 0
+
+    pending = history[summarized_count:]
+    if len(pending) <= policy.keep_recent_messages or count_tokens(pending) <= policy.max_history_tokens:
+        return CompactedHistory(summary=summary, summarized_count=summarized_count, messages=pending)
+
+    to_fold = pending[:-policy.keep_recent_messages]
+    try:
+        summary = await get_chain("summary").ainvoke(
+            {"summary": summary, "messages": [(msg.role, msg.content) for msg in to_fold]}
+        )
+    except Exception:
+        # A failed summary only costs prompt size; keep the turn going with the full tail
+        logger.exception("History compaction failed, sending uncompacted history")
+        return CompactedHistory(summary=summary, summarized_count=summarized_count, messages=pending)
+
+    summarized_count += len(to_fold)
+    return CompactedHistory(summary=summary, summarized_count=summarized_count, messages=pending[-policy.keep_recent_messages:])
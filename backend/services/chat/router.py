@@ -1,46 +1,87 @@
 import asyncio
 
-from fastapi import APIRouter, Depends, Response
-from sqlmodel import Session
+from fastapi import APIRouter, Depends, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
 from database import get_session
 from services.chat.chat_service import ChatService
 from models.dto.modelDto import AddMedicalRecordRequest, AddMedicalRecordResponse, ChatTextRequest, ChatTextResponse, GetChatHistoryRequest, TTSRequest
-from services.voice.tts import synthesize_speech
+from services.voice.tts import asynthesize_speech
+from services.voice.voice_stream import stream_voice_reply
 import base64
 
 router = APIRouter(prefix="/v1/chat")
 
 @router.post("/new-record", response_model=AddMedicalRecordResponse)
-async def create_record(request: AddMedicalRecordRequest, db: Session = Depends(get_session)):
+async def create_record(request: AddMedicalRecordRequest, db: AsyncSession = Depends(get_session)):
     service = ChatService(db)
     result = await service.create_new_medical_record(request)
     return result
 
 @router.get("")
-async def get_chat_history(request: GetChatHistoryRequest = Depends(), db: Session = Depends(get_session)):
+async def get_chat_history(request: GetChatHistoryRequest = Depends(), db: AsyncSession = Depends(get_session)):
     service = ChatService(db)
     result = await service.get_history(request)
     return result
 
 @router.post("/chat", response_model=ChatTextResponse)
-async def send_message(request: ChatTextRequest, db: Session = Depends(get_session)):
+async def send_message(request: ChatTextRequest, db: AsyncSession = Depends(get_session)):
     service = ChatService(db)
     result = await service.process_chat_message(request)
     return result
 
 
+@router.post("/chat/stream")
+async def stream_message(request: ChatTextRequest):
+    """Same turn as /chat, streamed as Server-Sent Events (`token` deltas, then `done`)."""
+    return StreamingResponse(
+        ChatService.stream_chat_message(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/voice")
-async def send_voice_message(request: ChatTextRequest, db: Session = Depends(get_session)):
+async def send_voice_message(request: ChatTextRequest, db: AsyncSession = Depends(get_session)):
     """Process a chat message and return both text and TTS audio (base64)."""
     service = ChatService(db)
     result = await service.process_chat_message(request)
-    audio_bytes = synthesize_speech(result.message)
+    audio_bytes = await asynthesize_speech(result.message)
     audio_b64 = base64.b64encode(audio_bytes).decode("ascii")
     return {"text": result.message, "audio_b64": audio_b64, "content_type": "audio/mpeg"}
 
 
+@router.websocket("/voice/ws")
+async def voice_socket(websocket: WebSocket):
+    """
+    Voice chat over a WebSocket, one turn per ChatTextRequest JSON message received.
+
+    For each turn the server sends the reply audio as binary MP3 frames, one per
+    sentence and starting while the rest of the reply is still being generated,
+    then a JSON text frame {"type": "done", ...ChatTextResponse} or
+    {"type": "error", "status_code": ..., "detail": ...}.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            try:
+                # Invalid JSON (a ValueError) is answered like an invalid request
+                payload = await websocket.receive_json()
+                request = ChatTextRequest.model_validate(payload)
+            except ValueError as e:
+                await websocket.send_json({"type": "error", "status_code": 422, "detail": str(e)})
+                continue
+            async for event, data in stream_voice_reply(request, payload.get("voice_id")):
+                if event == "audio":
+                    await websocket.send_bytes(data)
+                else:
+                    await websocket.send_json({"type": event, **data})
+    except WebSocketDisconnect:
+        pass
+
+
 @router.post("/tts")
 async def text_to_speech(request: TTSRequest):
     """Synthesize arbitrary text to speech (for initial AI message)."""
-    audio_bytes = synthesize_speech(request.text, request.voice_id)
+    audio_bytes = await asynthesize_speech(request.text, request.voice_id)
     return Response(content=audio_bytes, media_type="audio/mpeg")
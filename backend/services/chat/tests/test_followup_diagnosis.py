@@ -0,0 +1,43 @@
+"""
+conversation_after gets the diagnosis in the same shape on the turn that computes it and on
+the later turns that read it back from the diagnoses table.
+"""
+import asyncio
+import uuid
+
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from entities.predicted_diseases_entity import Diagnosis as DiagnosisResult, DiagnosisResponse, FurtherTest
+from models.entities.model import Diagnosis
+from repositories import DiagnosisRepo
+from services.chat.chat_service import ChatService, _followup_diagnosis
+
+
+def test_fresh_and_stored_diagnosis_have_the_same_shape():
+    response = DiagnosisResponse(
+        reasoning_process="fever and cough",
+        diagnosis=DiagnosisResult(),
+        further_test=[FurtherTest(name="X-ray", purpose="rule out pneumonia", related_condition=["pneumonia"], urgency="urgent")],
+        todo=None,
+    )
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Diagnosis.__table__.create)
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                user_id, record_id = uuid.uuid4(), uuid.uuid4()
+                # What the diagnosis turn stores, then what the following turns read back
+                await ChatService(db)._save_diagnosis(user_id, record_id, None, response)
+                latest = await DiagnosisRepo(db).get_latest(user_id=user_id, record_id=record_id)
+                return latest
+        finally:
+            await engine.dispose()
+
+    latest = asyncio.run(run())
+    fresh = _followup_diagnosis(response.reasoning_process, response.diagnosis, response.further_test)
+    stored = _followup_diagnosis(latest.reasoning_process, latest.diagnosis, latest.further_test)
+    assert fresh == stored
+    assert fresh["further_test"] == {"items": [response.further_test[0].model_dump(mode="json")]}
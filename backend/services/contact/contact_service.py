@@ -1,8 +1,10 @@
-﻿from uuid import UUID
-from sqlmodel import Session
+﻿from datetime import datetime
+from uuid import UUID
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import HTTPException
 
 from repositories.contact_repo import ContactRepo
+from utils.cursor import decode_cursor, encode_cursor
 from models.entities.model import User
 from models.dto.modelDto import (
     SendContactRequest, SendContactResponse,
@@ -14,12 +16,12 @@ from models.dto.modelDto import (
 
 
 class ContactService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.repo = ContactRepo(db)
 
     async def send(self, req: SendContactRequest) -> SendContactResponse:
-        c = self.repo.create_contact(
+        c = await self.repo.create_contact(
             patient_id=UUID(req.user_id),
             record_id=UUID(req.record_id),
             address=req.address,
@@ -29,38 +31,37 @@ class ContactService:
         return SendContactResponse(ok=True, contact_id=str(c.id))
 
     async def list_patients(self, req: ListPatientsRequest) -> ListPatientsResponse:
-        rows = self.repo.list_for_doctor(doctor_id=UUID(req.doctor_id))
+        rows, has_more = await self.repo.list_for_doctor(
+            doctor_id=UUID(req.doctor_id),
+            limit=req.limit,
+            before=decode_cursor(req.cursor) if req.cursor else None,
+            full_name=req.full_name,
+        )
+        this_year = datetime.utcnow().year
         cards: list[PatientCard] = []
         for c in rows:
-            mr = (c.payload or {}).get("medical_record", {}) or {}
-            pi = mr.get("patient_info", {}) or {}
-            full_name = pi.get("full_name", "Unknown")
-            # derive age
-            age = 0
-            try:
-                bday = pi.get("birthday")
-                if bday:
-                    y = int(str(bday)[0:4])
-                    from datetime import datetime
-                    age = max(0, datetime.utcnow().year - y)
-            except Exception:
-                age = 0
             cards.append(PatientCard(
                 contact_id=str(c.id),
                 patient_user_id=str(c.patient_id),
-                full_name=full_name,
-                age=age,
-                address=pi.get("address") or c.address,
+                full_name=c.patient_name or "Unknown",
+                # derive age
+                age=max(0, this_year - c.birth_year) if c.birth_year else 0,
+                address=c.patient_address or c.address,
+                status=c.status,
+                last_message_at=c.last_message_at,
             ))
-        return ListPatientsResponse(patients=cards)
+        return ListPatientsResponse(
+            patients=cards,
+            next_cursor=encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+        )
 
     async def detail(self, req: GetContactDetailRequest) -> ContactDetailResponse:
         from uuid import UUID as _UUID
-        c = self.repo.get_contact(contact_id=_UUID(req.contact_id))
+        c = await self.repo.get_contact(contact_id=_UUID(req.contact_id))
         if not c:
             raise HTTPException(status_code=404, detail="contact not found")
 
-        payload = c.payload or {}
+        payload = await self.repo.get_payload(c)
         mr = payload.get("medical_record") or {}
         diag = payload.get("diagnosis") or None
         # normalize further_test to a list
@@ -99,7 +100,7 @@ class ContactService:
 
     async def get_messages(self, contact_id: str) -> ContactMessagesResponse:
         from uuid import UUID as _UUID
-        rows = self.repo.get_messages(contact_id=_UUID(contact_id))
+        rows = await self.repo.get_messages(contact_id=_UUID(contact_id))
         return ContactMessagesResponse(messages=[
             ContactMessageDto(
                 id=str(r.id),
@@ -109,13 +110,13 @@ class ContactService:
 
     async def send_message(self, req: ContactMessageRequest) -> ContactMessageDto:
         from uuid import UUID as _UUID
-        sender = self.db.get(User, UUID(req.sender_id))
+        sender = await self.db.get(User, UUID(req.sender_id))
         role = 'doctor' if (sender and getattr(sender, 'role_type', '') == 'doctor') else 'patient'
-        row = self.repo.add_message(contact_id=_UUID(req.contact_id), sender_id=_UUID(req.sender_id), role=role, content=req.content)
+        row = await self.repo.add_message(contact_id=_UUID(req.contact_id), sender_id=_UUID(req.sender_id), role=role, content=req.content)
         return ContactMessageDto(id=str(row.id), role=row.role, content=row.content, created_at=row.created_at)
 
     async def my_doctors(self, patient_id: str) -> MyDoctorsResponse:
-        rows = self.repo.get_my_doctors(patient_id=UUID(patient_id))
+        rows = await self.repo.get_my_doctors(patient_id=UUID(patient_id))
         items = []
         for r in rows:
             items.append({
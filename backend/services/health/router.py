@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Response, status
+
+from services.health.warmup import get_warm_up
+
+router = APIRouter(prefix="/v1/health")
+
+@router.get("/ready")
+async def get_ready(response: Response):
+    # 503 until the chains are warm, so the load balancer keeps this worker out of rotation
+    warm_up = get_warm_up()
+    if not warm_up.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return warm_up.status()
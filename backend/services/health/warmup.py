@@ -0,0 +1,68 @@
+"""
+Startup warm-up. The app imports without langchain / openai (see graph.chains.registry);
+once it has started, the served chains are imported and built in a worker thread, so the
+first chat turn does not pay for them. /v1/health/ready reports when this has finished.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from graph.chains.registry import warm_up
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    def __init__(self):
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None and self.error is None
+
+    def status(self) -> Dict[str, Any]:
+        if self.ready:
+            state = "ready"
+        elif self.error is not None:
+            state = "failed"
+        elif self.started_at is not None:
+            state = "warming_up"
+        else:
+            state = "pending"
+        out: Dict[str, Any] = {"status": state}
+        if self.finished_at is not None:
+            out["duration_s"] = round(self.finished_at - self.started_at, 3)
+        if self.error is not None:
+            out["error"] = self.error
+        return out
+
+    def start(self) -> None:
+        """Begin warming up in the background (call on app startup)."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        self.started_at = time.monotonic()
+        try:
+            # Imports and client construction are blocking; keep them off the event loop
+            await asyncio.to_thread(warm_up)
+        except Exception as e:
+            logger.exception("Chain warm-up failed")
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            self.finished_at = time.monotonic()
+            logger.info("Chain warm-up finished: %s", self.status())
+
+
+_warm_up: Optional[WarmUp] = None
+
+
+def get_warm_up() -> WarmUp:
+    global _warm_up
+    if _warm_up is None:
+        _warm_up = WarmUp()
+    return _warm_up
@@ -0,0 +1,23 @@
+"""
+Rebuild conversation_summaries from chat_history, for databases created before the
+table existed without going through the Alembic migration:
+
+    python -m services.history.backfill_summaries
+"""
+import asyncio
+
+from database import create_db_and_tables, engine, session_scope
+from repositories import ConversationSummaryRepo
+
+
+async def main():
+    await create_db_and_tables()
+    try:
+        async with session_scope() as db:
+            await ConversationSummaryRepo(db).backfill()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
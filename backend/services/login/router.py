@@ -1,11 +1,13 @@
 ﻿# auth.py
-from repositories.medical_record_repo import MedicalRecordRepo
+import uuid
 from fastapi import APIRouter, Depends, HTTPException, Response, status, Request
-from sqlalchemy.orm import Session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from database import get_session
 from models.entities.model import User
 from models.dto.modelDto import LoginRequest, TokenResponse, UserPublic, RegisterRequest
 from services.login.security import verify_password, create_access_token, create_refresh_token, decode_token, hash_password
+from services.login.token_cache import AuthUser, get_token_cache
 from conf.setting import settings
 from sqlalchemy.exc import IntegrityError
 
@@ -26,7 +28,7 @@ def clear_refresh_cookie(resp: Response):
     resp.delete_cookie(settings.COOKIE_NAME, path="/auth")
 
 
-def get_current_user(request: Request, db: Session = Depends(get_session)) -> User:
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_session)) -> AuthUser:
     auth = request.headers.get("authorization") or request.headers.get("Authorization")
     if not auth or not auth.startswith("Bearer "):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing bearer token")
@@ -40,7 +42,24 @@ def get_current_user(request: Request, db: Session = Depends(get_session)) -> Us
     if payload.get("type") != "access":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
 
-    user = db.get(User, payload.get("sub"))
+    try:
+        user_id = uuid.UUID(str(payload.get("sub")))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token")
+
+    # A cached entry is only trusted for the version it holds; any other version is re-checked
+    cache = get_token_cache()
+    user = cache.get(user_id)
+    if user is None or payload.get("ver") != user.token_version:
+        epoch = cache.epoch
+        row = (await db.exec(
+            select(User.id, User.username, User.role_type, User.is_active, User.token_version, User.latest_record_id)
+            .where(User.id == user_id)
+        )).first()
+        user = AuthUser(*row) if row else None
+        if user:
+            cache.fill(user, epoch)
+
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found or inactive")
 
@@ -50,38 +69,33 @@ def get_current_user(request: Request, db: Session = Depends(get_session)) -> Us
     return user
 
 @router.get("/me", response_model=UserPublic)
-def get_me(current: User = Depends(get_current_user), db: Session = Depends(get_session)):
-    medical_record_repo = MedicalRecordRepo(db)
-    record_id = medical_record_repo.get_latest_record_id(user_id=current.id)
-    if not record_id:
-        record_id = ""
+async def get_me(current: AuthUser = Depends(get_current_user), db: AsyncSession = Depends(get_session)):
+    record_id = current.latest_record_id or ""
     return UserPublic(id=str(current.id), record_id=str(record_id), username=current.username, is_active=current.is_active, role=current.role_type)
 
 @router.post("/login", response_model=TokenResponse)
-def login(payload: LoginRequest, response: Response, db: Session = Depends(get_session)):
-    user = db.query(User).filter(User.username == payload.username).first()
-    if not user or not verify_password(payload.password, user.hashed_password):
+async def login(payload: LoginRequest, response: Response, db: AsyncSession = Depends(get_session)):
+    user = (await db.exec(select(User).where(User.username == payload.username))).first()
+    if not user or not await verify_password(payload.password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     # rotate on login: bump version so any prior refresh is dead
     user.token_version += 1
-    db.add(user); db.commit(); db.refresh(user)
+    db.add(user); await db.commit(); await db.refresh(user)
+    await get_token_cache().invalidate(user.id)
 
     refresh = create_refresh_token(user.id, user.token_version)
     set_refresh_cookie(response, refresh)
 
     access = create_access_token(user.id, user.token_version)
-    medical_record_repo = MedicalRecordRepo(db)
-    record_id = medical_record_repo.get_latest_record_id(user_id=user.id)
-    if not record_id:
-        record_id = ""
+    record_id = user.latest_record_id or ""
     return TokenResponse(
         accessToken=access,
         user=UserPublic(id=str(user.id), record_id=str(record_id), username=user.username, is_active=user.is_active, role=user.role_type),
     )
 
 @router.post("/refresh", response_model=TokenResponse)
-def refresh(request: Request, response: Response, db: Session = Depends(get_session)):
+async def refresh(request: Request, response: Response, db: AsyncSession = Depends(get_session)):
     cookie = request.cookies.get(settings.COOKIE_NAME)
     if not cookie:
         raise HTTPException(status_code=401, detail="No refresh token")
@@ -94,7 +108,7 @@ def refresh(request: Request, response: Response, db: Session = Depends(get_sess
     if payload.get("type") != "refresh":
         raise HTTPException(status_code=401, detail="Invalid token type")
 
-    user = db.get(User, payload["sub"])
+    user = await db.get(User, payload["sub"])
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="User not found or inactive")
 
@@ -104,23 +118,21 @@ def refresh(request: Request, response: Response, db: Session = Depends(get_sess
 
     # rotate refresh: bump version -> old refresh becomes invalid immediately
     user.token_version += 1
-    db.add(user); db.commit(); db.refresh(user)
+    db.add(user); await db.commit(); await db.refresh(user)
+    await get_token_cache().invalidate(user.id)
 
     new_refresh = create_refresh_token(user.id, user.token_version)
     set_refresh_cookie(response, new_refresh)
 
     new_access = create_access_token(user.id, user.token_version)
-    medical_record_repo = MedicalRecordRepo(db)
-    record_id = medical_record_repo.get_latest_record_id(user_id=user.id)
-    if not record_id:
-        record_id = ""
+    record_id = user.latest_record_id or ""
     return TokenResponse(
         accessToken=new_access,
         user=UserPublic(id=str(user.id), record_id=str(record_id), username=user.username, is_active=user.is_active, role=user.role_type),
     )
 
 @router.post("/register", response_model=TokenResponse, status_code=status.HTTP_201_CREATED)
-def register(payload: RegisterRequest, response: Response, db: Session = Depends(get_session)):
+async def register(payload: RegisterRequest, response: Response, db: AsyncSession = Depends(get_session)):
     # Enforce required metadata for doctor role
     if payload.role == "doctor":
         meta = payload.metadata or {}
@@ -130,7 +142,7 @@ def register(payload: RegisterRequest, response: Response, db: Session = Depends
             raise HTTPException(status_code=400, detail="Doctor registration requires address and facility")
     user = User(
         username=payload.username,
-        hashed_password=hash_password(payload.password),
+        hashed_password=await hash_password(payload.password),
         role_type=payload.role,
         user_metadata=payload.metadata or {},
         is_active=True,
@@ -138,31 +150,29 @@ def register(payload: RegisterRequest, response: Response, db: Session = Depends
     )
     db.add(user)
     try:
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=409, detail="username already registered")
 
     # rotate on first issue (optional, keeps parity with login flow)
     user.token_version += 1
-    db.add(user); db.commit(); db.refresh(user)
+    db.add(user); await db.commit(); await db.refresh(user)
+    await get_token_cache().invalidate(user.id)
 
     refresh = create_refresh_token(user.id, user.token_version)
     set_refresh_cookie(response, refresh)
 
     access = create_access_token(user.id, user.token_version)
-    medical_record_repo = MedicalRecordRepo(db)
-    record_id = medical_record_repo.get_latest_record_id(user_id=user.id)
-    if not record_id:
-        record_id = ""
+    record_id = user.latest_record_id or ""
     return {
         "accessToken": access,
         "user": UserPublic(id=str(user.id), record_id=str(record_id), username=user.username, is_active=user.is_active, role=user.role_type),
     }
 
 @router.post("/logout")
-def logout(response: Response, db: Session = Depends(get_session), request: Request = None):
+async def logout(response: Response, db: AsyncSession = Depends(get_session), request: Request = None):
     # If you want server-side revoke, you can bump version if user is known.
     # Without an access token here, a simple cookie clear is okay.
     clear_refresh_cookie(response)
@@ -1,23 +1,160 @@
 # security.py
+import asyncio
+import logging
+import multiprocessing
+import threading
 import time
-from typing import Any, Literal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Literal, Optional, Tuple
 
 import jwt
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
 
+from config import Config
 from conf.setting import settings  # you already use this in auth.py
+from utils.metrics import LatencyWindow, register_metrics
+
+logger = logging.getLogger(__name__)
 
 # bcrypt hasher
 _pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 # --- Password helpers ---
-def hash_password(password: str) -> str:
-    return _pwd.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return _pwd.verify(plain_password, hashed_password)
+# bcrypt is deliberately slow, so it runs in its own process pool instead of the event
+# loop or the threadpool shared with the sync routes; a burst of logins only queues there.
+
+def _hash_in_worker(password: str) -> Tuple[str, float, float]:
+    started, clock = time.time(), time.perf_counter()
+    return _pwd.hash(password), started, time.perf_counter() - clock
+
+
+def _verify_in_worker(plain_password: str, hashed_password: str) -> Tuple[bool, float, float]:
+    started, clock = time.time(), time.perf_counter()
+    return _pwd.verify(plain_password, hashed_password), started, time.perf_counter() - clock
+
+
+class PasswordHasher:
+    """Bounded process pool: `workers` hashes at a time, at most `max_queue` more waiting."""
+
+    def __init__(self, workers: int, max_queue: int, retry_after: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.rejected = 0
+        self.restarts = 0
+        self.hash_latency = LatencyWindow()
+        self.queue_wait = LatencyWindow()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Submitted and not finished yet; a cancelled request keeps its slot until the worker is done
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "PasswordHasher":
+        return cls(Config.PASSWORD_HASH_WORKERS, Config.PASSWORD_HASH_MAX_QUEUE, Config.PASSWORD_HASH_RETRY_AFTER)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+            "hash_latency": self.hash_latency.summary(),
+            "queue_wait": self.queue_wait.summary(),
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: forking a process that runs an event loop and DB driver threads is unsafe
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    def _saturated(self) -> HTTPException:
+        self.rejected += 1
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in requests, please retry shortly",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def _unavailable(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Password checking is temporarily unavailable, please retry shortly",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        # Concurrent requests see the same broken pool; only the first one replaces it
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, fn: Callable[..., Tuple[Any, float, float]], *args) -> Any:
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                raise self._saturated()
+            self._in_flight += 1
+        submitted = time.time()
+        for attempt in (1, 2):
+            executor = self._get_executor()
+            try:
+                try:
+                    future = executor.submit(fn, *args)
+                except BaseException:
+                    self._release(None)
+                    raise
+                future.add_done_callback(self._release)
+                result, started, elapsed = await asyncio.wrap_future(future)
+                break
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed): replace the pool and retry once on the new one
+                logger.exception("Password hashing pool is broken, restarting it")
+                self._restart(executor)
+                if attempt == 2:
+                    raise self._unavailable()
+                # The slot went with the failed future; the retry was admitted already
+                with self._lock:
+                    self._in_flight += 1
+        self.queue_wait.observe(max(0.0, started - submitted))
+        self.hash_latency.observe(elapsed)
+        return result
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher.from_config()
+        register_metrics("password_hashing", _hasher.metrics)
+    return _hasher
+
+
+async def hash_password(password: str) -> str:
+    """bcrypt hash; raises a 503 with Retry-After when the hashing pool is saturated."""
+    return await get_password_hasher().run(_hash_in_worker, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Check a password against its hash; raises a 503 with Retry-After when the pool is saturated."""
+    return await get_password_hasher().run(_verify_in_worker, plain_password, hashed_password)
 
 
 # --- JWT helpers ---
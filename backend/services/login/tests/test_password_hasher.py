@@ -0,0 +1,63 @@
+"""
+bcrypt process pool: hashes round-trip, a saturated pool turns requests away at once
+with a 503 / Retry-After instead of queueing them, and a crashed pool is replaced.
+"""
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from services.login.security import PasswordHasher, _hash_in_worker, _verify_in_worker
+
+
+def test_saturated_pool_rejects_with_retry_after():
+    hasher = PasswordHasher(workers=1, max_queue=1, retry_after=2)
+
+    async def run():
+        hashed = await hasher.run(_hash_in_worker, "s3cret")
+        assert await hasher.run(_verify_in_worker, "s3cret", hashed)
+        assert not await hasher.run(_verify_in_worker, "wrong", hashed)
+
+        # One running, one queued: the third is rejected without waiting for either
+        busy = [asyncio.ensure_future(hasher.run(_hash_in_worker, f"pw{i}")) for i in range(2)]
+        await asyncio.sleep(0)
+        started = time.monotonic()
+        with pytest.raises(HTTPException) as rejected:
+            await hasher.run(_hash_in_worker, "pw3")
+        assert time.monotonic() - started < 0.05
+        assert rejected.value.status_code == 503 and rejected.value.headers == {"Retry-After": "2"}
+        await asyncio.gather(*busy)
+
+        # Slots are released once the workers are done
+        await hasher.run(_verify_in_worker, "s3cret", hashed)
+        metrics = hasher.metrics()
+        assert metrics["in_flight"] == 0 and metrics["rejected"] == 1
+        assert metrics["hash_latency"]["count"] == 6 and metrics["queue_wait"]["count"] == 6
+
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
+
+
+def test_crashed_pool_is_replaced():
+    hasher = PasswordHasher(workers=1, max_queue=1, retry_after=2)
+
+    async def run():
+        # The worker dies on the first try and again on the retry in a fresh pool
+        with pytest.raises(HTTPException) as failed:
+            await hasher.run(os._exit, 1)
+        assert failed.value.status_code == 503 and "unavailable" in failed.value.detail
+        metrics = hasher.metrics()
+        assert metrics["restarts"] == 2 and metrics["rejected"] == 0 and metrics["in_flight"] == 0
+
+        # The next request gets a working pool
+        hashed = await hasher.run(_hash_in_worker, "s3cret")
+        assert await hasher.run(_verify_in_worker, "s3cret", hashed)
+
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
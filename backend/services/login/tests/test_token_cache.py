@@ -0,0 +1,110 @@
+"""
+Token validation cache: get_current_user skips the database on a cached user, a bumped
+token_version revokes the old token at once, and invalidations reach the other workers
+through the Redis-protocol stand-in server.
+"""
+import asyncio
+import subprocess
+import sys
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import MetaData, event, update
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.requests import Request
+
+from models.entities.model import User
+from services.login.router import get_current_user
+from services.login.security import create_access_token
+from services.login.token_cache import AuthUser, RespBus, TokenCache, configure_token_cache
+
+
+def _request(token: str) -> Request:
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+def test_cached_user_skips_the_database_until_revoked():
+    cache = TokenCache(ttl=60, max_entries=100)
+    configure_token_cache(cache)
+
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://")
+        try:
+            async with engine.begin() as conn:
+                # users.id defaults to gen_random_uuid(), which SQLite does not have
+                users = User.__table__.to_metadata(MetaData())
+                users.c.id.server_default = None
+                await conn.run_sync(users.create)
+
+            async with AsyncSession(engine, expire_on_commit=False) as db:
+                user_id = uuid.uuid4()
+                db.add(User(id=user_id, username="patient", hashed_password="x", role_type="patient",
+                            user_metadata={}, token_version=1))
+                await db.commit()
+
+                selects = []
+
+                def capture(conn, cursor, statement, parameters, context, executemany):
+                    if statement.lstrip().upper().startswith("SELECT"):
+                        selects.append(statement)
+
+                event.listen(engine.sync_engine, "before_cursor_execute", capture)
+                old_token = create_access_token(user_id, 1)
+                first = await get_current_user(_request(old_token), db)
+                second = await get_current_user(_request(old_token), db)
+                assert first == second and second.username == "patient"
+                assert len(selects) == 1
+
+                # What login does: bump the version, commit, invalidate
+                await db.exec(update(User).where(User.id == user_id).values(token_version=2))
+                await db.commit()
+                await cache.invalidate(user_id)
+                with pytest.raises(HTTPException) as revoked:
+                    await get_current_user(_request(old_token), db)
+                assert revoked.value.detail == "Token revoked"
+                assert (await get_current_user(_request(create_access_token(user_id, 2)), db)).token_version == 2
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        finally:
+            await engine.dispose()
+    asyncio.run(run())
+
+
+def test_invalidation_reaches_other_workers():
+    server = subprocess.Popen(
+        [sys.executable, "-m", "utils.resp_server", "--port", "0"],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        url = "redis://" + server.stdout.readline().split()[-1]
+
+        async def run():
+            worker_a = TokenCache(ttl=60, max_entries=100, bus=RespBus(url))
+            worker_b = TokenCache(ttl=60, max_entries=100, bus=RespBus(url))
+            user = AuthUser(id=uuid.uuid4(), username="patient", role_type="patient", is_active=True, token_version=1)
+
+            # Not subscribed yet: nothing may be cached, an invalidation could be missed
+            worker_b.fill(user, worker_b.epoch)
+            assert worker_b.get(user.id) is None
+
+            for worker in (worker_a, worker_b):
+                worker.start()
+            while not (worker_a.bus.ready and worker_b.bus.ready):
+                await asyncio.sleep(0.01)
+            worker_b.fill(user, worker_b.epoch)
+            assert worker_b.get(user.id) == user
+
+            await worker_a.invalidate(user.id)
+            for _ in range(200):
+                if worker_b.get(user.id) is None:
+                    break
+                await asyncio.sleep(0.01)
+            assert worker_b.get(user.id) is None
+
+            for worker in (worker_a, worker_b):
+                await worker.stop()
+        asyncio.run(run())
+    finally:
+        server.terminate()
+        server.wait(timeout=5)
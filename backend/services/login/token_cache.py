@@ -0,0 +1,199 @@
+"""
+Short-lived cache of what get_current_user checks for an access token: is the user active,
+what is their token_version, and their role (plus what /auth/me shows).
+
+A revoked token stays revoked: login / refresh / register invalidate the user's entry
+right after bumping token_version, and the invalidation is published to the other workers
+through an InvalidationBus. With AUTH_INVALIDATION_URL set that is a Redis-protocol
+pub/sub channel; while its subscription is down nothing is served from the cache, and
+everything is dropped once it reconnects (messages may have been missed meanwhile).
+Without it invalidations stay in-process, so entries of other workers expire after the
+TTL, which is kept short.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Protocol, Tuple
+
+from config import Config
+from utils.metrics import register_metrics
+from utils.resp import RespClient, RespSubscriber
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AuthUser:
+    """The columns of User an authenticated request needs, named as on User."""
+    id: uuid.UUID
+    username: str
+    role_type: str
+    is_active: bool
+    token_version: int
+    latest_record_id: Optional[uuid.UUID] = None
+
+
+class InvalidationBus(Protocol):
+    # False while invalidations from other workers could be missed
+    ready: bool
+
+    async def publish(self, user_id: str) -> None: ...
+
+    async def listen(self, on_invalidate: Callable[[Optional[str]], None]) -> None:
+        """Deliver received user ids to `on_invalidate`, None meaning "drop everything"."""
+
+
+class LocalBus:
+    """Single worker, or one that relies on the TTL for the others."""
+
+    ready = True
+
+    async def publish(self, user_id: str) -> None:
+        pass
+
+    async def listen(self, on_invalidate: Callable[[Optional[str]], None]) -> None:
+        pass
+
+
+class RespBus:
+    """Pub/sub channel of a Redis-protocol server (Redis, Valkey, utils.resp_server)."""
+
+    def __init__(self, url: str, channel: str = "auth:invalidate", max_backoff: float = 30.0):
+        self.url = url
+        self.channel = channel
+        self.max_backoff = max_backoff
+        self.client = RespClient(url)
+        self.ready = False
+
+    async def publish(self, user_id: str) -> None:
+        await self.client.command("PUBLISH", self.channel, user_id)
+
+    async def listen(self, on_invalidate: Callable[[Optional[str]], None]) -> None:
+        subscriber = RespSubscriber(self.url, [self.channel])
+        backoff = 0.5
+        try:
+            while True:
+                try:
+                    await subscriber.subscribe()
+                    # Whatever was published while we were not subscribed is lost
+                    on_invalidate(None)
+                    self.ready = True
+                    backoff = 0.5
+                    async for _, data in subscriber.messages():
+                        on_invalidate(data.decode("utf-8"))
+                except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    logger.warning("Token invalidation channel unavailable, retrying in %.1fs", backoff, exc_info=True)
+                self.ready = False
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_backoff)
+        finally:
+            self.ready = False
+            await subscriber.close()
+            await self.client.close()
+
+
+class TokenCache:
+    def __init__(self, ttl: float, max_entries: int, bus: Optional[InvalidationBus] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.bus: InvalidationBus = bus or LocalBus()
+        # user id -> (user, expires at on the monotonic clock)
+        self._entries: "OrderedDict[uuid.UUID, Tuple[AuthUser, float]]" = OrderedDict()
+        # Bumped by every invalidation; a read that started before one must not fill
+        self._epoch = 0
+        self._listener: Optional[asyncio.Task] = None
+        self._counters: Dict[str, int] = {"hits": 0, "misses": 0, "invalidations": 0, "publish_errors": 0}
+
+    @classmethod
+    def from_config(cls) -> "TokenCache":
+        bus = RespBus(Config.AUTH_INVALIDATION_URL) if Config.AUTH_INVALIDATION_URL else LocalBus()
+        return cls(Config.AUTH_CACHE_TTL, Config.AUTH_CACHE_MAX_ENTRIES, bus)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.bus.ready
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def metrics(self) -> Dict[str, Any]:
+        return {**self._counters, "entries": len(self._entries), "subscribed": self.bus.ready}
+
+    def get(self, user_id: uuid.UUID) -> Optional[AuthUser]:
+        entry = self._entries.get(user_id) if self.enabled else None
+        if entry is not None and entry[1] <= time.monotonic():
+            del self._entries[user_id]
+            entry = None
+        if entry is None:
+            self._counters["misses"] += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self._counters["hits"] += 1
+        return entry[0]
+
+    def fill(self, user: AuthUser, epoch: int) -> None:
+        """Cache what was read from the database, unless an invalidation happened since `epoch`."""
+        if not self.enabled or epoch != self._epoch:
+            return
+        self._entries[user.id] = (user, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_local(self, user_id: Optional[str] = None) -> None:
+        """Drop one user's entry, or every entry when `user_id` is None."""
+        self._epoch += 1
+        self._counters["invalidations"] += 1
+        if user_id is None:
+            self._entries.clear()
+            return
+        try:
+            self._entries.pop(uuid.UUID(str(user_id)), None)
+        except ValueError:
+            logger.warning("Ignoring token invalidation of malformed user id %r", user_id)
+
+    async def invalidate(self, user_id: Any) -> None:
+        """Call after committing a change to any AuthUser column of the user (token_version, latest record, ...)."""
+        self.invalidate_local(str(user_id))
+        try:
+            await self.bus.publish(str(user_id))
+        except Exception:
+            # The other workers catch up when their entries expire
+            self._counters["publish_errors"] += 1
+            logger.exception("Failed to publish the token invalidation of user %s", user_id)
+
+    def start(self) -> None:
+        """Subscribe to the invalidations of the other workers (call on app startup)."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self.bus.listen(self.invalidate_local))
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+
+_token_cache: Optional[TokenCache] = None
+
+
+def get_token_cache() -> TokenCache:
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache.from_config()
+        register_metrics("token_cache", _token_cache.metrics)
+    return _token_cache
+
+
+def configure_token_cache(cache: TokenCache) -> None:
+    """Replace the process-wide cache (tests, or a bus chosen at startup)."""
+    global _token_cache
+    _token_cache = cache
+    register_metrics("token_cache", cache.metrics)
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+
+from utils.metrics import metrics_snapshot
+
+router = APIRouter(prefix="/v1/metrics")
+
+@router.get("")
+async def get_metrics():
+    # Counters of this worker process only
+    return metrics_snapshot()
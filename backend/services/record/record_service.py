@@ -1,11 +1,12 @@
-from services.chat.chat_utils import get_ai_response, get_information
-from sqlmodel import Session
+from services.chat.chat_utils import aget_information
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import HTTPException
-from repositories import MedicalRecordRepo, ChatHistoryRepo, AIStateRepo
+from repositories import MedicalRecordRepo, ChatHistoryRepo, AIStateRepo, unit_of_work
+from services.login.token_cache import get_token_cache
 from models.dto.modelDto import AIStateData, AddMedicalRecordRequest, AddMedicalRecordResponse, ChatMessageDto, ChatTextRequest, ChatTextResponse, GetChatHistoryRequest, GetChatHistoryResponse, GetCurrentRecordRequest, GetCurrentRecordResponse
 
 class RecordService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.medical_record_repo = MedicalRecordRepo(db)
         self.chat_history_repo = ChatHistoryRepo(db)
@@ -22,7 +23,7 @@ class RecordService:
         print(f"record_id: {record_id}")
         print(f"user_id: {user_id}")
         
-        record = self.medical_record_repo.get_medical_record_by_id(user_id=user_id, record_id=record_id)
+        record = await self.medical_record_repo.get_medical_record_by_id(user_id=user_id, record_id=record_id)
 
         return GetCurrentRecordResponse(
             user_id=str(record.user_id),
@@ -39,20 +40,21 @@ class RecordService:
         if not user_id:
             raise HTTPException(status_code=400, detail=f'Invalid user id')
         
-        record = self.medical_record_repo.add_record(user_id=user_id, data=data)
-        record_id = record.record_id
-        
-        ai_response = get_information(record, [], "")
-        
-        self.ai_state_repo.add_ai_state(
-            user_id=user_id, 
-            record_id=record_id, 
-            data=AIStateData(reasoning="", note="", decision=ai_response.decision).model_dump(mode="json")
-        )
-        messages = [{"role": "ai", "content": ai_response.generation}]
-        self.chat_history_repo.add_messages(user_id=user_id, record_id=record_id, messages=messages)
+        ai_response = await aget_information(data, [], "")
+
+        async with unit_of_work(self.db):
+            record = await self.medical_record_repo.add_record(user_id=user_id, data=data)
+            record_id = record.record_id
 
-        self.db.refresh(record)
+            await self.ai_state_repo.add_ai_state(
+                user_id=user_id, 
+                record_id=record_id, 
+                data=AIStateData(reasoning="", note="", decision=ai_response.decision).model_dump(mode="json")
+            )
+            messages = [{"role": "ai", "content": ai_response.generation}]
+            await self.chat_history_repo.add_messages(user_id=user_id, record_id=record_id, messages=messages)
+        # The cached auth user carries the latest record id
+        await get_token_cache().invalidate(user_id)
 
         return AddMedicalRecordResponse(
             message=ai_response.generation,
@@ -2,21 +2,30 @@ import asyncio
 
 from services.todo.todo_service import TodoService
 from fastapi import APIRouter, Depends
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from database import get_session
-from models.dto.modelDto import GetCurrentTodoRequest, GetCurrentTodoResponse, UpdateTodoItemRequest, UpdateTodoItemResponse
+from models.dto.modelDto import (
+    GetCurrentTodoRequest, GetCurrentTodoResponse, UpdateTodoItemRequest, UpdateTodoItemResponse,
+    UpdateTodoChecksRequest, UpdateTodoChecksResponse,
+)
 
 router = APIRouter(prefix="/v1/todo")
 
 @router.get("", response_model=GetCurrentTodoResponse)
-async def get_todo(request: GetCurrentTodoRequest = Depends(), db: Session = Depends(get_session)):
+async def get_todo(request: GetCurrentTodoRequest = Depends(), db: AsyncSession = Depends(get_session)):
     service = TodoService(db)
     print(f"Request: {request}")
     result = await service.get_current_todo(request)
     return result
 
 @router.patch("/check", response_model=UpdateTodoItemResponse)
-async def check_todo_item(request: UpdateTodoItemRequest, db: Session = Depends(get_session)):
+async def check_todo_item(request: UpdateTodoItemRequest, db: AsyncSession = Depends(get_session)):
     service = TodoService(db)
     result = await service.update_todo_item(request)
     return result
+
+@router.patch("/items", response_model=UpdateTodoChecksResponse)
+async def update_todo_checks(request: UpdateTodoChecksRequest, db: AsyncSession = Depends(get_session)):
+    service = TodoService(db)
+    result = await service.update_todo_checks(request)
+    return result
@@ -1,49 +1,82 @@
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import HTTPException
-from repositories import TodoRepo
+from repositories import MedicalRecordRepo, TodoRepo
 from models.dto.modelDto import (
     GetCurrentTodoRequest,
     GetCurrentTodoResponse,
     UpdateTodoItemRequest,
     UpdateTodoItemResponse,
+    UpdateTodoChecksRequest,
+    UpdateTodoChecksResponse,
     TodoItem,
 )
-from typing import Optional, List
+from typing import Optional, List, Tuple
+import uuid
 
 class TodoService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.todo_repo = TodoRepo(db)
+        self.medical_record_repo = MedicalRecordRepo(db)
+
+    @staticmethod
+    def _uuid(value: str, name: str) -> uuid.UUID:
+        try:
+            return uuid.UUID(str(value))
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f'Invalid {name}')
+
+    @staticmethod
+    def _item(row) -> TodoItem:
+        return TodoItem(text=row.text, is_check=row.is_check, position=row.position)
+
+    async def _target(self, user_id: Optional[str], record_id: Optional[str]) -> Tuple[uuid.UUID, uuid.UUID]:
+        if not user_id:
+            raise HTTPException(status_code=400, detail='Invalid user id')
+        user_uuid = self._uuid(user_id, 'user id')
+        if record_id:
+            return user_uuid, self._uuid(record_id, 'record id')
+        latest = await self.medical_record_repo.get_latest_record_id(user_uuid)
+        if not latest:
+            raise HTTPException(status_code=404, detail='No record found to update todo')
+        return user_uuid, latest
 
     async def get_current_todo(self, request: GetCurrentTodoRequest):
         user_id = request.user_id
         if not user_id:
             raise HTTPException(status_code=400, detail='Invalid user id')
+        user_uuid = self._uuid(user_id, 'user id')
 
         # If no record_id provided -> use latest record that has todos
-        record_id: Optional[str] = request.record_id or None
-        if not record_id:
-            latest = self.todo_repo.get_latest_record_id_for_user(user_id=user_id)
-            if not latest:
+        if request.record_id:
+            record_id = self._uuid(request.record_id, 'record id')
+        else:
+            record_id = await self.todo_repo.get_latest_record_id_for_user(user_id=user_uuid)
+            if not record_id:
                 return GetCurrentTodoResponse(user_id=str(user_id), record_id="", items=[])
-            record_id = str(latest)
 
-        rows = self.todo_repo.list_todos(user_id=user_id, record_id=record_id)
-        items: List[TodoItem] = [TodoItem(text=r.text, is_check=r.is_check) for r in rows]
-        return GetCurrentTodoResponse(user_id=str(user_id), record_id=str(record_id), items=items)
+        rows = await self.todo_repo.list_todos(user_id=user_uuid, record_id=record_id)
+        version = await self.todo_repo.get_version(user_id=user_uuid, record_id=record_id)
+        items: List[TodoItem] = [self._item(r) for r in rows]
+        return GetCurrentTodoResponse(user_id=str(user_id), record_id=str(record_id), items=items, version=version)
 
     async def update_todo_item(self, request: UpdateTodoItemRequest):
-        user_id = request.user_id
-        if not user_id:
-            raise HTTPException(status_code=400, detail='Invalid user id')
-
-        record_id: Optional[str] = request.record_id or None
-        if not record_id:
-            latest = self.medical_record_repo.get_latest_record_id(user_id=user_id)
-            if not latest:
-                raise HTTPException(status_code=404, detail='No record found to update todo')
-            record_id = str(latest)
+        """Single check/uncheck; answers with the whole list (kept for older clients)."""
+        user_id, record_id = await self._target(request.user_id, request.record_id)
+        version, _ = await self.todo_repo.set_checks(
+            user_id=user_id, record_id=record_id, checks={request.index: request.is_check}
+        )
+        rows = await self.todo_repo.list_todos(user_id=user_id, record_id=record_id)
+        items: List[TodoItem] = [self._item(r) for r in rows]
+        return UpdateTodoItemResponse(user_id=str(user_id), record_id=str(record_id), items=items, version=version)
 
-        rows = self.todo_repo.update_todo_checked_by_index(user_id=user_id, record_id=record_id, index=request.index, is_check=request.is_check)
-        items: List[TodoItem] = [TodoItem(text=r.text, is_check=r.is_check) for r in rows]
-        return UpdateTodoItemResponse(user_id=str(user_id), record_id=str(record_id), items=items)
+    async def update_todo_checks(self, request: UpdateTodoChecksRequest) -> UpdateTodoChecksResponse:
+        user_id, record_id = await self._target(request.user_id, request.record_id)
+        # Later operations on the same position win
+        checks = {op.position: op.is_check for op in request.ops}
+        version, rows = await self.todo_repo.set_checks(
+            user_id=user_id, record_id=record_id, checks=checks, expected_version=request.version
+        )
+        return UpdateTodoChecksResponse(
+            user_id=str(user_id), record_id=str(record_id), version=version, items=[self._item(r) for r in rows]
+        )
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def audio_cache_key(text: str, voice_id: str, model_id: str, voice_settings: Dict[str, Any]) -> str:
+    """Content address of a synthesis request: same inputs -> same audio."""
+    canonical = json.dumps(
+        {"text": text, "voice_id": voice_id, "model_id": model_id, "voice_settings": voice_settings},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """
+    Size-bounded LRU cache of synthesized audio on local disk.
+
+    Entries are files named by their content key, so several workers can share
+    one directory. Recency is the file mtime, which `get` bumps; `put` evicts the
+    least recently used files once the directory grows past `max_bytes`.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = ".mp3"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        # key -> size, least recently used first; built from the directory on first use
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        if self._index is None:
+            os.makedirs(self.directory, exist_ok=True)
+            entries = []
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith(self.suffix):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, entry.name[: -len(self.suffix)], st.st_size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+            self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                index = self._load_index()
+                size = index.pop(key, None)
+                if size is not None:
+                    self._total_bytes -= size
+            return None
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                # Written by another worker
+                index[key] = len(data)
+                self._total_bytes += len(data)
+            index.move_to_end(key)
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            index = self._load_index()
+            # Write to a temp file and rename so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                logger.exception("Failed to write audio cache entry %s", key)
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                return
+            self._total_bytes += len(data) - index.pop(key, 0)
+            index[key] = len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        index = self._index
+        while self._total_bytes > self.max_bytes and index:
+            key, size = index.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logger.warning("Failed to evict audio cache entry %s", key)
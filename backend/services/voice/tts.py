@@ -1,48 +1,72 @@
-import requests
+import asyncio
+from functools import lru_cache
+from typing import Dict
+
+import httpx
 from fastapi import HTTPException
 
 from config import Config
+from services.voice.audio_cache import AudioCache, audio_cache_key
 
 
 # Default voice for TTS (user requested)
 DEFAULT_VOICE_ID = "3VnrjnYrskPMDsapTr8X"
+DEFAULT_MODEL_ID = "eleven_flash_v2_5"
+DEFAULT_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.8}
 
+_TTS_BASE_URL = "https://api.elevenlabs.io/v1/text-to-speech"
+_HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+_HTTP_TIMEOUT = httpx.Timeout(60.0, connect=10.0)
 
-def synthesize_speech(text: str, voice_id: str | None = None) -> bytes:
-    """
-    Convert text to speech using ElevenLabs API and return audio bytes.
+# cache key -> in-flight synthesis, so concurrent requests for the same phrase share one API call
+_inflight: Dict[str, asyncio.Future] = {}
 
-    Args:
-        text: The text to synthesize.
-        voice_id: Optional ElevenLabs voice ID. Defaults to a standard voice.
 
-    Returns:
-        Raw audio bytes (MPEG).
-    """
+@lru_cache(maxsize=1)
+def _http_client() -> httpx.Client:
+    return httpx.Client(base_url=_TTS_BASE_URL, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
+
+@lru_cache(maxsize=1)
+def _http_async_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url=_TTS_BASE_URL, limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+
+
+@lru_cache(maxsize=1)
+def _semaphore() -> asyncio.Semaphore:
+    return asyncio.Semaphore(Config.TTS_MAX_CONCURRENCY)
+
+
+@lru_cache(maxsize=1)
+def get_audio_cache() -> AudioCache:
+    return AudioCache(Config.TTS_CACHE_DIR, Config.TTS_CACHE_MAX_BYTES)
+
+
+def _request_parts(text: str, voice_id: str | None):
+    vid = voice_id or DEFAULT_VOICE_ID
+    payload = {
+        "text": text,
+        "model_id": DEFAULT_MODEL_ID,
+        "voice_settings": DEFAULT_VOICE_SETTINGS,
+    }
+    key = audio_cache_key(text, vid, DEFAULT_MODEL_ID, DEFAULT_VOICE_SETTINGS)
+    return f"/{vid}", payload, key
+
+
+def _request_headers() -> dict:
+    # only needed on a cache miss: cached audio is served without calling the API
     api_key = Config.ELEVENLABS_API_KEY
     if not api_key:
         raise HTTPException(status_code=500, detail="Missing ELEVENLABS_API_KEY")
 
-    vid = voice_id or DEFAULT_VOICE_ID
-    url = f"https://api.elevenlabs.io/v1/text-to-speech/{vid}"
-
-    headers = {
+    return {
         "xi-api-key": api_key,
         "accept": "audio/mpeg",
         "Content-Type": "application/json",
     }
 
-    payload = {
-        "text": text,
-        "model_id": "eleven_flash_v2_5",
-        "voice_settings": {"stability": 0.5, "similarity_boost": 0.8},
-    }
-
-    try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=60)
-    except Exception as e:
-        raise HTTPException(status_code=502, detail=f"TTS request failed: {e}")
 
+def _check_response(resp: httpx.Response) -> bytes:
     if resp.status_code != 200:
         try:
             detail = resp.json()
@@ -51,3 +75,64 @@ def synthesize_speech(text: str, voice_id: str | None = None) -> bytes:
         raise HTTPException(status_code=resp.status_code, detail={"tts_error": detail})
 
     return resp.content
+
+
+def synthesize_speech(text: str, voice_id: str | None = None) -> bytes:
+    """
+    Convert text to speech using ElevenLabs API and return audio bytes.
+
+    Args:
+        text: The text to synthesize.
+        voice_id: Optional ElevenLabs voice ID. Defaults to a standard voice.
+
+    Returns:
+        Raw audio bytes (MPEG).
+    """
+    path, payload, key = _request_parts(text, voice_id)
+    cache = get_audio_cache()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    headers = _request_headers()
+    try:
+        resp = _http_client().post(path, headers=headers, json=payload)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"TTS request failed: {e}")
+
+    audio = _check_response(resp)
+    cache.put(key, audio)
+    return audio
+
+
+async def _afetch(path: str, headers: dict, payload: dict, key: str) -> bytes:
+    async with _semaphore():
+        try:
+            resp = await _http_async_client().post(path, headers=headers, json=payload)
+        except Exception as e:
+            raise HTTPException(status_code=502, detail=f"TTS request failed: {e}")
+    audio = _check_response(resp)
+    await asyncio.to_thread(get_audio_cache().put, key, audio)
+    return audio
+
+
+async def asynthesize_speech(text: str, voice_id: str | None = None) -> bytes:
+    """
+    Async variant of `synthesize_speech`.
+
+    Repeated phrases are served from the disk cache; identical requests that are
+    already being synthesized are joined instead of calling the API again.
+    """
+    path, payload, key = _request_parts(text, voice_id)
+    cached = await asyncio.to_thread(get_audio_cache().get, key)
+    if cached is not None:
+        return cached
+
+    headers = _request_headers()
+    future = _inflight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_afetch(path, headers, payload, key))
+        _inflight[key] = future
+        future.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield: one cancelled caller must not cancel the synthesis the others are waiting on
+    return await asyncio.shield(future)
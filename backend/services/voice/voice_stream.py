@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import re
+from typing import AsyncIterator, List, Tuple
+
+from fastapi import HTTPException
+
+from database import session_scope
+from models.dto.modelDto import ChatTextRequest
+from services.chat.chat_service import ChatService
+from services.voice.tts import asynthesize_speech
+
+logger = logging.getLogger(__name__)
+
+# End of sentence: latin punctuation followed by whitespace, or CJK punctuation (no space needed)
+_SENTENCE_END = re.compile(r"(?:[.!?…]+[\"')\]]*\s+|[。！？]+[」』）]*\s*|\n+)")
+
+
+class SentenceSplitter:
+    """
+    Accumulate streamed text and cut it into sentences for synthesis.
+
+    Sentences shorter than `min_chars` are merged with the next one so that
+    "Hi." or "1." do not turn into a separate TTS request each.
+    """
+
+    def __init__(self, min_chars: int = 12):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for match in _SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.end()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+# Turns still running after their socket went away; held so they are not collected
+_detached_turns: set = set()
+
+
+def _release_turn(turn: asyncio.Future) -> None:
+    _detached_turns.discard(turn)
+    if not turn.cancelled() and turn.exception() is not None:
+        logger.error("Voice turn failed after its reply was abandoned", exc_info=turn.exception())
+
+
+async def stream_voice_reply(request: ChatTextRequest, voice_id: str | None = None) -> AsyncIterator[Tuple[str, object]]:
+    """
+    Run one chat turn and yield its spoken reply as it becomes available.
+
+    Yields ("audio", mp3 bytes) once per sentence, in order, then ("done", ChatTextResponse
+    as dict) or ("error", {status_code, detail}). Each sentence is sent to TTS as soon as
+    the LLM has finished it, so synthesis overlaps with the rest of the generation and
+    the first audio only waits for the first sentence.
+
+    The turn runs in a task with its own session: when synthesis fails or the caller goes
+    away it is left to finish and persist, and only the audio still pending is dropped.
+    """
+    splitter = SentenceSplitter()
+    # Synthesis tasks in reply order; None marks the end of the reply
+    pending: asyncio.Queue = asyncio.Queue()
+    streamed = False
+    # Set once nobody will play further audio
+    closed = False
+
+    def schedule(sentences: List[str]):
+        if closed:
+            return
+        for sentence in sentences:
+            pending.put_nowait(asyncio.ensure_future(asynthesize_speech(sentence, voice_id)))
+
+    async def drop_audio():
+        nonlocal closed
+        closed = True
+        dropped = []
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
+                dropped.append(task)
+        await asyncio.gather(*dropped, return_exceptions=True)
+
+    async def on_token(delta: str):
+        nonlocal streamed
+        streamed = True
+        schedule(splitter.feed(delta))
+
+    async def run_turn():
+        try:
+            async with session_scope() as db:
+                result = await ChatService(db).process_chat_message(request, on_token=on_token)
+            if not streamed:
+                # Branch without token streaming: synthesize the full reply sentence by sentence
+                schedule(splitter.feed(result.message))
+            schedule(splitter.flush())
+            return result
+        finally:
+            pending.put_nowait(None)
+
+    turn = asyncio.ensure_future(run_turn())
+    try:
+        try:
+            while (task := await pending.get()) is not None:
+                yield "audio", await task
+            result = await turn
+        except HTTPException as e:
+            await drop_audio()
+            yield "error", {"status_code": e.status_code, "detail": e.detail}
+        except Exception:
+            logger.exception("Voice turn failed for record %s", request.record_id)
+            await drop_audio()
+            yield "error", {"status_code": 500, "detail": "Failed to process message."}
+        else:
+            yield "done", result.model_dump(mode="json")
+        if not turn.done():
+            # Synthesis failed under a running turn: let it persist before the next turn starts.
+            # wait() neither raises the turn's error nor cancels the turn if we are cancelled.
+            await asyncio.wait([turn])
+            _release_turn(turn)
+    finally:
+        await drop_audio()
+        if not turn.done():
+            _detached_turns.add(turn)
+            turn.add_done_callback(_release_turn)
@@ -0,0 +1,20 @@
+import base64
+import uuid
+from datetime import datetime
+from typing import Tuple
+
+from fastapi import HTTPException
+
+
+def encode_cursor(at: datetime, key: uuid.UUID) -> str:
+    """Opaque keyset position (timestamp, id) handed to clients for the next page."""
+    raw = f"{at.isoformat()}|{key}"
+    return base64.urlsafe_b64encode(raw.encode()).decode("ascii")
+
+
+def decode_cursor(value: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        at, key = base64.urlsafe_b64decode(value.encode("ascii")).decode().split("|")
+        return datetime.fromisoformat(at), uuid.UUID(key)
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
@@ -0,0 +1,37 @@
+from collections import deque
+from typing import Any, Callable, Deque, Dict
+
+# name -> function returning that component's current counters
+_SOURCES: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, source: Callable[[], Dict[str, Any]]) -> None:
+    """Expose a component's counters under `name` in the /v1/metrics snapshot."""
+    _SOURCES[name] = source
+
+
+def metrics_snapshot() -> Dict[str, Dict[str, Any]]:
+    return {name: source() for name, source in _SOURCES.items()}
+
+
+class LatencyWindow:
+    """Durations of the last `size` operations, summarized in milliseconds."""
+
+    def __init__(self, size: int = 1024):
+        self.count = 0
+        self._recent: Deque[float] = deque(maxlen=size)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self._recent.append(seconds)
+
+    def summary(self) -> Dict[str, Any]:
+        recent = sorted(self._recent)
+        if not recent:
+            return {"count": self.count}
+        return {
+            "count": self.count,
+            "avg_ms": round(sum(recent) / len(recent) * 1000, 3),
+            "p95_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000, 3),
+            "max_ms": round(recent[-1] * 1000, 3),
+        }
@@ -0,0 +1,193 @@
+"""
+Minimal asyncio client for the Redis protocol (RESP2).
+
+Only what the shared caches need (GET / SET / DEL, PUBLISH / SUBSCRIBE), without
+adding a Redis client dependency: a small connection pool that backs off from an
+unreachable server. It works against Redis, Valkey or the stand-in server of
+utils.resp_server.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    """Error reply (-ERR ...) of the server."""
+
+
+def parse_url(url: str) -> Tuple[str, int, Optional[str], int]:
+    """redis://[:password@]host[:port][/db] -> (host, port, password, db)."""
+    parsed = urlparse(url)
+    if parsed.scheme not in ("redis", "resp"):
+        raise ValueError(f"unsupported cache url {url!r}")
+    db = int(parsed.path.lstrip("/") or 0)
+    return parsed.hostname or "localhost", parsed.port or 6379, parsed.password, db
+
+
+def encode_command(*args) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif isinstance(arg, int):
+            arg = str(arg).encode("ascii")
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed by the server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode("utf-8")
+    if kind == b"-":
+        return RespError(rest.decode("utf-8"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        if size < 0:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        size = int(rest)
+        if size < 0:
+            return None
+        return [await read_reply(reader) for _ in range(size)]
+    raise ConnectionError(f"unexpected reply {line[:32]!r}")
+
+
+class RespUnavailable(ConnectionError):
+    """Raised without trying while the client is cooling down after a connection failure."""
+
+
+class _Connection:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, host: str, port: int, password: Optional[str], db: int) -> "_Connection":
+        conn = cls(*await asyncio.open_connection(host, port))
+        try:
+            if password:
+                await conn.roundtrip("AUTH", password)
+            if db:
+                await conn.roundtrip("SELECT", db)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    async def roundtrip(self, *args) -> Any:
+        self.writer.write(encode_command(*args))
+        await self.writer.drain()
+        reply = await read_reply(self.reader)
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RespClient:
+    """
+    Up to `pool_size` connections, each used by one command at a time.
+
+    A connection that fails or times out is dropped, and for the next `cooldown` seconds
+    (doubled on every failure in a row, up to `max_cooldown`) commands raise RespUnavailable
+    at once instead of each waiting for the timeout: the caches behind this client are
+    optional, so an unreachable server must not slow every request down.
+    """
+
+    def __init__(self, url: str, timeout: float = 1.0, pool_size: int = 4, cooldown: float = 1.0, max_cooldown: float = 30.0):
+        self.host, self.port, self.password, self.db = parse_url(url)
+        self.timeout = timeout
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: List[_Connection] = []
+        self._failures = 0
+        # Monotonic time until which commands are not attempted
+        self._retry_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self._retry_at
+
+    def _check_available(self) -> None:
+        if not self.available:
+            raise RespUnavailable(f"{self.host}:{self.port} unavailable, retrying in {self._retry_at - time.monotonic():.1f}s")
+
+    async def command(self, *args) -> Any:
+        self._check_available()
+        async with self._slots:
+            # It may have failed while we waited for a connection
+            self._check_available()
+            conn = self._idle.pop() if self._idle else None
+            try:
+                if conn is None:
+                    conn = await asyncio.wait_for(_Connection.open(self.host, self.port, self.password, self.db), self.timeout)
+                reply = await asyncio.wait_for(conn.roundtrip(*args), self.timeout)
+            except RespError:
+                # The error reply was read in full; the connection is still in step
+                self._idle.append(conn)
+                raise
+            except (OSError, ConnectionError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                # The reply of a timed-out command may still arrive; never reuse the connection
+                if conn is not None:
+                    conn.close()
+                self._failures += 1
+                self._retry_at = time.monotonic() + min(self.cooldown * 2 ** (self._failures - 1), self.max_cooldown)
+                raise
+            except BaseException:
+                # Cancelled halfway through a command
+                if conn is not None:
+                    conn.close()
+                raise
+            self._failures = 0
+            self._idle.append(conn)
+            return reply
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+class RespSubscriber:
+    """Dedicated connection subscribed to `channels`; yields the (channel, data) of each message."""
+
+    def __init__(self, url: str, channels: Sequence[str], timeout: float = 1.0):
+        self.host, self.port, self.password, self.db = parse_url(url)
+        self.timeout = timeout
+        self.channels = list(channels)
+        self._conn: Optional[_Connection] = None
+
+    async def subscribe(self) -> None:
+        """Connect and subscribe; raises like RespClient.command when the server is unreachable."""
+        await self.close()
+        self._conn = await asyncio.wait_for(_Connection.open(self.host, self.port, self.password, self.db), self.timeout)
+        self._conn.writer.write(encode_command("SUBSCRIBE", *self.channels))
+        await self._conn.writer.drain()
+        for _ in self.channels:
+            reply = await asyncio.wait_for(read_reply(self._conn.reader), self.timeout)
+            if isinstance(reply, RespError):
+                raise reply
+
+    async def messages(self) -> AsyncIterator[Tuple[str, bytes]]:
+        """Messages of the current subscription, until the connection drops (ConnectionError)."""
+        while True:
+            reply = await read_reply(self._conn.reader)
+            if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                yield reply[1].decode("utf-8"), reply[2]
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
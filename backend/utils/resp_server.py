@@ -0,0 +1,148 @@
+"""
+Stand-in for Redis: a single-process, in-memory server speaking enough of RESP2
+(PING, GET, SET with PX/EX/NX, DEL, FLUSHALL, PUBLISH, SUBSCRIBE) for the shared caches.
+
+For tests and local multi-worker runs, not for production:
+    python -m utils.resp_server --port 6390
+It prints "listening on <host>:<port>" once it accepts connections (--port 0 picks a free port).
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from utils.resp import read_reply
+
+
+def _simple(text: str) -> bytes:
+    return b"+%s\r\n" % text.encode("utf-8")
+
+
+def _error(text: str) -> bytes:
+    return b"-ERR %s\r\n" % text.encode("utf-8")
+
+
+def _int(value: int) -> bytes:
+    return b":%d\r\n" % value
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def _array(*items: bytes) -> bytes:
+    return b"*%d\r\n%s" % (len(items), b"".join(items))
+
+
+class RespServer:
+    def __init__(self):
+        # key -> (value, expires at on the monotonic clock or None)
+        self._data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        # channel -> connections subscribed to it
+        self._subscribers: Dict[bytes, Set[asyncio.StreamWriter]] = {}
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+
+    def _set(self, key: bytes, value: bytes, options) -> bytes:
+        expires_at, only_if_absent = None, False
+        options = [o.upper() for o in options]
+        i = 0
+        while i < len(options):
+            if options[i] == b"NX":
+                only_if_absent = True
+            elif options[i] in (b"PX", b"EX") and i + 1 < len(options):
+                scale = 1000.0 if options[i] == b"PX" else 1.0
+                expires_at = time.monotonic() + int(options[i + 1]) / scale
+                i += 1
+            else:
+                return _error("syntax error")
+            i += 1
+        if only_if_absent and self._get(key) is not None:
+            return _bulk(None)
+        self._data[key] = (value, expires_at)
+        return _simple("OK")
+
+    def _publish(self, channel: bytes, message: bytes) -> bytes:
+        subscribers = self._subscribers.get(channel, ())
+        for writer in subscribers:
+            writer.write(_array(_bulk(b"message"), _bulk(channel), _bulk(message)))
+        return _int(len(subscribers))
+
+    def _subscribe(self, writer: asyncio.StreamWriter, channels) -> bytes:
+        replies = []
+        for channel in channels:
+            self._subscribers.setdefault(channel, set()).add(writer)
+            count = sum(writer in subs for subs in self._subscribers.values())
+            replies.append(_array(_bulk(b"subscribe"), _bulk(channel), _int(count)))
+        return b"".join(replies)
+
+    def _unsubscribe(self, writer: asyncio.StreamWriter) -> None:
+        for subs in self._subscribers.values():
+            subs.discard(writer)
+
+    def execute(self, args, writer: Optional[asyncio.StreamWriter] = None) -> bytes:
+        name = args[0].upper()
+        if name == b"PUBLISH" and len(args) == 3:
+            return self._publish(args[1], args[2])
+        if name == b"SUBSCRIBE" and len(args) >= 2 and writer is not None:
+            return self._subscribe(writer, args[1:])
+        if name == b"PING":
+            return _simple("PONG")
+        if name == b"GET" and len(args) == 2:
+            return _bulk(self._get(args[1]))
+        if name == b"SET" and len(args) >= 3:
+            return self._set(args[1], args[2], args[3:])
+        if name == b"DEL" and len(args) >= 2:
+            removed = 0
+            for key in args[1:]:
+                if self._get(key) is not None:
+                    del self._data[key]
+                    removed += 1
+            return _int(removed)
+        if name == b"FLUSHALL":
+            self._data.clear()
+            return _simple("OK")
+        if name in (b"AUTH", b"SELECT"):
+            return _simple("OK")
+        return _error(f"unknown command {name.decode('utf-8', 'replace')!r}")
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                args = await read_reply(reader)
+                if not isinstance(args, list) or not args:
+                    writer.write(_error("expected an array of bulk strings"))
+                else:
+                    writer.write(self.execute(args, writer))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._unsubscribe(writer)
+            writer.close()
+
+
+async def serve(host: str, port: int) -> None:
+    server = await asyncio.start_server(RespServer().handle, host, port)
+    bound_host, bound_port = server.sockets[0].getsockname()[:2]
+    print(f"listening on {bound_host}:{bound_port}", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
@@ -0,0 +1,58 @@
+import hashlib
+import json
+import zlib
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+CODEC = "zlib"
+
+_DECOMPRESS = {
+    "zlib": zlib.decompress,
+}
+
+
+def encode_section(value: Any) -> Tuple[str, bytes, int]:
+    """
+    (hash, compressed bytes, raw size) of a payload section.
+
+    The hash is taken over canonical JSON (sorted keys, no whitespace), so equal
+    sections get the same hash whatever order their keys were built in.
+    """
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest(), zlib.compress(raw, 6), len(raw)
+
+
+def decode_section(codec: str, data: bytes) -> Any:
+    try:
+        decompress = _DECOMPRESS[codec]
+    except KeyError:
+        raise ValueError(f"unknown snapshot codec {codec!r}")
+    return json.loads(decompress(data))
+
+
+class LazySnapshot(Mapping[str, Any]):
+    """
+    Read-only view of a contact payload whose sections are decompressed on first access.
+
+    `refs` maps each section to its blob hash (None for an empty section), `blobs`
+    maps hashes to (codec, compressed bytes).
+    """
+
+    def __init__(self, refs: Mapping[str, Optional[str]], blobs: Mapping[str, Tuple[str, bytes]]):
+        self._refs = dict(refs)
+        self._blobs = blobs
+        self._decoded: Dict[str, Any] = {}
+
+    def __getitem__(self, section: str) -> Any:
+        if section not in self._decoded:
+            ref = self._refs[section]
+            if ref is None:
+                self._decoded[section] = None
+            else:
+                self._decoded[section] = decode_section(*self._blobs[ref])
+        return self._decoded[section]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._refs)
+
+    def __len__(self) -> int:
+        return len(self._refs)
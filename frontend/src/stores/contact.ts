@@ -19,10 +19,11 @@ export const useContactStore = defineStore('contact', () => {
             payload
         );
     }
-    async function listPatients(doctorId: string) {
+    // One page of patients; pass the previous page's next_cursor as `cursor` for the next
+    async function listPatients(doctorId: string, cursor?: string) {
         const res = await $backend.get<ListPatientsResponse>(
             `${URL_PREFIX}/patients`,
-            { params: { doctor_id: doctorId } }
+            { params: { doctor_id: doctorId, cursor } }
         );
         return res.data;
     }
@@ -5,6 +5,8 @@ import type {
     GetCurrentTodoResponse,
     UpdateTodoItemRequest,
     UpdateTodoItemResponse,
+    UpdateTodoChecksRequest,
+    UpdateTodoChecksResponse,
 } from '@/types/todo';
 
 const URL_PREFIX = '/v1/todo';
@@ -26,6 +28,13 @@ export const useTodoStore = defineStore('todo', () => {
         );
         return data;
     }
+    async function updateTodoChecks(payload: UpdateTodoChecksRequest) {
+        const { data } = await $backend.patch<UpdateTodoChecksResponse>(
+            `${URL_PREFIX}/items`,
+            payload
+        );
+        return data;
+    }
 
-    return { getCurrentTodo, checkTodoItem };
+    return { getCurrentTodo, checkTodoItem, updateTodoChecks };
 });
@@ -13,6 +13,11 @@ export interface sendChatMessageResponse {
 export interface getChatHistoryRequest {
     user_id: string;
     record_id: string;
+    limit?: number;
+    // At most one of before / after / since
+    before?: string;
+    after?: string;
+    since?: string;
 }
 
 export interface ChatMessage {
@@ -24,4 +29,7 @@ export interface ChatMessage {
 
 export interface GetChatHistoryResponse {
     history: ChatMessage[];
+    before_cursor?: string | null;
+    after_cursor?: string | null;
+    has_more: boolean;
 }
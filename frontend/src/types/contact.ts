@@ -16,9 +16,12 @@ export interface PatientCard {
     full_name: string;
     age: number;
     address: string;
+    status: 'new' | 'assigned';
+    last_message_at?: string | null;
 }
 export interface ListPatientsResponse {
     patients: PatientCard[];
+    next_cursor: string | null;
 }
 
 export interface ContactDetailResponse {
@@ -10,8 +10,12 @@ export interface ChatHistoryPreview {
 
 export interface GetAllChatHistoryRequest {
     user_id: string;
+    limit?: number;
+    // next_cursor of the previous page
+    cursor?: string;
 }
 
 export interface GetAllChatHistoryResponse {
     histories: ChatHistoryPreview[];
+    next_cursor: string | null;
 }
@@ -6,12 +6,14 @@ export interface GetCurrentTodoRequest {
 export interface TodoItem {
     text: string;
     is_check: boolean;
+    position?: number;
 }
 
 export interface GetCurrentTodoResponse {
     user_id: string;
     record_id: string;
     items: TodoItem[];
+    version: number;
 }
 
 export interface UpdateTodoItemRequest {
@@ -22,3 +24,24 @@ export interface UpdateTodoItemRequest {
 }
 
 export type UpdateTodoItemResponse = GetCurrentTodoResponse;
+
+export interface TodoCheckOp {
+    position: number;
+    is_check: boolean;
+}
+
+export interface UpdateTodoChecksRequest {
+    user_id: string;
+    record_id?: string;
+    // Version last seen; the server answers 409 if the todos changed since
+    version?: number;
+    ops: TodoCheckOp[];
+}
+
+export interface UpdateTodoChecksResponse {
+    user_id: string;
+    record_id: string;
+    version: number;
+    // Only the changed todos
+    items: TodoItem[];
+}